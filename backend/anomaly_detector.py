@@ -0,0 +1,280 @@
+"""
+ORCA PREDATOR - Anomaly Detector
+Online anomaly detection for every (equipment, sensor) pair of the fleet.
+
+Each pair keeps O(1) running statistics: Welford mean and variance, an EWMA
+of the readings, and a two-sided CUSUM drift score. All of it is stored as
+(machines, sensors) arrays, so a simulation tick updates the whole fleet in
+one vectorized pass. Three kinds of anomaly are flagged against the running
+baseline:
+
+- spike: one reading more than SPIKE_Z standard deviations from the mean
+- shift: the EWMA has moved away from the mean (a sustained level change)
+- drift: the CUSUM of standardized deviations has crossed its threshold
+"""
+
+import os
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+# Readings per sensor before anything is flagged
+WARMUP = int(os.getenv("ORCA_ANOMALY_WARMUP", "30"))
+SPIKE_Z = float(os.getenv("ORCA_ANOMALY_SPIKE_Z", "4"))
+EWMA_ALPHA = float(os.getenv("ORCA_ANOMALY_EWMA_ALPHA", "0.1"))
+# EWMA control limit, in standard deviations of the EWMA statistic
+EWMA_L = float(os.getenv("ORCA_ANOMALY_EWMA_L", "3.5"))
+# CUSUM slack and decision threshold, in baseline standard deviations
+CUSUM_K = float(os.getenv("ORCA_ANOMALY_CUSUM_K", "0.5"))
+CUSUM_H = float(os.getenv("ORCA_ANOMALY_CUSUM_H", "8"))
+# Ticks an anomaly stays in the equipment alerts after it was last flagged
+HOLD_TICKS = int(os.getenv("ORCA_ANOMALY_HOLD_TICKS", "3"))
+# Consecutive spikes after which a sensor's baseline restarts from the new level
+REBASELINE_AFTER = int(os.getenv("ORCA_ANOMALY_REBASELINE", "10"))
+
+SPIKE, SHIFT, DRIFT = 1, 2, 4
+KIND_NAMES = {SPIKE: "spike", SHIFT: "shift", DRIFT: "drift"}
+
+
+def kinds(flags: int) -> List[str]:
+    return [name for bit, name in KIND_NAMES.items() if flags & bit]
+
+
+def alert_strings(active: np.ndarray, high: np.ndarray, sensor_names: List[str]) -> List[str]:
+    """Alert strings for one machine's row of active flags and directions"""
+    alerts = []
+    for j in np.flatnonzero(active):
+        side = "high" if high[j] else "low"
+        alerts.append(f"Anomaly: {sensor_names[j]} {'/'.join(kinds(int(active[j])))} ({side})")
+    return alerts
+
+
+class ActiveAlerts:
+    """
+    The anomalies held in alerts at one tick: copies of the detector's
+    flags, so later updates do not change a published snapshot.
+    """
+
+    __slots__ = ("active", "high", "sensor_names")
+
+    def __init__(self, active: np.ndarray, high: np.ndarray, sensor_names: List[str]):
+        self.active = active
+        self.high = high
+        self.sensor_names = sensor_names
+
+    def alerts(self, i: int) -> List[str]:
+        return alert_strings(self.active[i], self.high[i], self.sensor_names)
+
+    def alert_counts(self) -> np.ndarray:
+        return np.count_nonzero(self.active, axis=1).astype(np.int32)
+
+
+class FleetAnomalyDetector:
+    """
+    Running per-(machine, sensor) statistics and anomaly flags.
+
+    Rows follow the simulator's machine order and columns `sensor_names`.
+    NaN readings (sensors a machine does not have) leave their statistics
+    untouched. Spikes are not folded into the baseline, so a single bad
+    reading does not inflate the variance that later readings are judged by.
+    A sensor that spikes `rebaseline_after` times in a row has changed level
+    for good (e.g. after maintenance or at a new operating point): its
+    baseline restarts from the latest reading instead of flagging every
+    reading from then on.
+    """
+
+    def __init__(self, n_machines: int, sensor_names: List[str], warmup: int = WARMUP,
+                 spike_z: float = SPIKE_Z, ewma_alpha: float = EWMA_ALPHA, ewma_l: float = EWMA_L,
+                 cusum_k: float = CUSUM_K, cusum_h: float = CUSUM_H, hold_ticks: int = HOLD_TICKS,
+                 rebaseline_after: int = REBASELINE_AFTER):
+        self.sensor_names = list(sensor_names)
+        self.warmup = max(2, warmup)
+        self.spike_z = spike_z
+        self.ewma_alpha = ewma_alpha
+        self.ewma_limit = ewma_l * np.sqrt(ewma_alpha / (2 - ewma_alpha))
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.hold_ticks = hold_ticks
+        self.rebaseline_after = max(1, rebaseline_after)
+
+        shape = (n_machines, len(self.sensor_names))
+        # float64 count: it only ever divides other float arrays
+        self.count = np.zeros(shape, dtype=np.float64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.ewma = np.zeros(shape, dtype=np.float64)
+        self.cusum_high = np.zeros(shape, dtype=np.float64)
+        self.cusum_low = np.zeros(shape, dtype=np.float64)
+        # Latest standardized deviation, and the anomalies currently held in alerts
+        self.z = np.zeros(shape, dtype=np.float64)
+        self.active = np.zeros(shape, dtype=np.uint8)
+        self.high = np.zeros(shape, dtype=bool)
+        self._flagged_at = np.zeros(shape, dtype=np.int64)
+        # Consecutive spikes per pair (missing readings do not break a run)
+        self._spike_run = np.zeros(shape, dtype=np.int32)
+        self.ticks = 0
+        self.stats = {"updates": 0, "spike": 0, "shift": 0, "drift": 0, "rebaselines": 0}
+
+        # Scratch buffers reused by every update: allocating fresh fleet-sized
+        # temporaries (and page-faulting them in) costs more than the math
+        self._x = np.zeros(shape, dtype=np.float64)
+        self._sigma = np.zeros(shape, dtype=np.float64)
+        self._deviation = np.zeros(shape, dtype=np.float64)
+        self._tmp = np.zeros(shape, dtype=np.float64)
+        self._masks = {name: np.zeros(shape, dtype=bool)
+                       for name in ("missing", "valid", "ready", "first", "spike", "shift", "drift", "learn",
+                                    "rebase", "tmp")}
+
+    def __len__(self) -> int:
+        return self.count.shape[0]
+
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / np.maximum(self.count - 1.0, 1.0))
+
+    def update(self, readings: np.ndarray) -> np.ndarray:
+        """Score and learn one (machines, sensors) reading matrix; returns this update's flags"""
+        m = self._masks
+        x, sigma, deviation, tmp, z = self._x, self._sigma, self._deviation, self._tmp, self.z
+
+        missing = np.isnan(readings, out=m["missing"])
+        valid = np.logical_not(missing, out=m["valid"])
+        np.copyto(x, readings)
+        x[missing] = 0.0
+        ready = np.greater_equal(self.count, self.warmup, out=m["ready"])
+        ready &= valid
+
+        # Standardize against the baseline before this reading joins it
+        np.maximum(np.subtract(self.count, 1.0, out=sigma), 1.0, out=sigma)
+        np.sqrt(np.divide(self.m2, sigma, out=sigma), out=sigma)
+        np.abs(self.mean, out=tmp)
+        tmp *= 1e-6
+        tmp += 1e-9
+        np.maximum(sigma, tmp, out=sigma)
+        np.subtract(x, self.mean, out=deviation)
+        np.divide(deviation, sigma, out=z)
+        z *= ready
+        spike = np.greater(np.abs(z, out=tmp), self.spike_z, out=m["spike"])
+
+        first = np.equal(self.count, 0.0, out=m["first"])
+        first &= valid
+        np.subtract(x, self.ewma, out=tmp)
+        tmp *= valid
+        tmp *= self.ewma_alpha
+        self.ewma += tmp
+        np.copyto(self.ewma, x, where=first)
+        np.abs(np.subtract(self.ewma, self.mean, out=tmp), out=tmp)
+        shift = np.greater(tmp, np.multiply(sigma, self.ewma_limit, out=sigma), out=m["shift"])
+        shift &= ready
+
+        # Clipped so that a lone spike cannot trip the drift detector by itself
+        np.clip(z, -self.spike_z, self.spike_z, out=tmp)
+        self.cusum_high += tmp
+        self.cusum_high -= self.cusum_k
+        np.maximum(self.cusum_high, 0.0, out=self.cusum_high)
+        self.cusum_low -= tmp
+        self.cusum_low -= self.cusum_k
+        np.maximum(self.cusum_low, 0.0, out=self.cusum_low)
+        drift = np.greater(self.cusum_high, self.cusum_h, out=m["drift"])
+        drift |= np.greater(self.cusum_low, self.cusum_h, out=m["tmp"])
+
+        # Welford update, skipping spikes and missing sensors
+        learn = np.logical_not(spike, out=m["learn"])
+        learn &= valid
+        self.count += learn
+        deviation *= learn
+        self.mean += np.divide(deviation, np.maximum(self.count, 1.0, out=tmp), out=tmp)
+        np.subtract(x, self.mean, out=tmp)
+        tmp *= deviation
+        self.m2 += tmp
+
+        # A long enough run of spikes is the new normal: restart the baseline there
+        np.copyto(self._spike_run, 0, where=learn)
+        self._spike_run += spike
+        rebase = np.greater_equal(self._spike_run, self.rebaseline_after, out=m["rebase"])
+        rebased = int(np.count_nonzero(rebase))
+        if rebased:
+            self.count[rebase] = 1.0
+            self.mean[rebase] = x[rebase]
+            self.m2[rebase] = 0.0
+            self.ewma[rebase] = x[rebase]
+            self.cusum_high[rebase] = 0.0
+            self.cusum_low[rebase] = 0.0
+            self._spike_run[rebase] = 0
+
+        flags = spike.view(np.uint8) * np.uint8(SPIKE)
+        flags |= shift.view(np.uint8) * np.uint8(SHIFT)
+        flags |= drift.view(np.uint8) * np.uint8(DRIFT)
+        flagged = flags > 0
+        self.cusum_high[drift] = 0.0
+        self.cusum_low[drift] = 0.0
+
+        # Hold flagged anomalies in the alerts for a few ticks
+        self.ticks += 1
+        np.copyto(self._flagged_at, self.ticks, where=flagged)
+        np.copyto(self.active, flags, where=flagged)
+        np.copyto(self.high, z > 0, where=flagged)
+        self.active[self._flagged_at <= self.ticks - self.hold_ticks] = 0
+
+        self.stats["updates"] += 1
+        self.stats["spike"] += int(np.count_nonzero(spike))
+        self.stats["shift"] += int(np.count_nonzero(shift))
+        self.stats["drift"] += int(np.count_nonzero(drift))
+        self.stats["rebaselines"] += rebased
+        return flags
+
+    def alerts(self, i: int) -> List[str]:
+        """Alert strings for one machine's active anomalies"""
+        return alert_strings(self.active[i], self.high[i], self.sensor_names)
+
+    def frozen(self) -> ActiveAlerts:
+        """The current alerts, unaffected by later updates"""
+        return ActiveAlerts(self.active.copy(), self.high.copy(), self.sensor_names)
+
+    def alert_counts(self) -> np.ndarray:
+        """Number of anomaly alerts per machine, matching alerts(i)"""
+        return np.count_nonzero(self.active, axis=1).astype(np.int32)
+
+    def active_anomalies(self, equipment_ids: List[str]) -> List[Dict[str, Any]]:
+        """Every active anomaly with the statistics behind it"""
+        rows, columns = np.nonzero(self.active)
+        if not rows.shape[0]:
+            return []
+        std = self.std()[rows, columns]
+        return [
+            {
+                "equipment_id": equipment_ids[i],
+                "sensor": self.sensor_names[j],
+                "kinds": kinds(int(self.active[i, j])),
+                "direction": "high" if self.high[i, j] else "low",
+                "z": round(float(self.z[i, j]), 2),
+                "mean": round(float(self.mean[i, j]), 3),
+                "std": round(float(s), 3),
+                "ewma": round(float(self.ewma[i, j]), 3),
+                "cusum": round(float(max(self.cusum_high[i, j], self.cusum_low[i, j])), 2),
+            }
+            for i, j, s in zip(rows.tolist(), columns.tolist(), std.tolist())
+        ]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "machines": len(self),
+            "sensors": self.sensor_names,
+            "active": int(np.count_nonzero(self.active)),
+            "warmup": self.warmup,
+            "spike_z": self.spike_z,
+            "ewma_alpha": self.ewma_alpha,
+            "cusum_k": self.cusum_k,
+            "cusum_h": self.cusum_h,
+            "rebaseline_after": self.rebaseline_after,
+            "bytes": sum(array.nbytes for array in (self.count, self.mean, self.m2, self.ewma, self.cusum_high,
+                                                     self.cusum_low, self.z, self.active, self.high,
+                                                     self._flagged_at, self._spike_run)),
+            **self.stats,
+        }
+
+
+def create_anomaly_detector(n_machines: int, sensor_names: List[str]) -> Optional[FleetAnomalyDetector]:
+    """Detector configured from ORCA_ANOMALY_* (disabled with ORCA_ANOMALY_DETECTION=0)"""
+    if os.getenv("ORCA_ANOMALY_DETECTION", "1").lower() in ("0", "false", "no"):
+        return None
+    return FleetAnomalyDetector(n_machines, sensor_names)
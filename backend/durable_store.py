@@ -0,0 +1,420 @@
+"""
+ORCA PREDATOR - Durable Store
+Embedded SQLite (WAL) persistence of equipment state, sensor samples and RUL
+predictions. After a restart the fleet continues where it stopped instead of
+being regenerated, and recent sensor history is replayed into memory.
+
+Writers never wait on the disk. Rows are queued to a GroupCommitWriter
+thread, which commits everything queued within `flush_ms` in one
+transaction. That is one WAL sync per group instead of one per row. Row
+building also happens on that thread: a simulated tick is written from the
+simulator's arrays, and an equipment record is JSON-encoded once per fleet,
+after which each tick only updates health, RUL and status.
+
+Exactly one process writes ticks. With a shared fleet (fleet_store) that is
+the simulation owner; otherwise the process holding an exclusive lock on
+`<path>.writer` (see claim_writer), so pre-forked workers that each simulate
+their own fleet do not all write to the same file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: one process per database is assumed
+    fcntl = None
+
+from mock_company import SENSOR_NAMES, STATUS_NAMES, status_alerts
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "orca_history.sqlite")
+
+SAMPLE_COLUMNS = ", ".join(SENSOR_NAMES)
+INSERT_SAMPLE = (f"INSERT INTO sensor_samples (equipment_id, timestamp, {SAMPLE_COLUMNS}) "
+                 f"VALUES (?, ?, {', '.join('?' for _ in SENSOR_NAMES)})")
+UPSERT_STATE = ("INSERT OR REPLACE INTO equipment_state "
+                "(equipment_id, position, tick, timestamp, record, health, rul, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+UPDATE_STATE = "UPDATE equipment_state SET tick = ?, timestamp = ?, health = ?, rul = ?, status = ? WHERE equipment_id = ?"
+# Columns updated every tick on top of the record JSON
+STATE_COLUMNS = {"health": "REAL", "rul": "INTEGER", "status": "TEXT"}
+# How often a process that is not the writer retries claim_writer()
+WRITER_RETRY_S = 5.0
+INSERT_PREDICTION = ("INSERT INTO rul_predictions (equipment_id, timestamp, dataset, model, rul) "
+                     "VALUES (?, ?, ?, ?, ?)")
+
+
+def sample_row(equipment_id: str, timestamp: float, sensor_data: Dict[str, Any]) -> Tuple:
+    return (equipment_id, timestamp, *(sensor_data.get(name) for name in SENSOR_NAMES))
+
+
+class GroupCommitWriter:
+    """
+    Background thread that commits queued inserts in groups. `submit` only
+    queues. While more than `max_pending_rows` rows are waiting it blocks
+    (backpressure instead of unbounded memory), or, with block=False, drops
+    the rows and counts them, so the event loop never waits on the writer.
+    """
+
+    def __init__(self, connect, flush_ms: float = 100.0, max_pending_rows: int = 1_000_000,
+                 max_group_rows: int = 100_000):
+        self._connect = connect
+        self.flush_s = flush_ms / 1000
+        self.max_pending_rows = max_pending_rows
+        # Bounds how long one transaction holds the database write lock
+        self.max_group_rows = max_group_rows
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        # Fresh queue and no thread: a forked child starts its own on first submit
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[str, Iterable[Tuple], int]] = []
+        self._pending_rows = 0
+        self._submitted = self._committed = 0
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self.stats = {"rows": 0, "groups": 0, "errors": 0, "backpressure_waits": 0, "dropped_rows": 0,
+                      "last_group_rows": 0, "last_group_ms": None, "max_group_ms": 0.0}
+
+    def submit(self, sql: str, rows: Iterable[Tuple], count: int, block: bool = True) -> bool:
+        """
+        Queue `count` rows (a list, or an iterable evaluated on the writer
+        thread) for `sql`. Returns False if they were not queued (closing,
+        or the queue is full and `block` is False).
+        """
+        with self._cond:
+            if self._closing:
+                return False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="orca-group-commit", daemon=True)
+                self._thread.start()
+            if self._pending_rows >= self.max_pending_rows and not block:
+                self.stats["dropped_rows"] += count
+                return False
+            while self._pending_rows >= self.max_pending_rows:
+                self.stats["backpressure_waits"] += 1
+                self._cond.wait()
+            self._pending.append((sql, rows, count))
+            self._pending_rows += count
+            self._submitted += 1
+            self._cond.notify_all()
+            return True
+
+    def _run(self) -> None:
+        db = self._connect()
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    break
+            # Let the group fill for one flush interval (the commit latency bound)
+            if not self._closing:
+                time.sleep(self.flush_s)
+            with self._cond:
+                taken = rows = 0
+                while taken < len(self._pending) and (not taken or rows < self.max_group_rows):
+                    rows += self._pending[taken][2]
+                    taken += 1
+                group, self._pending = self._pending[:taken], self._pending[taken:]
+                self._pending_rows -= rows
+                self._cond.notify_all()
+
+            started = time.perf_counter()
+            rows = 0
+            try:
+                db.execute("BEGIN")
+                for sql, job_rows, count in group:
+                    db.executemany(sql, job_rows)
+                    rows += count
+                db.execute("COMMIT")
+            except Exception as e:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+                self.stats["errors"] += 1
+                print(f"⚠️ Durable store group commit failed ({len(group)} jobs): {e}")
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+            with self._cond:
+                self._committed += len(group)
+                self.stats["rows"] += rows
+                self.stats["groups"] += 1
+                self.stats["last_group_rows"] = rows
+                self.stats["last_group_ms"] = elapsed_ms
+                self.stats["max_group_ms"] = max(self.stats["max_group_ms"], elapsed_ms)
+                self._cond.notify_all()
+        db.close()
+
+    def flush(self, timeout_s: float = 30.0) -> bool:
+        """Wait until everything submitted so far is committed"""
+        deadline = time.monotonic() + timeout_s
+        with self._cond:
+            target = self._submitted
+            while self._committed < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout_s: float = 30.0) -> None:
+        self.flush(timeout_s)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout_s)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"pending_rows": self._pending_rows, "flush_ms": self.flush_s * 1000, **self.stats}
+
+
+class DurableStore:
+    """
+    Equipment state (latest record per machine), sensor samples and RUL
+    predictions, each indexed on (equipment_id, timestamp). Samples and
+    predictions older than `retention_h` are purged in the background.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, synchronous: str = "full", flush_ms: float = 100.0,
+                 retention_h: float = 24.0, replay_minutes: float = 15.0, state_every_ticks: int = 1,
+                 max_pending_rows: int = 1_000_000):
+        self.path = path
+        self.synchronous = synchronous.upper()
+        self.retention_s = retention_h * 3600
+        self.replay_s = replay_minutes * 60
+        self.state_every_ticks = max(1, state_every_ticks)
+        self._last_purge = time.time()
+        self.writer = GroupCommitWriter(self._connect, flush_ms, max_pending_rows)
+        # Base records whose JSON is already stored (see record_snapshot)
+        self._state_base: Any = None
+        self._reader_connect()
+        os.register_at_fork(after_in_child=self._reader_connect)
+        with self._lock:
+            self._db.executescript(f"""
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS equipment_state (
+                    equipment_id TEXT PRIMARY KEY, position INTEGER NOT NULL, tick INTEGER NOT NULL,
+                    timestamp REAL NOT NULL, record TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS sensor_samples (
+                    equipment_id TEXT NOT NULL, timestamp REAL NOT NULL,
+                    {', '.join(f'{name} REAL' for name in SENSOR_NAMES)});
+                CREATE INDEX IF NOT EXISTS sensor_samples_equipment_time ON sensor_samples (equipment_id, timestamp);
+                CREATE INDEX IF NOT EXISTS sensor_samples_time ON sensor_samples (timestamp);
+                CREATE TABLE IF NOT EXISTS rul_predictions (
+                    equipment_id TEXT NOT NULL, timestamp REAL NOT NULL, dataset TEXT NOT NULL,
+                    model TEXT NOT NULL, rul REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS rul_predictions_equipment_time ON rul_predictions (equipment_id, timestamp);
+            """)
+            existing = {row[1] for row in self._db.execute("PRAGMA table_info(equipment_state)")}
+            for name, sql_type in STATE_COLUMNS.items():
+                if name not in existing:
+                    self._db.execute(f"ALTER TABLE equipment_state ADD COLUMN {name} {sql_type}")
+        self.stats = {"snapshots": 0, "samples": 0, "states": 0, "predictions": 0, "purged": 0,
+                      "restored_equipment": 0, "replayed_samples": 0, "restore_ms": None}
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(f"PRAGMA synchronous={self.synchronous}")
+        return db
+
+    def _reader_connect(self) -> None:
+        # Reads (restore, replay, queries) use their own connection; the writer thread opens another
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        # A forked child claims the writer lock for itself
+        self._writer_fd: Optional[int] = None
+        self._writer_checked = 0.0
+
+    def claim_writer(self) -> bool:
+        """
+        Whether this process is the one that writes fleet ticks and readings,
+        when no shared fleet store decides it. The first process to ask takes
+        an exclusive flock on `<path>.writer` and keeps it until it exits; the
+        others retry every WRITER_RETRY_S, so one of them takes over if the
+        writer dies. The lock must be claimed after forking, not in a
+        pre-fork master, or every worker would share it.
+        """
+        if self._writer_fd is not None or fcntl is None:
+            return True
+        now = time.monotonic()
+        if now - self._writer_checked < WRITER_RETRY_S:
+            return False
+        self._writer_checked = now
+        fd = os.open(self.path + ".writer", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._writer_fd = fd
+        return True
+
+    # Writes (queued)
+
+    def record_snapshot(self, snapshot: Any) -> None:
+        """
+        Sensor readings of a fleet tick, plus equipment state every
+        `state_every_ticks` ticks. An array-backed tick (FleetRecords and
+        FleetReadings) is written straight from its arrays.
+        """
+        equipment, sensor_data = snapshot.equipment, snapshot.sensor_data
+        timestamp, tick = snapshot.timestamp, snapshot.tick
+        ids = getattr(equipment, "ids", None)
+        sensors = getattr(sensor_data, "sensors", None)
+        if ids is not None and sensors is not None and sensors.shape[0] == len(ids):
+            # NaN (no such sensor) is stored as NULL
+            self.writer.submit(INSERT_SAMPLE, ((equipment_id, timestamp, *values)
+                                               for equipment_id, values in zip(ids, sensors.tolist())), len(ids))
+        else:
+            self.writer.submit(INSERT_SAMPLE, (sample_row(record['equipment_id'], timestamp,
+                                                          sensor_data.get(record['equipment_id'], {}))
+                                               for record in equipment), len(equipment))
+        self.stats["samples"] += len(equipment)
+
+        if tick % self.state_every_ticks == 0:
+            base = getattr(equipment, "base", None)
+            if base is not None and base is self._state_base:
+                self.writer.submit(UPDATE_STATE, (
+                    (tick, timestamp, health, rul, STATUS_NAMES[status], equipment_id)
+                    for equipment_id, health, rul, status in zip(
+                        ids, equipment.health_rounded.tolist(), equipment.rul.tolist(), equipment.status.tolist())
+                ), len(equipment))
+            else:
+                self.writer.submit(UPSERT_STATE, ((record['equipment_id'], position, tick, timestamp,
+                                                   json.dumps(record), record.get('health'), record.get('rul'),
+                                                   record.get('status'))
+                                                  for position, record in enumerate(equipment)), len(equipment))
+                # Later ticks over these records (a plain list is the base of the next tick) only update
+                self._state_base = base if base is not None else equipment
+            self.stats["states"] += len(equipment)
+        self.stats["snapshots"] += 1
+        if timestamp - self._last_purge > 600:
+            self._last_purge = timestamp
+            self.purge()
+
+    # Called from request handlers on the event loop: dropped, not blocking, when the queue is full
+
+    def record_reading(self, equipment_id: str, sensor_data: Dict[str, Any], timestamp: Optional[float] = None) -> None:
+        if self.writer.submit(INSERT_SAMPLE, [sample_row(equipment_id, timestamp or time.time(), sensor_data)], 1,
+                              block=False):
+            self.stats["samples"] += 1
+
+    def record_predictions(self, rows: List[Tuple[str, float, str, str, float]]) -> None:
+        """(equipment_id, timestamp, dataset, model, rul) rows"""
+        if rows and self.writer.submit(INSERT_PREDICTION, rows, len(rows), block=False):
+            self.stats["predictions"] += len(rows)
+
+    def purge(self) -> None:
+        cutoff = time.time() - self.retention_s
+        self.writer.submit("DELETE FROM sensor_samples WHERE timestamp < ?", [(cutoff,)], 0)
+        self.writer.submit("DELETE FROM rul_predictions WHERE timestamp < ?", [(cutoff,)], 0)
+        self.stats["purged"] += 1
+
+    # Startup
+
+    def holds(self, fleet_key: str) -> bool:
+        """Whether the stored data belongs to the fleet configuration `fleet_key`"""
+        with self._lock:
+            stored_key = self._db.execute("SELECT value FROM meta WHERE key = 'fleet_key'").fetchone()
+        return stored_key is not None and stored_key[0] == fleet_key
+
+    def restore(self, fleet_key: str, reset: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        The persisted equipment records, in fleet order, if they belong to
+        `fleet_key`. For a different fleet configuration None is returned
+        and, with `reset` (the writing process), everything stored is
+        dropped.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            stored_key = self._db.execute("SELECT value FROM meta WHERE key = 'fleet_key'").fetchone()
+            if stored_key is None or stored_key[0] != fleet_key:
+                if not reset:
+                    return None
+                self._db.execute("BEGIN IMMEDIATE")
+                for table in ("equipment_state", "sensor_samples", "rul_predictions"):
+                    self._db.execute(f"DELETE FROM {table}")
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fleet_key', ?)", (fleet_key,))
+                self._db.execute("COMMIT")
+                return None
+            rows = self._db.execute("SELECT record, health, rul, status FROM equipment_state "
+                                    "ORDER BY position").fetchall()
+        equipment = []
+        for record, health, rul, status in rows:
+            record = json.loads(record)
+            if health is not None:
+                # Anomaly alerts are not persisted: the detector warms up again
+                record.update(health=health, rul=rul, status=status,
+                              alerts=status_alerts(STATUS_NAMES.index(status), health < 80))
+            equipment.append(record)
+        self.stats["restored_equipment"] = len(equipment)
+        self.stats["restore_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return equipment or None
+
+    def replay(self) -> Iterator[Tuple[str, float, Dict[str, float]]]:
+        """(equipment_id, timestamp, reading) of the last `replay_minutes`, oldest first"""
+        cutoff = time.time() - self.replay_s
+        with self._lock:
+            rows = self._db.execute(f"SELECT equipment_id, timestamp, {SAMPLE_COLUMNS} FROM sensor_samples "
+                                    "WHERE timestamp >= ? ORDER BY timestamp", (cutoff,)).fetchall()
+        for row in rows:
+            yield row[0], row[1], {name: value for name, value in zip(SENSOR_NAMES, row[2:]) if value is not None}
+        self.stats["replayed_samples"] += len(rows)
+
+    # Reads
+
+    def predictions(self, equipment_id: str, start: Optional[float] = None, end: Optional[float] = None,
+                    limit: int = 1000) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT timestamp, dataset, model, rul FROM rul_predictions WHERE equipment_id = ? "
+                "AND timestamp BETWEEN ? AND ? ORDER BY timestamp DESC LIMIT ?",
+                (equipment_id, start if start is not None else 0.0, end if end is not None else time.time() + 1,
+                 limit)).fetchall()
+        return [{"timestamp": row[0], "dataset": row[1], "model": row[2], "rul": row[3]} for row in rows]
+
+    def flush(self, timeout_s: float = 30.0) -> bool:
+        return self.writer.flush(timeout_s)
+
+    def close(self) -> None:
+        self.writer.close()
+
+    def describe(self) -> Dict[str, Any]:
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal")
+                   if os.path.exists(self.path + suffix))
+        return {
+            "path": self.path,
+            "bytes": size,
+            "synchronous": self.synchronous,
+            "retention_h": self.retention_s / 3600,
+            "replay_minutes": self.replay_s / 60,
+            "state_every_ticks": self.state_every_ticks,
+            "holds_writer_lock": self._writer_fd is not None,
+            "writer": self.writer.describe(),
+            **self.stats,
+        }
+
+
+def create_durable_store() -> Optional[DurableStore]:
+    """Store configured from ORCA_PERSIST_* (disabled with ORCA_PERSIST=0)"""
+    if os.getenv("ORCA_PERSIST", "1").lower() in ("0", "false", "no"):
+        return None
+    return DurableStore(
+        path=os.getenv("ORCA_PERSIST_PATH", DEFAULT_PATH),
+        synchronous=os.getenv("ORCA_PERSIST_SYNC", "full"),
+        flush_ms=float(os.getenv("ORCA_PERSIST_FLUSH_MS", "100")),
+        retention_h=float(os.getenv("ORCA_PERSIST_RETENTION_H", "24")),
+        replay_minutes=float(os.getenv("ORCA_PERSIST_REPLAY_MIN", "15")),
+        state_every_ticks=int(os.getenv("ORCA_PERSIST_STATE_EVERY_TICKS", "1")),
+    )
+
+
+# Global instance for easy access
+durable_store = create_durable_store()
@@ -0,0 +1,193 @@
+"""
+ORCA PREDATOR - Ensemble Engine
+Runs the XGBoost, CNN+LSTM and CNN+BiLSTM+Attention models for one FD
+dataset concurrently and combines whatever finishes before the request's
+deadline into a weighted RUL estimate.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+import numpy as np
+
+from model_registry import ModelRegistry, build_feature_vector
+from prediction_cache import PredictionCache
+
+# Models used by each latency tier
+ENSEMBLE_TIERS = {
+    "fast": ["xgboost"],
+    "full": ["xgboost", "cnn_lstm", "cnn_bilstm_attn"],
+}
+
+# XGBoost alone unless a caller (or ORCA_ENSEMBLE_TIER) opts into the full
+# ensemble, which waits up to the deadline for the sequence models
+DEFAULT_TIER = os.getenv("ORCA_ENSEMBLE_TIER", "fast")
+DEFAULT_DEADLINE_MS = float(os.getenv("ORCA_ENSEMBLE_DEADLINE_MS", "250"))
+
+
+def parse_weights(spec: Optional[str]) -> Dict[str, float]:
+    """Parse "xgboost=2,cnn_lstm=1" into a weight per architecture"""
+    weights = {}
+    if not spec:
+        return weights
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        try:
+            weights[name.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid ensemble weight: {part.strip()}")
+        if weights[name.strip()] < 0:
+            raise ValueError(f"Ensemble weights must be non-negative: {part.strip()}")
+    return weights
+
+
+DEFAULT_WEIGHTS = parse_weights(os.getenv("ORCA_ENSEMBLE_WEIGHTS", "xgboost=1,cnn_lstm=1,cnn_bilstm_attn=1"))
+
+
+class EnsembleEngine:
+    """
+    Concurrent multi-architecture RUL prediction with a per-request deadline.
+
+    `snapshot_predictor(dataset, sensor_data)` scores the XGBoost model and
+    `window_predictor(dataset, architecture, windows)` a sequence model; both
+    are awaitables that run on the inference pool. Models that miss the
+    deadline are reported as "Timeout" and left out of the weighted mean.
+    Sequence models that are not loaded yet are reported as "Loading" while
+    `background_loader(dataset, architecture)` warms them up. With a `cache`,
+    repeat inputs are answered from it without touching the inference pool.
+    """
+
+    def __init__(self, registry: ModelRegistry,
+                 snapshot_predictor: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 window_predictor: Callable[[str, str, np.ndarray], Awaitable[np.ndarray]],
+                 background_loader: Callable[[str, str], Any],
+                 cache: Optional[PredictionCache] = None):
+        self.registry = registry
+        self.cache = cache
+        self.snapshot_predictor = snapshot_predictor
+        self.window_predictor = window_predictor
+        self.background_loader = background_loader
+        self.stats = {"requests": 0, "timeouts": 0, "errors": 0, "loading": 0}
+
+    def snapshot_window(self, dataset: str, architecture: str, sensor_data: Dict[str, Any]) -> np.ndarray:
+        """A steady-state window built by repeating one reading, for callers without history"""
+        spec = self.registry.specs[(dataset, architecture)]
+        values, _ = build_feature_vector(sensor_data, spec.features)
+        return np.tile(np.asarray(values, dtype=np.float32), (spec.window, 1))
+
+    async def _run_model(self, dataset: str, architecture: str, sensor_data: Dict[str, Any],
+                         window: Optional[np.ndarray]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        if architecture != "xgboost" and window is None:
+            window = self.snapshot_window(dataset, architecture, sensor_data)
+
+        cache_key = None
+        model = self.registry.peek(dataset, architecture) if self.cache else None
+        if model is not None:
+            if architecture == "xgboost":
+                inputs = np.asarray(build_feature_vector(sensor_data, model.features)[0], dtype=np.float32)
+            else:
+                inputs = window
+            cache_key = self.cache.make_key(model, inputs)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True, "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+        if architecture == "xgboost":
+            result = await self.snapshot_predictor(dataset, sensor_data)
+            if "error" in result:
+                raise ValueError(result["error"])
+        else:
+            rul = max(0, int((await self.window_predictor(dataset, architecture, window[np.newaxis]))[0]))
+            result = {"rul": rul}
+
+        if cache_key is not None:
+            self.cache.put(cache_key, dict(result))
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    async def predict(self, dataset: str, sensor_data: Dict[str, Any], tier: str = DEFAULT_TIER,
+                      deadline_ms: float = DEFAULT_DEADLINE_MS, weights: Optional[Dict[str, float]] = None,
+                      windows: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+        """
+        Run the tier's models in parallel and combine those that finish in time.
+        `windows` optionally supplies buffered history per sequence architecture.
+        """
+        if tier not in ENSEMBLE_TIERS:
+            raise ValueError(f"Unknown tier {tier}. Choose from {', '.join(ENSEMBLE_TIERS)}")
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        windows = windows or {}
+        self.stats["requests"] += 1
+
+        architectures = [arch for arch in ENSEMBLE_TIERS[tier] if self.registry.has(dataset, arch)]
+
+        # XGBoost loads in milliseconds, so a cold one is loaded before the
+        # deadline starts; it is the model every tier relies on
+        if "xgboost" in architectures and not self.registry.is_loaded(dataset, "xgboost"):
+            await asyncio.get_running_loop().run_in_executor(None, self.registry.get, dataset, "xgboost")
+
+        predictions: Dict[str, Any] = {arch: None for arch in architectures}
+        tasks = {}
+        cold = []
+        started = time.perf_counter()
+        for arch in architectures:
+            if arch != "xgboost" and not self.registry.is_loaded(dataset, arch):
+                cold.append(arch)
+                predictions[arch] = "Loading"
+                self.stats["loading"] += 1
+                continue
+            tasks[arch] = asyncio.ensure_future(self._run_model(dataset, arch, sensor_data, windows.get(arch)))
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=deadline_ms / 1000.0)
+
+        # Warm cold models only after this request's deadline, so importing
+        # TensorFlow does not compete with the models that are already ready
+        for arch in cold:
+            self.background_loader(dataset, arch)
+
+        latencies: Dict[str, float] = {}
+        cached: List[str] = []
+        sensors_used: List[str] = []
+        for arch, task in tasks.items():
+            if not task.done():
+                # The model keeps running on its pool thread; its result is discarded
+                task.cancel()
+                predictions[arch] = "Timeout"
+                self.stats["timeouts"] += 1
+            elif task.exception() is not None:
+                print(f"{arch} prediction error: {task.exception()}")
+                predictions[arch] = "Error"
+                self.stats["errors"] += 1
+            else:
+                result = task.result()
+                predictions[arch] = result["rul"]
+                latencies[arch] = result["latency_ms"]
+                if result.get("cached"):
+                    cached.append(arch)
+                if arch == "xgboost":
+                    sensors_used = result.get("sensors_used", [])
+
+        successful = {arch: rul for arch, rul in predictions.items() if isinstance(rul, int)}
+        total_weight = sum(weights.get(arch, 0.0) for arch in successful)
+        if successful and total_weight > 0:
+            ensemble_prediction = int(sum(rul * weights.get(arch, 0.0) for arch, rul in successful.items())
+                                      / total_weight)
+        elif successful:
+            ensemble_prediction = int(np.mean(list(successful.values())))
+        else:
+            ensemble_prediction = "No successful predictions"
+
+        return {
+            "predictions": predictions,
+            "ensemble_prediction": ensemble_prediction,
+            "tier": tier,
+            "weights": {arch: weights.get(arch, 0.0) for arch in architectures},
+            "deadline_ms": deadline_ms,
+            "latency_ms": {"total": round((time.perf_counter() - started) * 1000, 2), **latencies},
+            "cached": cached,
+            "sensors_used": sensors_used,
+        }
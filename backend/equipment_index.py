@@ -0,0 +1,182 @@
+"""
+ORCA PREDATOR - Equipment Index
+Hash and secondary indexes over the equipment list so lookups by ID and
+filtered, paginated listings do not scan the whole fleet on every request.
+"""
+
+import copy
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from mock_company import STATUS_NAMES
+
+# Fields with a posting list (value -> sorted positions in the equipment list)
+INDEXED_FIELDS = ("category", "status", "location", "site")
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class _IndexSnapshot:
+    """One consistent set of indexes; replaced as a whole, never mutated"""
+
+    def __init__(self, equipment: List[Dict[str, Any]], by_id: Dict[str, int],
+                 postings: Dict[str, Dict[Any, np.ndarray]], rul_sorted: np.ndarray, rul_order: np.ndarray,
+                 categories: Optional[List[Optional[str]]] = None):
+        self.equipment = equipment
+        self.by_id = by_id
+        self.postings = postings
+        # Category per position, so category lookups do not build records
+        self.categories = categories or []
+        self.rul_sorted = rul_sorted
+        self.rul_order = rul_order
+
+
+def _postings(values: np.ndarray) -> Dict[Any, np.ndarray]:
+    """Group positions by value; each group stays in ascending position order"""
+    if values.shape[0] == 0:
+        return {}
+    order = np.argsort(values, kind="stable")
+    keys, starts = np.unique(values[order], return_index=True)
+    groups = np.split(order, starts[1:])
+    return {key.item() if hasattr(key, "item") else key: group for key, group in zip(keys, groups)}
+
+
+class EquipmentIndex:
+    """
+    Primary index by equipment_id plus posting lists per INDEXED_FIELDS value
+    and RUL-sorted positions for range filters.
+
+    The list order defines positions and the pagination order. `rebuild`
+    swaps in a complete new snapshot, so readers never see a half-updated
+    index. When the IDs are unchanged (a simulation tick), only the status
+    and RUL indexes are recomputed, vectorized from the simulator arrays
+    when they are passed in.
+    """
+
+    def __init__(self):
+        self._snapshot = _IndexSnapshot([], {}, {field: {} for field in INDEXED_FIELDS}, _EMPTY, _EMPTY)
+        self._ids: List[str] = []
+        self.stats = {"rebuilds": 0, "refreshes": 0}
+
+    def __len__(self) -> int:
+        return len(self._snapshot.equipment)
+
+    def rebuild(self, equipment_list: List[Dict[str, Any]], status: Optional[np.ndarray] = None,
+                rul: Optional[np.ndarray] = None) -> None:
+        """
+        Index `equipment_list`. `status` (codes into STATUS_NAMES) and `rul`
+        may be given as arrays aligned with the list to skip reading them
+        from the records.
+        """
+        previous = self._snapshot
+        # A FleetRecords carries its IDs, so a tick does not build every record
+        ids = getattr(equipment_list, "ids", None)
+        if ids is None:
+            ids = [equipment["equipment_id"] for equipment in equipment_list]
+        if ids is self._ids or ids == self._ids:
+            by_id = previous.by_id
+            postings = {field: previous.postings[field] for field in INDEXED_FIELDS if field != "status"}
+            categories = previous.categories
+            self.stats["refreshes"] += 1
+        else:
+            by_id = {equipment_id: i for i, equipment_id in enumerate(ids)}
+            if len(by_id) != len(ids):
+                raise ValueError("Duplicate equipment IDs in equipment list")
+            postings = {
+                field: _postings(np.array([equipment.get(field) or "" for equipment in equipment_list], dtype=object))
+                for field in INDEXED_FIELDS if field != "status"
+            }
+            categories = [None] * len(ids)
+            for category, positions in postings["category"].items():
+                for position in positions.tolist():
+                    categories[position] = category or None
+            self.stats["rebuilds"] += 1
+
+        if status is None:
+            status = np.array([STATUS_NAMES.index(equipment["status"]) for equipment in equipment_list], dtype=np.int8)
+        postings["status"] = {STATUS_NAMES[code]: positions for code, positions in _postings(np.asarray(status)).items()}
+
+        rul_values = (np.asarray(rul, dtype=np.int64) if rul is not None
+                      else np.fromiter((equipment["rul"] for equipment in equipment_list), dtype=np.int64,
+                                       count=len(equipment_list)))
+        rul_order = np.argsort(rul_values, kind="stable")
+
+        self._snapshot = _IndexSnapshot(equipment_list, by_id, postings, rul_values[rul_order], rul_order,
+                                        categories)
+        self._ids = ids
+
+    def derive(self, equipment_list: List[Dict[str, Any]], status: Optional[np.ndarray] = None,
+               rul: Optional[np.ndarray] = None) -> "EquipmentIndex":
+        """A new index for `equipment_list`, leaving this one untouched (shares unchanged structures)"""
+        index = copy.copy(self)
+        index.rebuild(equipment_list, status, rul)
+        return index
+
+    def get(self, equipment_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        position = snapshot.by_id.get(equipment_id)
+        return snapshot.equipment[position] if position is not None else None
+
+    def category_of(self, equipment_id: str) -> Optional[str]:
+        snapshot = self._snapshot
+        position = snapshot.by_id.get(equipment_id)
+        return snapshot.categories[position] if position is not None else None
+
+    def ids(self, limit: Optional[int] = None) -> List[str]:
+        return self._ids[:limit] if limit is not None else list(self._ids)
+
+    def values(self, field: str) -> Dict[Any, int]:
+        """Machine count per value of an indexed field"""
+        return {value: int(positions.shape[0]) for value, positions in self._snapshot.postings[field].items()}
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, rul_min: Optional[int] = None,
+              rul_max: Optional[int] = None, cursor: Optional[str] = None,
+              limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """
+        Equipment matching every filter, in list order.
+
+        Returns (page, next_cursor, total matches). `cursor` is the
+        equipment_id of the last item of the previous page.
+        """
+        snapshot = self._snapshot
+        candidates: Optional[np.ndarray] = None
+
+        for field, value in (filters or {}).items():
+            if value is None:
+                continue
+            if field not in snapshot.postings:
+                raise ValueError(f"Cannot filter on {field}. Indexed fields: {', '.join(INDEXED_FIELDS)}")
+            positions = snapshot.postings[field].get(value, _EMPTY)
+            candidates = positions if candidates is None else np.intersect1d(candidates, positions, assume_unique=True)
+
+        if rul_min is not None or rul_max is not None:
+            lo = 0 if rul_min is None else int(np.searchsorted(snapshot.rul_sorted, rul_min, side="left"))
+            hi = (snapshot.rul_sorted.shape[0] if rul_max is None
+                  else int(np.searchsorted(snapshot.rul_sorted, rul_max, side="right")))
+            positions = np.sort(snapshot.rul_order[lo:hi])
+            candidates = positions if candidates is None else np.intersect1d(candidates, positions, assume_unique=True)
+
+        if candidates is None:
+            candidates = np.arange(len(snapshot.equipment))
+        total = int(candidates.shape[0])
+
+        start = 0
+        if cursor is not None:
+            after = snapshot.by_id.get(cursor)
+            if after is None:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            start = int(np.searchsorted(candidates, after, side="right"))
+        stop = total if limit is None else min(start + limit, total)
+
+        page = [snapshot.equipment[i] for i in candidates[start:stop].tolist()]
+        next_cursor = page[-1]["equipment_id"] if page and stop < total else None
+        return page, next_cursor, total
+
+    def describe(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "equipment": len(snapshot.equipment),
+            "indexed_fields": {field: len(values) for field, values in snapshot.postings.items()},
+            **self.stats,
+        }
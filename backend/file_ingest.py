@@ -0,0 +1,690 @@
+"""
+ORCA PREDATOR - File Ingest
+Streaming analysis of uploaded sensor files: CSV, JSONL and the raw
+whitespace-separated C-MAPSS train_FD00x.txt / test_FD00x.txt layout.
+
+The upload is parsed line by line as it arrives. Rows are grouped into
+units (engines or machines) and only each unit's last cycles are kept. A
+unit is scored as soon as its block of rows ends, together with the other
+units finished in the same chunk, in one vectorized call per model.
+Results are written back as NDJSON while the rest of the file is still
+being received. Memory is bounded by the read chunk and the open unit,
+not by the file size.
+"""
+
+import asyncio
+import codecs
+import csv
+import json
+import os
+import re
+import time
+import warnings
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator, Iterable
+
+import numpy as np
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from ensemble import DEFAULT_WEIGHTS
+from inference import predict_windows, run_inference
+from model_registry import model_registry
+
+FORMATS = ("csv", "jsonl", "cmapss")
+
+# Column layout of the raw C-MAPSS train/test files (no header)
+CMAPSS_COLUMNS = (["unit", "cycle"] + [f"op_setting_{i}" for i in range(1, 4)]
+                  + [f"sensor_{i}" for i in range(1, 22)])
+
+# Header names recognised as the unit and cycle columns
+UNIT_COLUMNS = ("unit", "unit_number", "unit_id", "engine", "engine_id", "equipment_id", "id")
+CYCLE_COLUMNS = ("cycle", "cycles", "time_cycles", "time_in_cycles")
+
+READ_CHUNK_BYTES = int(os.getenv("ORCA_INGEST_CHUNK_KB", "1024")) * 1024
+SCORE_BATCH_UNITS = int(os.getenv("ORCA_INGEST_BATCH_UNITS", "512"))
+# Longest line accepted before the upload is rejected
+MAX_LINE_BYTES = 1024 * 1024
+
+# First cycles of each unit form its baseline; later cycles with a sensor
+# more than ANOMALY_Z baseline standard deviations away are anomalous
+BASELINE_CYCLES = 20
+ANOMALY_Z = float(os.getenv("ORCA_INGEST_ANOMALY_Z", "4"))
+
+# RUL (cycles) at or below which a unit is reported critical / warning
+RUL_CRITICAL = 30
+RUL_WARNING = 60
+
+MAX_REPORTED_ERRORS = 20
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[\s\-]+", "_", name.strip().lower())
+
+
+def _to_float(value: Any) -> float:
+    if value is None or value == "":
+        return np.nan
+    return float(value)
+
+
+def dataset_from_filename(filename: Optional[str]) -> Optional[str]:
+    """FD001 from names like train_FD001.txt"""
+    match = re.search(r"FD00\d", filename or "", re.IGNORECASE)
+    return match.group(0).upper() if match else None
+
+
+def detect_format(filename: Optional[str], first_line: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".txt":
+        return "cmapss"
+    stripped = first_line.lstrip()
+    if stripped.startswith("{"):
+        return "jsonl"
+    return "csv" if "," in stripped else "cmapss"
+
+
+class RowBlock:
+    """Parsed rows of one chunk: unit label, cycle and feature values per row"""
+
+    def __init__(self, units: List[str], cycles: np.ndarray, values: np.ndarray):
+        self.units = units
+        self.cycles = cycles
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+
+class DelimitedParser:
+    """
+    CSV or whitespace-separated rows. A first row with any non-numeric field
+    is a header; without one, columns follow the C-MAPSS layout. Columns that
+    are not numeric in the first data row (names, timestamps, notes) are
+    skipped.
+    """
+
+    def __init__(self, fmt: str):
+        self.format = fmt
+        self.columns: Optional[List[str]] = None
+        self.unit_index: Optional[int] = None
+        self.cycle_index: Optional[int] = None
+        self.feature_indexes: List[int] = []
+        self.width = 0
+        self._checked = False
+
+    def _split(self, lines: List[str]) -> List[List[str]]:
+        if self.format == "csv":
+            return [[field.strip() for field in row] for row in csv.reader(lines)]
+        return [line.split() for line in lines]
+
+    def _set_header(self, names: List[str]) -> None:
+        names = [_normalize(name) for name in names]
+        self.width = len(names)
+        self.unit_index = next((i for i, name in enumerate(names) if name in UNIT_COLUMNS), None)
+        self.cycle_index = next((i for i, name in enumerate(names) if name in CYCLE_COLUMNS), None)
+        self.feature_indexes = [i for i in range(len(names)) if i not in (self.unit_index, self.cycle_index)]
+        self.columns = [names[i] for i in self.feature_indexes]
+
+    def _column(self, lines: List[str], index: int) -> List[str]:
+        if self.format == "csv":
+            return [row[index].strip() for row in csv.reader(lines)]
+        return [line.split(None, index + 1)[index] for line in lines]
+
+    def parse(self, lines: List[Tuple[int, str]]) -> Tuple[RowBlock, List[Tuple[int, str]]]:
+        texts = [line for _, line in lines]
+        numbers = [number for number, _ in lines]
+        if self.columns is None and texts:
+            first = self._split(texts[:1])[0]
+            try:
+                [float(field) for field in first if field]
+                names = CMAPSS_COLUMNS[:len(first)] + [f"column_{i}" for i in range(len(CMAPSS_COLUMNS), len(first))]
+                self._set_header(names)
+            except ValueError:
+                self._set_header(first)
+                texts, numbers = texts[1:], numbers[1:]
+        if not texts:
+            return RowBlock([], np.empty(0), np.empty((0, len(self.columns)))), []
+        if not self._checked:
+            first = self._split(texts[:1])[0]
+            numeric_fields = []
+            for i in self.feature_indexes:
+                try:
+                    if i < len(first):
+                        _to_float(first[i])
+                    numeric_fields.append(i)
+                except ValueError:
+                    pass
+            names = dict(zip(self.feature_indexes, self.columns))
+            self.feature_indexes = numeric_fields
+            self.columns = [names[i] for i in numeric_fields]
+            self._checked = True
+
+        errors = []
+        numeric = ([self.cycle_index] if self.cycle_index is not None else []) + self.feature_indexes
+        try:
+            # Fast path: numpy's C parser, which rejects short or non-numeric rows
+            table = np.loadtxt(texts, dtype=np.float64, delimiter="," if self.format == "csv" else None,
+                               quotechar='"', usecols=numeric, ndmin=2, comments=None)
+            units = self._column(texts, self.unit_index) if self.unit_index is not None else ["all"] * len(texts)
+        except (ValueError, IndexError):
+            width = self.width
+            units, value_rows = [], []
+            for number, row in zip(numbers, self._split(texts)):
+                try:
+                    if len(row) != width:
+                        raise ValueError(f"expected {width} fields, found {len(row)}")
+                    value_rows.append([_to_float(row[i]) for i in numeric])
+                    units.append(row[self.unit_index] if self.unit_index is not None else "all")
+                except ValueError as e:
+                    errors.append((number, str(e)))
+            table = np.array(value_rows, dtype=np.float64).reshape(len(units), len(numeric))
+
+        if self.cycle_index is not None:
+            cycles, values = table[:, 0], table[:, 1:]
+        else:
+            cycles, values = np.full(len(units), np.nan), table
+        return RowBlock(units, cycles, values), errors
+
+
+class JsonLinesParser:
+    """One JSON object per line; the numeric fields of the first record become the columns"""
+
+    format = "jsonl"
+
+    def __init__(self):
+        self.columns: Optional[List[str]] = None
+        self.unit_key: Optional[str] = None
+        self.cycle_key: Optional[str] = None
+
+    def _set_columns(self, record: Dict[str, Any]) -> None:
+        keys = {_normalize(key): key for key in record}
+        self.unit_key = next((keys[name] for name in UNIT_COLUMNS if name in keys), None)
+        self.cycle_key = next((keys[name] for name in CYCLE_COLUMNS if name in keys), None)
+        self.columns = [
+            key for key, value in record.items()
+            if key not in (self.unit_key, self.cycle_key)
+            and isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+
+    def parse(self, lines: List[Tuple[int, str]]) -> Tuple[RowBlock, List[Tuple[int, str]]]:
+        units, cycles, value_rows, errors = [], [], [], []
+        for number, line in lines:
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+                if self.columns is None:
+                    self._set_columns(record)
+                value_rows.append([_to_float(record.get(column)) for column in self.columns])
+                cycles.append(_to_float(record.get(self.cycle_key)) if self.cycle_key else np.nan)
+                units.append(str(record.get(self.unit_key, "all")) if self.unit_key else "all")
+            except (ValueError, TypeError) as e:
+                errors.append((number, str(e)))
+        values = np.array(value_rows, dtype=np.float64).reshape(len(units), len(self.columns or ()))
+        return RowBlock(units, np.array(cycles, dtype=np.float64), values), errors
+
+
+class UnitState:
+    """Running state of one unit's contiguous block of rows (only the last `window` rows are kept)"""
+
+    def __init__(self, unit: str, segment: int, n_features: int):
+        self.unit = unit
+        self.segment = segment
+        self.rows = 0
+        self.first_cycle: Optional[float] = None
+        self.last_cycle: Optional[float] = None
+        self.tail = np.empty((0, n_features), dtype=np.float64)
+        self._baseline: List[np.ndarray] = []
+        self.mean: Optional[np.ndarray] = None
+        self.std: Optional[np.ndarray] = None
+        self.anomalies = 0
+        self.sensor_anomalies = np.zeros(n_features, dtype=np.int64)
+
+    def add(self, cycles: np.ndarray, values: np.ndarray, window: int) -> None:
+        if self.first_cycle is None:
+            self.first_cycle = cycles[0]
+        self.last_cycle = cycles[-1]
+        self.rows += values.shape[0]
+        # Copy so the chunk the rows came from can be freed
+        self.tail = np.concatenate([self.tail, values[-window:]])[-window:].copy()
+
+        if self.mean is None:
+            needed = BASELINE_CYCLES - sum(rows.shape[0] for rows in self._baseline)
+            self._baseline.append(values[:needed].copy())
+            values = values[needed:]
+            if needed <= self._baseline[-1].shape[0]:
+                self._set_baseline()
+        if self.mean is not None and values.shape[0]:
+            with np.errstate(invalid="ignore"):
+                outliers = np.abs(values - self.mean) > ANOMALY_Z * self.std
+            outliers[:, ~(self.std > 0)] = False
+            self.anomalies += int(outliers.any(axis=1).sum())
+            self.sensor_anomalies += outliers.sum(axis=0)
+
+    def _set_baseline(self) -> None:
+        baseline = np.concatenate(self._baseline)
+        with warnings.catch_warnings():
+            # All-NaN columns (sensors missing from the file) have no baseline
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.mean = np.nanmean(baseline, axis=0)
+            self.std = np.nanstd(baseline, axis=0)
+        self._baseline = []
+
+
+class UnitAccumulator:
+    """Splits row blocks into per-unit runs and hands back units whose run has ended"""
+
+    def __init__(self, n_features: int, window: int):
+        self.n_features = n_features
+        self.window = window
+        self.current: Optional[UnitState] = None
+        self._segments: Dict[str, int] = {}
+
+    def add(self, block: RowBlock) -> List[UnitState]:
+        finished = []
+        if not len(block):
+            return finished
+        labels = np.asarray(block.units, dtype=object)
+        starts = [0, *(np.flatnonzero(labels[1:] != labels[:-1]) + 1).tolist()]
+        for start, stop in zip(starts, starts[1:] + [len(labels)]):
+            unit = labels[start]
+            if self.current is None or self.current.unit != unit:
+                if self.current is not None:
+                    finished.append(self.current)
+                # A unit that shows up again after other units starts a new segment
+                self._segments[unit] = self._segments.get(unit, 0) + 1
+                self.current = UnitState(unit, self._segments[unit], self.n_features)
+            cycles = block.cycles[start:stop]
+            if np.isnan(cycles).all():
+                cycles = np.arange(self.current.rows + 1, self.current.rows + 1 + stop - start, dtype=np.float64)
+            self.current.add(cycles, block.values[start:stop], self.window)
+        return finished
+
+    def finish(self) -> List[UnitState]:
+        finished = [self.current] if self.current is not None else []
+        self.current = None
+        return finished
+
+
+def feature_columns(columns: List[str], features: List[str]) -> np.ndarray:
+    """
+    Position of each model feature among the file columns (-1 = missing).
+    Columns are matched by name when any C-MAPSS feature name is present,
+    otherwise taken in order, as build_feature_vector does for sensor dicts.
+    """
+    positions = {name: i for i, name in enumerate(columns)}
+    if any(name in positions for name in features):
+        return np.array([positions.get(name, -1) for name in features], dtype=np.int64)
+    return np.array([i if i < len(columns) else -1 for i in range(len(features))], dtype=np.int64)
+
+
+def _gather(values: np.ndarray, indexes: np.ndarray) -> np.ndarray:
+    """Select model features along the last axis; missing features and values become 0"""
+    matrix = values[..., np.maximum(indexes, 0)].astype(np.float32)
+    matrix[..., indexes < 0] = 0.0
+    return np.nan_to_num(matrix, nan=0.0)
+
+
+def _padded(tail: np.ndarray, window: int) -> np.ndarray:
+    """Last `window` rows; short histories repeat their earliest row"""
+    if tail.shape[0] >= window:
+        return tail[-window:]
+    return np.concatenate([np.repeat(tail[:1], window - tail.shape[0], axis=0), tail])
+
+
+def score_units(dataset: str, architectures: List[str], columns: List[str], units: List[UnitState],
+                weights: Dict[str, float]) -> List[Dict[str, Any]]:
+    """RUL per unit with one predict call per model (runs on the inference pool)"""
+    predictions: Dict[str, np.ndarray] = {}
+    for architecture in architectures:
+        model = model_registry.get(dataset, architecture)
+        indexes = feature_columns(columns, model.features)
+        if model.window is None:
+            matrix = _gather(np.stack([unit.tail[-1] for unit in units]), indexes)
+            predictions[architecture] = np.maximum(model.predict(model.scale(matrix)), 0)
+        else:
+            windows = _gather(np.stack([_padded(unit.tail, model.window) for unit in units]), indexes)
+            predictions[architecture] = predict_windows(dataset, architecture, windows)
+
+    total_weight = sum(weights.get(architecture, 0.0) for architecture in architectures)
+    results = []
+    for row, unit in enumerate(units):
+        unit_predictions = {architecture: int(values[row]) for architecture, values in predictions.items()}
+        if total_weight > 0:
+            rul = int(sum(rul * weights.get(architecture, 0.0) for architecture, rul in unit_predictions.items())
+                      / total_weight)
+        else:
+            rul = int(np.mean(list(unit_predictions.values())))
+        status = "critical" if rul <= RUL_CRITICAL else "warning" if rul <= RUL_WARNING else "healthy"
+        result = {
+            "type": "unit",
+            "unit": unit.unit,
+            "rows": unit.rows,
+            "first_cycle": int(unit.first_cycle),
+            "last_cycle": int(unit.last_cycle),
+            "predictions": unit_predictions,
+            "rul": rul,
+            "status": status,
+            "anomalies": unit.anomalies,
+            "anomalous_sensors": {columns[i]: int(n) for i, n in enumerate(unit.sensor_anomalies) if n},
+        }
+        if unit.segment > 1:
+            result["segment"] = unit.segment
+        results.append(result)
+    return results
+
+
+class UploadStream:
+    """
+    Bytes of an uploaded file as they arrive: the first file part of a
+    multipart/form-data body, or the raw request body. `filename` is set
+    once the part headers have been read.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], content_type: str):
+        self.chunks = chunks
+        self.content_type, params = parse_options_header(content_type or "")
+        self.content_type = self.content_type.decode("latin-1").lower()
+        self.boundary = params.get(b"boundary")
+        self.filename: Optional[str] = None
+        if self.content_type == "multipart/form-data" and not self.boundary:
+            raise ValueError("Multipart upload without a boundary")
+
+    @property
+    def is_multipart(self) -> bool:
+        return self.content_type == "multipart/form-data"
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if not self.is_multipart:
+            async for chunk in self.chunks:
+                yield chunk
+            return
+
+        pending: List[bytes] = []
+        headers: Dict[bytes, bytes] = {}
+        part = {"field": b"", "value": b"", "selected": False, "done": False}
+
+        def on_part_begin():
+            headers.clear()
+
+        def on_header_field(data, start, end):
+            part["field"] += data[start:end]
+
+        def on_header_value(data, start, end):
+            part["value"] += data[start:end]
+
+        def on_header_end():
+            headers[part["field"].lower()] = part["value"]
+            part["field"], part["value"] = b"", b""
+
+        def on_headers_finished():
+            _, options = parse_options_header(headers.get(b"content-disposition", b""))
+            if not part["done"] and (b"filename" in options or options.get(b"name") == b"file"):
+                part["selected"] = True
+                self.filename = options.get(b"filename", b"").decode("utf-8", "replace") or None
+
+        def on_part_data(data, start, end):
+            if part["selected"]:
+                pending.append(bytes(data[start:end]))
+
+        def on_part_end():
+            if part["selected"]:
+                part["selected"], part["done"] = False, True
+
+        parser = MultipartParser(self.boundary, {
+            "on_part_begin": on_part_begin, "on_header_field": on_header_field,
+            "on_header_value": on_header_value, "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished, "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+        async for chunk in self.chunks:
+            parser.write(chunk)
+            for data in pending:
+                yield data
+            pending.clear()
+            if part["done"]:
+                return
+        if not part["done"]:
+            raise ValueError("No file found in the upload (send it as the 'file' field)")
+
+
+class UploadResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator is still reading the request.
+    The stock one listens for a disconnect by reading the request messages
+    itself, which would swallow the upload; here the generator owns
+    `receive` and sees a disconnect as ClientDisconnect from the stream.
+    """
+
+    async def listen_for_disconnect(self, receive: Any) -> None:
+        await asyncio.Event().wait()
+
+
+class FileAnalysis:
+    """
+    One streaming analysis: feed it an UploadStream with `run` and it
+    yields NDJSON lines: a "start" record, a "unit" record per scored unit,
+    "error" records for unparseable rows, and a final "summary".
+    """
+
+    def __init__(self, architectures: List[str], dataset: Optional[str] = None, fmt: Optional[str] = None,
+                 weights: Optional[Dict[str, float]] = None, default_dataset: str = "FD001"):
+        self.requested_architectures = architectures
+        self.dataset = dataset
+        self.default_dataset = default_dataset
+        self.format = fmt
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.architectures: List[str] = []
+        self.parser = None
+        self.accumulator: Optional[UnitAccumulator] = None
+        self.stats = {"bytes": 0, "lines": 0, "rows": 0, "units": 0, "parse_errors": 0}
+        self._ruls: List[int] = []
+        self._lowest: Optional[Tuple[int, str]] = None
+        self._statuses = {"healthy": 0, "warning": 0, "critical": 0}
+        self._anomalies = 0
+        self._sensor_anomalies: Dict[str, int] = {}
+
+    @staticmethod
+    def _line(record: Dict[str, Any]) -> str:
+        return json.dumps(record) + "\n"
+
+    async def _start(self, filename: Optional[str], first_line: str) -> Dict[str, Any]:
+        """Pick format, dataset and models once the first line is known, and load the models"""
+        self.format = self.format or detect_format(filename, first_line)
+        self.dataset = self.dataset or dataset_from_filename(filename) or self.default_dataset
+        if not model_registry.has(self.dataset, "xgboost"):
+            raise ValueError(f"Unknown dataset {self.dataset}. Available datasets: {model_registry.datasets()}")
+        self.architectures = [arch for arch in self.requested_architectures
+                              if model_registry.has(self.dataset, arch)]
+        windows = []
+        for architecture in self.architectures:
+            model = await run_inference(model_registry.get, self.dataset, architecture)
+            windows.append(model.window or 1)
+        self.window = max(windows)
+        self.parser = JsonLinesParser() if self.format == "jsonl" else DelimitedParser(self.format)
+        return {
+            "type": "start",
+            "filename": filename,
+            "format": self.format,
+            "dataset": self.dataset,
+            "models": self.architectures,
+            "window": self.window,
+        }
+
+    def _parse(self, lines: List[Tuple[int, str]]) -> Tuple[List[UnitState], List[Tuple[int, str]]]:
+        """Parse one chunk of lines and advance the per-unit state (runs on a worker thread)"""
+        block, errors = self.parser.parse(lines)
+        if self.accumulator is None and self.parser.columns is not None:
+            self.accumulator = UnitAccumulator(len(self.parser.columns), self.window)
+        self.stats["rows"] += len(block)
+        self.stats["parse_errors"] += len(errors)
+        finished = self.accumulator.add(block) if self.accumulator is not None else []
+        return finished, errors
+
+    def _record(self, result: Dict[str, Any]) -> None:
+        self.stats["units"] += 1
+        self._ruls.append(result["rul"])
+        if self._lowest is None or result["rul"] < self._lowest[0]:
+            self._lowest = (result["rul"], result["unit"])
+        self._statuses[result["status"]] += 1
+        self._anomalies += result["anomalies"]
+        for sensor, count in result["anomalous_sensors"].items():
+            self._sensor_anomalies[sensor] = self._sensor_anomalies.get(sensor, 0) + count
+
+    async def _score(self, units: List[UnitState]) -> List[Dict[str, Any]]:
+        results = []
+        for start in range(0, len(units), SCORE_BATCH_UNITS):
+            results.extend(await run_inference(score_units, self.dataset, self.architectures, self.parser.columns,
+                                               units[start:start + SCORE_BATCH_UNITS], self.weights))
+        return results
+
+    def _error_lines(self, errors: List[Tuple[int, str]]) -> Iterable[str]:
+        reported = self.stats["parse_errors"] - len(errors)
+        for number, message in errors:
+            if reported >= MAX_REPORTED_ERRORS:
+                break
+            reported += 1
+            yield self._line({"type": "error", "line": number, "error": message})
+
+    def summary(self, elapsed_s: float) -> Dict[str, Any]:
+        units = self.stats["units"]
+        top_sensors = sorted(self._sensor_anomalies.items(), key=lambda item: -item[1])[:3]
+        recommendations = []
+        if self._statuses["critical"]:
+            recommendations.append(
+                f"Schedule maintenance for {self._statuses['critical']} units predicted to fail within "
+                f"{RUL_CRITICAL} cycles (lowest: unit {self._lowest[1]} at {self._lowest[0]} cycles)"
+            )
+        if self._statuses["warning"]:
+            recommendations.append(
+                f"Plan inspections for {self._statuses['warning']} units with under {RUL_WARNING} cycles of RUL"
+            )
+        if top_sensors:
+            recommendations.append(
+                "Investigate drifting sensors: " + ", ".join(f"{sensor} ({count} cycles)" for sensor, count in top_sensors)
+            )
+        if self.stats["parse_errors"]:
+            recommendations.append(f"{self.stats['parse_errors']} rows could not be parsed; check the file format")
+        if not recommendations:
+            recommendations.append("No units need attention; continue routine monitoring")
+        return {
+            "type": "summary",
+            "format": self.format,
+            "dataset": self.dataset,
+            **self.stats,
+            "healthy_units": self._statuses["healthy"],
+            "warning_units": self._statuses["warning"],
+            "critical_units": self._statuses["critical"],
+            "predicted_rul": int(np.mean(self._ruls)) if units else None,
+            "rul_percentiles": ({f"p{p}": int(np.percentile(self._ruls, p)) for p in (10, 50, 90)}
+                                if units else None),
+            "anomalies_found": self._anomalies,
+            "anomalous_sensors": dict(top_sensors),
+            "recommendations": recommendations,
+            "elapsed_s": round(elapsed_s, 3),
+            "analysis_timestamp": datetime.now().isoformat(),
+        }
+
+    async def run(self, upload: UploadStream) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        partial = ""
+        line_number = 0
+        scoring: Optional[asyncio.Future] = None
+        try:
+            async for chunk in self._chunks(upload):
+                final = not chunk
+                self.stats["bytes"] += len(chunk)
+                text = partial + decoder.decode(chunk, final=final)
+                lines = text.split("\n")
+                partial = "" if final else lines.pop()
+                if len(partial) > MAX_LINE_BYTES:
+                    raise ValueError(f"Line {line_number + len(lines) + 1} is longer than {MAX_LINE_BYTES} bytes")
+
+                numbered = []
+                for line in lines:
+                    line_number += 1
+                    line = line.rstrip("\r")
+                    if line.strip():
+                        numbered.append((line_number, line))
+                self.stats["lines"] = line_number
+
+                finished, errors = [], []
+                if numbered:
+                    if self.parser is None:
+                        yield self._line(await self._start(upload.filename, numbered[0][1]))
+                    finished, errors = await loop.run_in_executor(None, self._parse, numbered)
+                if final and self.accumulator is not None:
+                    finished += self.accumulator.finish()
+                for line in self._error_lines(errors):
+                    yield line
+
+                # Score this chunk's units while the next chunk is read and parsed
+                if scoring is not None:
+                    for result in await scoring:
+                        self._record(result)
+                        yield self._line(result)
+                scoring = asyncio.ensure_future(self._score(finished)) if finished else None
+
+            if scoring is not None:
+                for result in await scoring:
+                    self._record(result)
+                    yield self._line(result)
+                scoring = None
+            yield self._line(self.summary(time.perf_counter() - started))
+        except ClientDisconnect:
+            return
+        except Exception as e:
+            yield self._line({"type": "error", "error": str(e), "line": line_number or None})
+        finally:
+            if scoring is not None:
+                scoring.cancel()
+
+    @staticmethod
+    async def _chunks(upload: UploadStream) -> AsyncIterator[bytes]:
+        """The upload's chunks followed by an empty chunk marking the end"""
+        async for chunk in upload:
+            if chunk:
+                yield chunk
+        yield b""
+
+
+async def iter_file_chunks(path: str, chunk_size: int = READ_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from ensemble import ENSEMBLE_TIERS
+
+    parser = argparse.ArgumentParser(description="Stream a sensor file through the RUL models and print NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--dataset", default=None, help="FD001-FD004 (default: from the file name, else FD001)")
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--tier", choices=list(ENSEMBLE_TIERS), default="full")
+    parser.add_argument("--summary-only", action="store_true")
+    args = parser.parse_args()
+
+    async def main():
+        upload = UploadStream(iter_file_chunks(args.path), "application/octet-stream")
+        upload.filename = os.path.basename(args.path)
+        analysis = FileAnalysis(ENSEMBLE_TIERS[args.tier], args.dataset, args.format)
+        async for line in analysis.run(upload):
+            if not args.summary_only or '"type": "summary"' in line or '"type": "error"' in line:
+                sys.stdout.write(line)
+
+    asyncio.run(main())
@@ -0,0 +1,254 @@
+"""
+ORCA PREDATOR - Fleet Generator
+Configurable large-fleet generator for capacity planning: any number of sites
+with any number of machines per equipment category, a collision-free ID
+scheme, and chunked streaming so 1M-machine fleets never exist as one list.
+
+IDs are "S<site>-<category code>-<serial>", e.g. "S0003-BC-000017", where the
+serial counts machines of that category within the site. Fields are drawn
+per block of SEED_BLOCK machines from a Generator seeded by (seed, block), so
+the same configuration yields the same fleet whatever the chunk size.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterator, Optional, Union
+
+import numpy as np
+
+from mock_company import MAX_LIFE_HOURS, STATUS_NAMES, life_class, marias_margheritas_mock, status_alerts
+
+DEFAULT_CHUNK_SIZE = 10000
+SEED_BLOCK = 4096
+
+# Columns written to / read from NPZ dumps
+NPZ_COLUMNS = (
+    "site", "category", "serial", "health", "rul", "status", "cycle_count",
+    "last_maintenance_days_ago", "maintenance_interval_days", "installed_days_ago", "manufacturer",
+)
+
+
+class FleetGenerator:
+    """
+    Deterministic fleet of `sites` x (machines per category) machines.
+
+    `machines_per_category` is either one count for every category or a
+    mapping of category -> count; machine names cycle through each category's
+    catalogue of Maria's Margheritas machines.
+    """
+
+    def __init__(self, sites: int = 1, machines_per_category: Union[int, Dict[str, int], None] = None,
+                 seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE, as_of: Optional[datetime] = None):
+        catalogue = marias_margheritas_mock.equipment_categories
+        if machines_per_category is None:
+            machines_per_category = {category: details["count"] for category, details in catalogue.items()}
+        elif isinstance(machines_per_category, int):
+            machines_per_category = {category: machines_per_category for category in catalogue}
+        unknown = set(machines_per_category) - set(catalogue)
+        if unknown:
+            raise ValueError(f"Unknown categories: {', '.join(sorted(unknown))}")
+        if sites < 1 or any(count < 0 for count in machines_per_category.values()):
+            raise ValueError("sites must be >= 1 and machine counts >= 0")
+
+        self.sites = sites
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.as_of = (as_of or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.categories = [category for category in catalogue if machines_per_category.get(category, 0) > 0]
+        self.counts = np.array([machines_per_category[category] for category in self.categories], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        self.machines_per_site = int(self.offsets[-1])
+        self.total = self.sites * self.machines_per_site
+
+        self.site_width = max(4, len(str(sites - 1)))
+        self.serial_width = max(6, len(str(int(self.counts.max(initial=1)) - 1)))
+
+        self.codes = [marias_margheritas_mock.category_codes[category] for category in self.categories]
+        self.names = [catalogue[category]["machines"] for category in self.categories]
+        self.max_life = [
+            MAX_LIFE_HOURS[[life_class(name) for name in names]] for names in self.names
+        ]
+        self.locations = [marias_margheritas_mock.locations[category] for category in self.categories]
+        self.manufacturers = [marias_margheritas_mock.manufacturers[category] for category in self.categories]
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "sites": self.sites,
+            "machines_per_category": dict(zip(self.categories, self.counts.tolist())),
+            "seed": self.seed,
+            "as_of": self.as_of.strftime("%Y-%m-%d"),
+            "total": self.total,
+        }
+
+    def __len__(self) -> int:
+        return self.total
+
+    def equipment_id(self, site: int, category: int, serial: int) -> str:
+        return f"S{site:0{self.site_width}d}-{self.codes[category]}-{serial:0{self.serial_width}d}"
+
+    def machine_name(self, category: int, serial: int) -> str:
+        names = self.names[category]
+        return names[serial % len(names)]
+
+    def _chunk_arrays(self, start: int, stop: int) -> Dict[str, np.ndarray]:
+        """Every generated column for global machine indices [start, stop)"""
+        blocks = [self._block_arrays(block) for block in range(start // SEED_BLOCK, (stop - 1) // SEED_BLOCK + 1)]
+        offset = start - (start // SEED_BLOCK) * SEED_BLOCK
+        return {
+            name: np.concatenate([block[name] for block in blocks])[offset:offset + stop - start]
+            for name in blocks[0]
+        }
+
+    def _block_arrays(self, block: int) -> Dict[str, np.ndarray]:
+        rng = np.random.default_rng([self.seed, block])
+        start = block * SEED_BLOCK
+        index = np.arange(start, min(start + SEED_BLOCK, self.total), dtype=np.int64)
+        n = index.shape[0]
+        site, within_site = np.divmod(index, self.machines_per_site)
+        category = np.searchsorted(self.offsets, within_site, side="right") - 1
+        serial = within_site - self.offsets[category]
+
+        # Same distributions as MariasMargheritasMockData.generate_equipment_data
+        health = np.clip(rng.uniform(75, 95, n) * rng.uniform(0.8, 1.2, n), 60, 100)
+        max_life = np.empty(n)
+        for c in range(len(self.categories)):
+            mask = category == c
+            lives = self.max_life[c]
+            max_life[mask] = lives[serial[mask] % len(lives)]
+        rul = (max_life * (health / 100) * rng.uniform(0.3, 0.8, n)).astype(np.int64)
+        status = np.where(health >= 85, 0, np.where(health >= 70, 1, 2)).astype(np.int8)
+
+        return {
+            "site": site.astype(np.int32),
+            "category": category.astype(np.int8),
+            "serial": serial.astype(np.int32),
+            "health": np.round(health, 1),
+            "rul": rul,
+            "status": status,
+            "cycle_count": rng.integers(1000, 50001, n, dtype=np.int32),
+            "last_maintenance_days_ago": rng.integers(1, 91, n, dtype=np.int16),
+            "maintenance_interval_days": rng.integers(7, 31, n, dtype=np.int16),
+            "installed_days_ago": rng.integers(100, 801, n, dtype=np.int16),
+            "manufacturer": rng.integers(0, 3, n, dtype=np.int8),
+        }
+
+    def iter_arrays(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Stream the fleet as column arrays, `chunk_size` machines at a time"""
+        for start in range(0, self.total, self.chunk_size):
+            yield self._chunk_arrays(start, min(start + self.chunk_size, self.total))
+
+    def records(self, arrays: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Equipment records in the generate_equipment_data format for one chunk of arrays"""
+        day = timedelta(days=1)
+        columns = {name: values.tolist() for name, values in arrays.items()}
+        records = []
+        for i in range(len(columns["site"])):
+            site, category, serial = columns["site"][i], columns["category"][i], columns["serial"][i]
+            health, status = columns["health"][i], columns["status"][i]
+            name = self.machine_name(category, serial)
+            last_maintenance = self.as_of - day * columns["last_maintenance_days_ago"][i]
+            records.append({
+                "equipment_id": self.equipment_id(site, category, serial),
+                "name": name,
+                "category": self.categories[category],
+                "fd_type": name,
+                "health": health,
+                "rul": columns["rul"][i],
+                "cycle_count": columns["cycle_count"][i],
+                "status": STATUS_NAMES[status],
+                "last_maintenance": last_maintenance.strftime("%Y-%m-%d"),
+                "next_maintenance": (last_maintenance + day * columns["maintenance_interval_days"][i]).strftime("%Y-%m-%d"),
+                "alerts": status_alerts(status, health < 80),
+                "location": self.locations[category],
+                "site": f"Site {site:0{self.site_width}d}",
+                "manufacturer": self.manufacturers[category][columns["manufacturer"][i]],
+                "installation_date": (self.as_of - day * columns["installed_days_ago"][i]).strftime("%Y-%m-%d"),
+            })
+        return records
+
+    def iter_chunks(self) -> Iterator[List[Dict[str, Any]]]:
+        """Stream equipment records in lists of at most `chunk_size`"""
+        for arrays in self.iter_arrays():
+            yield self.records(arrays)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def write_jsonl(self, path: str) -> int:
+        """Write one equipment record per line; returns the number of records"""
+        written = 0
+        with open(path, "w") as f:
+            for chunk in self.iter_chunks():
+                f.write("".join(json.dumps(record) + "\n" for record in chunk))
+                written += len(chunk)
+        return written
+
+    def write_npz(self, path: str) -> int:
+        """Write the fleet's columns (plus its configuration) to a compressed NPZ file"""
+        columns: Dict[str, List[np.ndarray]] = {name: [] for name in NPZ_COLUMNS}
+        for arrays in self.iter_arrays():
+            for name in NPZ_COLUMNS:
+                columns[name].append(arrays[name])
+        np.savez_compressed(
+            path,
+            config=np.array(json.dumps(self.config())),
+            **{name: np.concatenate(parts) if parts else np.empty(0) for name, parts in columns.items()},
+        )
+        return self.total
+
+
+def iter_fleet_file(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Replay a fleet dumped with write_jsonl / write_npz as chunks of equipment records"""
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            config = json.loads(str(data["config"]))
+            generator = FleetGenerator(config["sites"], config["machines_per_category"], config["seed"],
+                                       chunk_size, datetime.strptime(config["as_of"], "%Y-%m-%d"))
+            columns = {name: data[name] for name in NPZ_COLUMNS}
+        for start in range(0, generator.total, chunk_size):
+            yield generator.records({name: values[start:start + chunk_size] for name, values in columns.items()})
+        return
+
+    chunk = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                chunk.append(json.loads(line))
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate a large ORCA equipment fleet for capacity planning")
+    parser.add_argument("--sites", type=int, default=10)
+    parser.add_argument("--machines-per-category", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--as-of", help="Reference date (YYYY-MM-DD) for maintenance and installation dates")
+    parser.add_argument("--output", help="Write the fleet to a .jsonl or .npz file")
+    args = parser.parse_args()
+
+    as_of = datetime.strptime(args.as_of, "%Y-%m-%d") if args.as_of else None
+    fleet = FleetGenerator(args.sites, args.machines_per_category, args.seed, args.chunk_size, as_of)
+    print(f"🏭 Fleet: {fleet.total} machines across {fleet.sites} site(s) (seed {fleet.seed})")
+    started = time.perf_counter()
+    if args.output:
+        if args.output.endswith(".npz"):
+            count = fleet.write_npz(args.output)
+        elif args.output.endswith(".jsonl"):
+            count = fleet.write_jsonl(args.output)
+        else:
+            parser.error("--output must end in .jsonl or .npz")
+        size_mb = os.path.getsize(args.output) / 1e6
+        print(f"✅ Wrote {count} machines to {args.output} ({size_mb:.1f} MB) in {time.perf_counter() - started:.1f}s")
+    else:
+        count = sum(len(chunk) for chunk in fleet.iter_chunks())
+        print(f"✅ Streamed {count} records in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,499 @@
+"""
+ORCA PREDATOR - Fleet State
+The simulated fleet as one immutable snapshot (equipment, latest sensor
+readings, summary and equipment index) behind a single reference.
+
+Each tick builds the next snapshot off to the side, on a worker thread, and
+publishes it by swapping the reference. Readers take `fleet_state.current`
+once per request and see one consistent tick without locking: never a new
+equipment list next to old sensor data.
+
+The simulating process also records every tick in the durable store (see
+durable_store) and, on startup, continues the persisted fleet and replays
+its recent readings into the in-memory history. Only one process writes:
+the shared fleet's owner, or, with the in-memory backend, the holder of
+the durable store's writer lock (see `persists`).
+
+With ORCA_FLEET_BACKEND=sqlite, several API processes share one fleet
+through a FleetStore (see fleet_store). One process owns and advances the
+simulation. The others follow it and build the same snapshots from the
+ticks it publishes.
+"""
+
+import asyncio
+import os
+import time
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+
+import numpy as np
+
+from anomaly_detector import create_anomaly_detector
+from durable_store import DurableStore, durable_store
+from equipment_index import EquipmentIndex
+from fleet_store import FleetStore, PublishedDetector, create_fleet_store
+from fleet_summary import fleet_summary
+from live_updates import LiveFrame, live_updates, diff_equipment, diff_summary
+from mock_company import FleetSimulator, FleetRecords, FleetReadings, SENSOR_NAMES, marias_margheritas_mock
+from sequence_buffers import sequence_buffers
+from timeseries_store import sensor_history
+
+# Seconds between background simulation ticks (0 disables the ticker)
+SIMULATION_TICK_S = float(os.getenv("ORCA_SIM_TICK_S", "5"))
+
+
+class FleetSnapshot:
+    """
+    The fleet at one tick. Nothing in a published snapshot is mutated: the
+    next tick builds new containers and shares only unchanged records.
+    """
+
+    __slots__ = ("tick", "timestamp", "equipment", "sensor_data", "summary", "index", "anomalies")
+
+    def __init__(self, tick: int, timestamp: float, equipment: List[Dict[str, Any]],
+                 sensor_data: Dict[str, Dict[str, Any]], summary: Dict[str, Any], index: EquipmentIndex,
+                 anomalies: Tuple[Dict[str, Any], ...] = ()):
+        self.tick = tick
+        self.timestamp = timestamp
+        self.equipment = equipment
+        # FleetReadings is read-only already; plain dicts get a read-only proxy
+        self.sensor_data = sensor_data if isinstance(sensor_data, FleetReadings) else MappingProxyType(sensor_data)
+        self.summary = MappingProxyType(summary)
+        self.index = index
+        # Sensor anomalies active at this tick (see anomaly_detector)
+        self.anomalies = anomalies
+
+
+def record_history(equipment_id: str, sensor_data: Dict[str, Any], timestamp: Optional[float] = None) -> None:
+    """Append a reading to the equipment's time series and sequence window"""
+    sensor_history.append(equipment_id, sensor_data, timestamp)
+    sequence_buffers.append(equipment_id, sensor_data)
+
+
+def record_fleet_history(simulator: FleetSimulator, timestamp: float) -> None:
+    """Append the whole fleet's current readings to the time series and sequence windows, in bulk"""
+    sensor_history.append_frame(simulator.equipment_ids, timestamp, simulator.sensors, SENSOR_NAMES)
+    sequence_buffers.append_matrix(simulator.equipment_ids, simulator.sensors, SENSOR_NAMES)
+
+
+class FleetState:
+    """
+    Owner of the current FleetSnapshot and the simulation that advances it.
+
+    Ticks (background or `/api/mock/simulate`) are serialized by one asyncio
+    lock; the simulator and summary engine are only touched by the tick
+    being built.
+
+    With a shared `store` the process is either the "owner" (simulates and
+    publishes) or a "follower" (mirrors the published ticks; its simulator
+    only holds the owner's arrays, and its tick requests go to the owner).
+    """
+
+    def __init__(self, store: Optional[FleetStore] = None, durable: Optional[DurableStore] = None):
+        self.current = FleetSnapshot(0, time.time(), [], {}, {}, EquipmentIndex())
+        self.simulator: Optional[FleetSimulator] = None
+        self.store = store
+        self.durable = durable
+        self.role = "owner"
+        self._seed: Optional[int] = None
+        self._fleet_key = ""
+        self._tick_lock = asyncio.Lock()
+        # Out-of-band readings recorded while a tick is being built (None when none is)
+        self._late_readings: Optional[Dict[str, Dict[str, Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._requests_task: Optional[asyncio.Task] = None
+        self.interval_s = 0.0
+        self.stats = {"ticks": 0, "errors": 0, "last_tick_ms": None, "max_tick_ms": 0.0, "followed_ticks": 0}
+
+    def initialize(self, load_equipment: Callable[[], List[Dict[str, Any]]], seed: Optional[int] = None,
+                   fleet_key: str = "") -> FleetSnapshot:
+        """
+        Build tick 0 from the equipment `load_equipment` returns and publish
+        it. With a shared store only the owner loads equipment: the other
+        processes wait for its first tick. `fleet_key` identifies the fleet
+        configuration; a published or persisted fleet with the same key is
+        continued.
+        """
+        self._seed, self._fleet_key = seed, fleet_key
+        self._replay_history()
+        if self.store is None:
+            return self._initialize_owner(self._restore_or_load(load_equipment), seed)
+        while True:
+            claim = self.store.claim(fleet_key)
+            if claim == "new":
+                self.role = "owner"
+                snapshot = self._initialize_owner(self._restore_or_load(load_equipment), seed)
+                if self.store.publish_fleet(fleet_key, snapshot.equipment) is None:
+                    # Lost the lease while generating the fleet: follow the new owner's
+                    continue
+                self._publish(snapshot)
+                return snapshot
+            published = self.store.load_tick()
+            if published is not None:
+                snapshot, _ = self._apply_published(self.current, published, with_deltas=False)
+                if snapshot is not None:
+                    self.current = snapshot
+                    if claim == "resume":
+                        self._become_owner()
+                    else:
+                        self.role = "follower"
+                    return snapshot
+            time.sleep(self.store.poll_s)
+
+    def persists(self) -> bool:
+        """
+        Whether this process writes ticks and readings to the durable store:
+        with a shared fleet only its owner does; with per-process fleets
+        (pre-forked workers on the memory backend) only the process holding
+        the store's writer lock, so they do not all append the same samples
+        and overwrite each other's equipment state.
+        """
+        if self.durable is None:
+            return False
+        if self.store is not None:
+            return self.store.is_owner
+        return self.durable.claim_writer()
+
+    def _restore_or_load(self, load_equipment: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        equipment_list = (self.durable.restore(self._fleet_key, reset=self.persists())
+                          if self.durable is not None else None)
+        if equipment_list is None:
+            return load_equipment()
+        print(f"💾 Restored {len(equipment_list)} machines from {self.durable.path} "
+              f"in {self.durable.stats['restore_ms']} ms")
+        return equipment_list
+
+    def _replay_history(self) -> None:
+        """Refill the in-memory history and sequence windows from the durable store"""
+        if self.durable is None or not self.durable.holds(self._fleet_key):
+            return
+        started = time.perf_counter()
+        count = 0
+        for equipment_id, timestamp, sensor_data in self.durable.replay():
+            try:
+                record_history(equipment_id, sensor_data, timestamp)
+            except ValueError:
+                continue
+            count += 1
+        if count:
+            print(f"💾 Replayed {count} sensor samples in {round((time.perf_counter() - started) * 1000, 1)} ms")
+
+    def _initialize_owner(self, equipment_list: List[Dict[str, Any]], seed: Optional[int]) -> FleetSnapshot:
+        simulator = marias_margheritas_mock.create_fleet_simulator(equipment_list, seed)
+        simulator.detector = create_anomaly_detector(len(simulator), SENSOR_NAMES)
+        if simulator.detector is not None:
+            simulator.detector.update(simulator.sensors)
+        index = EquipmentIndex()
+        index.rebuild(equipment_list)
+        fleet_summary.rebuild(equipment_list)
+
+        timestamp = time.time()
+        sensor_data = simulator.readings()
+        record_fleet_history(simulator, timestamp)
+
+        self.simulator = simulator
+        self.current = FleetSnapshot(0, timestamp, equipment_list, sensor_data,
+                                     self._summary(), index, self._anomalies(simulator))
+        if self.persists():
+            self.durable.record_snapshot(self.current)
+        return self.current
+
+    @staticmethod
+    def _summary() -> Dict[str, Any]:
+        return {**marias_margheritas_mock.generate_summary_data(), **fleet_summary.snapshot()}
+
+    @staticmethod
+    def _anomalies(simulator: FleetSimulator) -> Tuple[Dict[str, Any], ...]:
+        if simulator.detector is None:
+            return ()
+        return tuple(simulator.detector.active_anomalies(simulator.equipment_ids))
+
+    def _build_next(self, previous: FleetSnapshot, with_deltas: bool) -> Tuple[FleetSnapshot, Optional[LiveFrame]]:
+        """Advance the simulation and build the next snapshot (runs on a worker thread)"""
+        simulator = self.simulator
+
+        # Whole fleet in one vectorized step (readings and anomaly detection
+        # included), then the derived structures
+        simulator.step()
+        fleet_summary.update_arrays(simulator.status, simulator.rul,
+                                    np.round(simulator.health, 1), simulator.alert_counts())
+        snapshot, frame = self._derive(previous, previous.tick + 1, time.time(), self._summary(),
+                                       self._anomalies(simulator), with_deltas)
+        if self.store is not None and self.store.is_owner:
+            self._publish(snapshot)
+        if self.persists():
+            self.durable.record_snapshot(snapshot)
+        return snapshot, frame
+
+    def _derive(self, previous: FleetSnapshot, tick: int, timestamp: float, summary: Dict[str, Any],
+                anomalies: Tuple[Dict[str, Any], ...], with_deltas: bool
+                ) -> Tuple[FleetSnapshot, Optional[LiveFrame]]:
+        """The snapshot for the simulator's current arrays, plus the live frame of deltas against `previous`"""
+        simulator = self.simulator
+        # Records and readings are views over this tick's arrays (see FleetRecords)
+        equipment = simulator.records(getattr(previous.equipment, "base", previous.equipment))
+        index = previous.index.derive(equipment, status=simulator.status, rul=simulator.rul)
+
+        sensor_data = simulator.readings()
+        record_fleet_history(simulator, timestamp)
+
+        snapshot = FleetSnapshot(tick, timestamp, equipment, sensor_data, summary, index, anomalies)
+        frame = None
+        if with_deltas:
+            # Serialized and grouped here, off the event loop, and shared by every live client
+            same_base = isinstance(previous.equipment, FleetRecords) and previous.equipment.base is equipment.base
+            frame = live_updates.frame(
+                equipment=(equipment.changes_since(previous.equipment) if same_base
+                           else diff_equipment(previous.equipment, equipment)),
+                sensors=sensor_data,
+                summary=diff_summary(dict(previous.summary), summary),
+                category_of=index.category_of,
+            )
+        return snapshot, frame
+
+    def _publish(self, snapshot: FleetSnapshot) -> None:
+        self.store.publish_tick(snapshot.tick, snapshot.timestamp, self.simulator, dict(snapshot.summary),
+                                snapshot.anomalies)
+
+    def _apply_published(self, previous: FleetSnapshot, published: Dict[str, Any], with_deltas: bool
+                         ) -> Tuple[Optional[FleetSnapshot], Optional[LiveFrame]]:
+        """The snapshot for a tick the owner published (runs on a worker thread); None if its fleet was just replaced"""
+        if self.simulator is None or published["generation"] != self.store.generation:
+            # A new fleet: start from its static records
+            generation, equipment_list = self.store.load_fleet()
+            if generation != published["generation"]:
+                return None, None
+            self.store.generation = generation
+            self.simulator = marias_margheritas_mock.create_fleet_simulator(equipment_list)
+            index = EquipmentIndex()
+            index.rebuild(equipment_list)
+            previous = FleetSnapshot(0, time.time(), equipment_list, {}, {}, index)
+            with_deltas = False
+
+        # The follower's simulator is only a holder for the owner's arrays
+        simulator = self.simulator
+        simulator.health, simulator.rul = published["health"], published["rul"]
+        simulator.status, simulator.sensors = published["status"], published["sensors"]
+        simulator.detector = None if published["detector"] is None else PublishedDetector(
+            len(simulator), published["alerts"], published["detector"])
+        return self._derive(previous, published["tick"], published["timestamp"], published["summary"],
+                            published["anomalies"], with_deltas)
+
+    def _become_owner(self) -> None:
+        """Continue simulating from the current snapshot (startup resume or taking over from a dead owner)"""
+        equipment = self.current.equipment
+        simulator = marias_margheritas_mock.create_fleet_simulator(equipment, self._seed)
+        simulator.sensors = self.simulator.sensors.copy()
+        # Anomaly statistics are not published: the detector warms up again
+        simulator.detector = create_anomaly_detector(len(simulator), SENSOR_NAMES)
+        if simulator.detector is not None:
+            simulator.detector.update(simulator.sensors)
+        fleet_summary.rebuild(equipment)
+        self.simulator = simulator
+        self.role = "owner"
+        print(f"👑 Took over the shared fleet simulation at tick {self.current.tick}")
+
+    async def advance(self) -> FleetSnapshot:
+        """Run one tick off the event loop, swap it in, and push deltas to live clients"""
+        if self.role == "follower":
+            return await self._request_tick()
+        async with self._tick_lock:
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            snapshot, frame = await self._swap_in(loop.run_in_executor(
+                None, self._build_next, self.current, bool(live_updates.clients)
+            ))
+
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.stats["ticks"] += 1
+            self.stats["last_tick_ms"] = elapsed_ms
+            self.stats["max_tick_ms"] = max(self.stats["max_tick_ms"], elapsed_ms)
+        # Outside the tick lock, and before anything else can run on the loop, so frames keep tick order
+        if frame is not None:
+            live_updates.publish(frame)
+        return snapshot
+
+    async def _swap_in(self, building: Awaitable[Tuple[Optional[FleetSnapshot], Optional[LiveFrame]]]
+                       ) -> Tuple[Optional[FleetSnapshot], Optional[LiveFrame]]:
+        """
+        Await a snapshot built from the current one and make it current.
+        Readings recorded while it was being built are applied on top, so
+        they are not lost when it replaces the snapshot they were added to.
+        """
+        self._late_readings = {}
+        try:
+            snapshot, frame = await building
+        finally:
+            late, self._late_readings = self._late_readings, None
+        if snapshot is not None:
+            for equipment_id, sensor_data in late.items():
+                snapshot = self._with_reading(snapshot, equipment_id, sensor_data)
+            # The swap: a single reference assignment
+            self.current = snapshot
+        return snapshot, frame
+
+    @staticmethod
+    def _with_reading(snapshot: FleetSnapshot, equipment_id: str, sensor_data: Dict[str, Any]) -> FleetSnapshot:
+        readings = snapshot.sensor_data
+        return FleetSnapshot(snapshot.tick, time.time(), snapshot.equipment,
+                             readings.with_reading(equipment_id, sensor_data)
+                             if isinstance(readings, FleetReadings) else {**readings, equipment_id: sensor_data},
+                             dict(snapshot.summary), snapshot.index, snapshot.anomalies)
+
+    def record_reading(self, equipment_id: str, sensor_data: Dict[str, Any]) -> None:
+        """Publish an out-of-band reading as a copy of the current snapshot"""
+        record_history(equipment_id, sensor_data)
+        if self.persists():
+            self.durable.record_reading(equipment_id, sensor_data)
+        self.current = self._with_reading(self.current, equipment_id, sensor_data)
+        if self._late_readings is not None:
+            # A tick is being built from the snapshot before this one: reapply it after the swap
+            self._late_readings[equipment_id] = sensor_data
+
+    async def _request_tick(self) -> FleetSnapshot:
+        """Ask the owner for a tick and wait until it has been followed here"""
+        loop = asyncio.get_running_loop()
+        before = self.current
+        await loop.run_in_executor(None, self.store.request_tick)
+        deadline = time.monotonic() + self.store.owner_timeout_s
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.store.poll_s / 2)
+            if self.current is not before and self.current.tick != before.tick:
+                return self.current
+        raise TimeoutError("The fleet simulation owner did not run the requested tick")
+
+    async def _follow(self) -> None:
+        """Follower loop: apply new ticks, and take over if the owner's lease expires"""
+        print(f"⏱️ Following the shared fleet simulation (every {self.store.poll_s}s)")
+        loop = asyncio.get_running_loop()
+        while self.role == "follower":
+            await asyncio.sleep(self.store.poll_s)
+            try:
+                latest = await loop.run_in_executor(None, self.store.latest)
+                if latest and (latest[0] != self.store.generation or latest[1] != self.current.tick):
+                    published = await loop.run_in_executor(None, self.store.load_tick)
+                    if published is not None:
+                        async with self._tick_lock:
+                            snapshot, frame = await self._swap_in(loop.run_in_executor(
+                                None, self._apply_published, self.current, published, bool(live_updates.clients)
+                            ))
+                        if snapshot is not None:
+                            self.stats["followed_ticks"] += 1
+                            if frame is not None:
+                                live_updates.publish(frame)
+                elif not await loop.run_in_executor(None, self.store.owner_alive):
+                    claim = await loop.run_in_executor(None, self.store.claim, self._fleet_key)
+                    if claim is not None:
+                        async with self._tick_lock:
+                            await loop.run_in_executor(None, self._become_owner)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ Following the shared fleet failed: {e}")
+        self._task = None
+        self.start(self.interval_s)
+
+    async def _serve_requests(self) -> None:
+        """Owner loop: run ticks requested by followers; step down if the lease was lost"""
+        loop = asyncio.get_running_loop()
+        while self.store.is_owner:
+            await asyncio.sleep(self.store.poll_s)
+            try:
+                if await loop.run_in_executor(None, self.store.take_requests):
+                    await self.advance()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ Requested simulation tick failed: {e}")
+        # Lost the lease: follow the new owner instead
+        self.role = "follower"
+        if self._task is not None:
+            self._task.cancel()
+        self._task = None
+        self._requests_task = None
+        self.start(self.interval_s)
+
+    async def _run(self) -> None:
+        print(f"⏱️ Simulation ticker started (every {self.interval_s}s)")
+        while True:
+            started = time.monotonic()
+            try:
+                await self.advance()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ Simulation tick failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval_s - (time.monotonic() - started)))
+
+    def start(self, interval_s: float = SIMULATION_TICK_S) -> None:
+        """
+        Start the background ticker on the running loop (no ticker for
+        interval 0). With a shared store, followers start following instead
+        and the owner also serves their tick requests.
+        """
+        self.interval_s = interval_s
+        loop = asyncio.get_running_loop()
+        if self.role == "follower":
+            if self._task is None:
+                self._task = loop.create_task(self._follow())
+            return
+        if interval_s > 0 and self._task is None:
+            self._task = loop.create_task(self._run())
+        if self.store is not None and self._requests_task is None:
+            self._requests_task = loop.create_task(self._serve_requests())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._requests_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._requests_task = None
+        if self.store is not None:
+            self.store.release()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "role": self.role,
+            "tick": self.current.tick,
+            "snapshot_time": self.current.timestamp,
+            "equipment": len(self.current.equipment),
+            "ticker_running": self._task is not None and not self._task.done(),
+            "interval_s": self.interval_s,
+            **self.stats,
+            "store": self.store.describe() if self.store is not None else {"backend": "memory"},
+        }
+
+
+# Global instance for easy access
+fleet_state = FleetState(create_fleet_store(), durable_store)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time whole simulation ticks (FleetState.advance) on a tiled fleet")
+    parser.add_argument("--machines", type=int, default=100000)
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--live", action="store_true", help="Also compute the live-update deltas")
+    args = parser.parse_args()
+
+    equipment = marias_margheritas_mock.generate_equipment_data()
+    tiled = [{**equipment[i % len(equipment)], "equipment_id": f"BENCH-{i}"} for i in range(args.machines)]
+    # No shared or durable store: only the in-memory tick is timed
+    bench = FleetState()
+    started = time.perf_counter()
+    bench.initialize(lambda: tiled, seed=0)
+    print(f"🏭 Initialized {args.machines} machines in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    async def run_ticks() -> List[float]:
+        timings = []
+        for _ in range(args.ticks):
+            started = time.perf_counter()
+            bench.current, _ = await asyncio.get_running_loop().run_in_executor(
+                None, bench._build_next, bench.current, args.live)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    timings = asyncio.run(run_ticks())
+    print(f"⚡ Simulation tick: {args.machines} machines, p50 {np.percentile(timings, 50):.1f} ms, "
+          f"max {max(timings):.1f} ms over {args.ticks} ticks (tick interval {SIMULATION_TICK_S}s)")
@@ -0,0 +1,331 @@
+"""
+ORCA PREDATOR - Shared Fleet Store
+Fleet state shared by every API worker on a host through one SQLite (WAL)
+database, so all workers serve the same fleet.
+
+Exactly one process owns the simulation. It claims a lease row and keeps it
+alive from a heartbeat thread, and it publishes every tick. The fleet's
+static equipment records are written once per fleet generation. Each tick
+writes only the health, RUL, status and sensor arrays, plus a small JSON
+document (summary, active anomalies, detector alerts). The other workers
+are followers: they poll for new ticks and build the same FleetSnapshot
+locally. If the owner's heartbeat stops, a follower takes over the lease
+and continues the fleet from the last published tick.
+
+Ticks requested on a follower (`/api/mock/simulate`) are queued here for
+the owner to run.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from mock_company import SENSOR_NAMES
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fleet_state.sqlite")
+
+# Published per tick, as raw bytes: (column, dtype, values per machine)
+TICK_ARRAYS = (("health", np.float64, 1), ("rul", np.int64, 1), ("status", np.int8, 1),
+               ("sensors", np.float64, len(SENSOR_NAMES)))
+
+
+class PublishedDetector:
+    """
+    Stands in for the owner's FleetAnomalyDetector on followers: the
+    per-machine alerts and the description the owner published with a tick.
+    """
+
+    def __init__(self, n_machines: int, alerts: Dict[int, List[str]], info: Dict[str, Any]):
+        self._alerts = alerts
+        self._counts = np.zeros(n_machines, dtype=np.int32)
+        for i, machine_alerts in alerts.items():
+            self._counts[i] = len(machine_alerts)
+        self.info = info
+
+    def alerts(self, i: int) -> List[str]:
+        return list(self._alerts.get(i, ()))
+
+    def alert_counts(self) -> np.ndarray:
+        return self._counts
+
+    def frozen(self) -> "PublishedDetector":
+        # Built per published tick and never updated
+        return self
+
+    def describe(self) -> Dict[str, Any]:
+        return {**self.info, "published_by_owner": True}
+
+
+class FleetStore:
+    """
+    Lease, fleet generation, published ticks and queued tick requests in
+    one SQLite database. Safe to use from several threads of a process and
+    from several processes.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, owner_timeout_s: float = 10.0, poll_s: float = 0.25,
+                 keep_ticks: int = 2):
+        self.path = path
+        self.owner_timeout_s = owner_timeout_s
+        self.poll_s = poll_s
+        self.keep_ticks = max(1, keep_ticks)
+        self.identity = ""
+        self.generation: Optional[str] = None
+        self.is_owner = False
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop_heartbeat = threading.Event()
+        self.stats = {"published": 0, "loaded": 0, "takeovers": 0, "lease_lost": 0, "requests_sent": 0,
+                      "requests_run": 0, "last_publish_ms": None, "last_load_ms": None}
+        self._connect()
+        # A SQLite connection must not be used across fork (prefork.py workers get their own)
+        os.register_at_fork(after_in_child=self._connect)
+        with self._lock:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS fleet_owner (
+                    id INTEGER PRIMARY KEY CHECK (id = 1), identity TEXT NOT NULL, heartbeat REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS fleet_generation (
+                    id INTEGER PRIMARY KEY CHECK (id = 1), generation TEXT NOT NULL, fleet_key TEXT NOT NULL,
+                    created_at REAL NOT NULL, equipment TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS fleet_ticks (
+                    tick INTEGER PRIMARY KEY, generation TEXT NOT NULL, timestamp REAL NOT NULL,
+                    health BLOB NOT NULL, rul BLOB NOT NULL, status BLOB NOT NULL, sensors BLOB NOT NULL,
+                    meta TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS fleet_requests (id INTEGER PRIMARY KEY AUTOINCREMENT, requested_at REAL NOT NULL);
+            """)
+
+    def _connect(self) -> None:
+        self._lock = threading.Lock()
+        # Timeout: how long a write waits for another process's write transaction
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # A forked child is a different process: it has no lease until it claims one
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_owner = False
+        self._heartbeat = None
+
+    @contextmanager
+    def _transaction(self):
+        """One write transaction, taking the database write lock up front"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    # Ownership
+
+    def claim(self, fleet_key: str) -> Optional[str]:
+        """
+        Try to take the lease. Returns None while another process holds it,
+        "resume" if a fleet for `fleet_key` was published before (continue
+        it), or "new" (generate a new fleet).
+        """
+        now = time.time()
+        with self._transaction() as db:
+            owner = db.execute("SELECT identity, heartbeat FROM fleet_owner WHERE id = 1").fetchone()
+            if owner and owner[0] != self.identity and now - owner[1] < self.owner_timeout_s:
+                return None
+            db.execute("INSERT OR REPLACE INTO fleet_owner (id, identity, heartbeat) VALUES (1, ?, ?)",
+                       (self.identity, now))
+            generation = db.execute("SELECT generation, fleet_key FROM fleet_generation WHERE id = 1").fetchone()
+            has_tick = db.execute("SELECT 1 FROM fleet_ticks LIMIT 1").fetchone() is not None
+        self.is_owner = True
+        if owner:
+            self.stats["takeovers"] += 1
+        self._start_heartbeat()
+        if generation and generation[1] == fleet_key and has_tick:
+            self.generation = generation[0]
+            return "resume"
+        return "new"
+
+    def owner_alive(self) -> bool:
+        with self._lock:
+            owner = self._db.execute("SELECT heartbeat FROM fleet_owner WHERE id = 1").fetchone()
+        return owner is not None and time.time() - owner[0] < self.owner_timeout_s
+
+    def _start_heartbeat(self) -> None:
+        if self._heartbeat is not None and self._heartbeat.is_alive():
+            return
+        self._stop_heartbeat.clear()
+        # A thread, so the lease survives a long tick or fleet generation on the event loop's executor
+        self._heartbeat = threading.Thread(target=self._beat, name="orca-fleet-lease", daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self) -> None:
+        while not self._stop_heartbeat.wait(self.owner_timeout_s / 4):
+            with self._lock:
+                updated = self._db.execute("UPDATE fleet_owner SET heartbeat = ? WHERE id = 1 AND identity = ?",
+                                           (time.time(), self.identity)).rowcount
+            if not updated:
+                # Another process took the lease (this one stalled past the timeout)
+                self._lose_lease()
+                return
+
+    def _lose_lease(self) -> None:
+        if not self.is_owner:
+            return
+        self.is_owner = False
+        self._stop_heartbeat.set()
+        self.stats["lease_lost"] += 1
+        print("⚠️ Lost the fleet simulation lease; following the new owner")
+
+    def _still_owner(self, db: sqlite3.Connection) -> bool:
+        """Inside a write transaction: whether this process still holds the lease"""
+        owner = db.execute("SELECT identity FROM fleet_owner WHERE id = 1").fetchone()
+        if owner is not None and owner[0] == self.identity:
+            return True
+        self._lose_lease()
+        return False
+
+    def release(self) -> None:
+        """Give up the lease (on shutdown) so a follower takes over without waiting for the timeout"""
+        self._stop_heartbeat.set()
+        if not self.is_owner:
+            return
+        self.is_owner = False
+        with self._lock:
+            self._db.execute("DELETE FROM fleet_owner WHERE id = 1 AND identity = ?", (self.identity,))
+
+    # Publishing (owner)
+
+    def publish_fleet(self, fleet_key: str, equipment_list: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Start a new fleet generation with its static equipment records; drops
+        the old ticks. Returns None (and publishes nothing) if the lease was
+        lost meanwhile.
+        """
+        generation = uuid.uuid4().hex
+        payload = json.dumps(equipment_list)
+        with self._transaction() as db:
+            if not self._still_owner(db):
+                return None
+            db.execute("DELETE FROM fleet_ticks")
+            db.execute("DELETE FROM fleet_requests")
+            db.execute("INSERT OR REPLACE INTO fleet_generation (id, generation, fleet_key, created_at, equipment) "
+                       "VALUES (1, ?, ?, ?, ?)", (generation, fleet_key, time.time(), payload))
+        self.generation = generation
+        return generation
+
+    def publish_tick(self, tick: int, timestamp: float, simulator: Any, summary: Dict[str, Any],
+                     anomalies: Tuple[Dict[str, Any], ...]) -> bool:
+        """
+        Publish a tick for the followers. Returns False (and publishes
+        nothing) if another process took the lease since the tick started,
+        so a stalled former owner cannot overwrite the new owner's ticks.
+        """
+        started = time.perf_counter()
+        detector = simulator.detector
+        meta = {"summary": summary, "anomalies": list(anomalies), "alerts": {}, "detector": None}
+        if detector is not None:
+            meta["alerts"] = {int(i): detector.alerts(i) for i in np.flatnonzero(detector.alert_counts())}
+            meta["detector"] = detector.describe()
+        arrays = {"health": simulator.health, "rul": simulator.rul, "status": simulator.status,
+                  "sensors": simulator.sensors}
+        row = [np.ascontiguousarray(arrays[name], dtype=dtype).tobytes() for name, dtype, _ in TICK_ARRAYS]
+        with self._transaction() as db:
+            if not self._still_owner(db):
+                return False
+            db.execute("INSERT OR REPLACE INTO fleet_ticks (tick, generation, timestamp, health, rul, status, "
+                       "sensors, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       (tick, self.generation, timestamp, *row, json.dumps(meta)))
+            db.execute("DELETE FROM fleet_ticks WHERE tick <= ?", (tick - self.keep_ticks,))
+        self.stats["published"] += 1
+        self.stats["last_publish_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return True
+
+    def take_requests(self) -> int:
+        """Queued tick requests, removed as they are taken (owner)"""
+        with self._lock:
+            count = self._db.execute("DELETE FROM fleet_requests").rowcount
+        self.stats["requests_run"] += count
+        return count
+
+    # Reading (followers)
+
+    def latest(self) -> Optional[Tuple[str, int]]:
+        """(generation, tick) of the newest published tick"""
+        with self._lock:
+            return self._db.execute("SELECT generation, tick FROM fleet_ticks ORDER BY tick DESC LIMIT 1").fetchone()
+
+    def load_fleet(self) -> Tuple[str, List[Dict[str, Any]]]:
+        with self._lock:
+            generation, equipment = self._db.execute(
+                "SELECT generation, equipment FROM fleet_generation WHERE id = 1").fetchone()
+        return generation, json.loads(equipment)
+
+    def load_tick(self, tick: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """One published tick (the newest by default): arrays plus its summary, anomalies and detector alerts"""
+        started = time.perf_counter()
+        query = "SELECT tick, generation, timestamp, health, rul, status, sensors, meta FROM fleet_ticks "
+        with self._lock:
+            if tick is None:
+                row = self._db.execute(query + "ORDER BY tick DESC LIMIT 1").fetchone()
+            else:
+                row = self._db.execute(query + "WHERE tick = ?", (tick,)).fetchone()
+        if row is None:
+            return None
+        published = {"tick": row[0], "generation": row[1], "timestamp": row[2]}
+        for (name, dtype, width), blob in zip(TICK_ARRAYS, row[3:7]):
+            values = np.frombuffer(blob, dtype=dtype).copy()
+            published[name] = values.reshape(-1, width) if width > 1 else values
+        meta = json.loads(row[7])
+        published.update(summary=meta["summary"], anomalies=tuple(meta["anomalies"]), detector=meta["detector"],
+                         alerts={int(i): alerts for i, alerts in meta["alerts"].items()})
+        self.stats["loaded"] += 1
+        self.stats["last_load_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return published
+
+    def request_tick(self) -> None:
+        with self._lock:
+            self._db.execute("INSERT INTO fleet_requests (requested_at) VALUES (?)", (time.time(),))
+        self.stats["requests_sent"] += 1
+
+    def close(self) -> None:
+        self.release()
+        with self._lock:
+            self._db.close()
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            owner = self._db.execute("SELECT identity, heartbeat FROM fleet_owner WHERE id = 1").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "identity": self.identity,
+            "role": "owner" if self.is_owner else "follower",
+            "owner": owner[0] if owner else None,
+            "owner_heartbeat_age_s": round(time.time() - owner[1], 2) if owner else None,
+            "generation": self.generation,
+            "owner_timeout_s": self.owner_timeout_s,
+            "poll_s": self.poll_s,
+            **self.stats,
+        }
+
+
+def create_fleet_store() -> Optional[FleetStore]:
+    """
+    Shared store for ORCA_FLEET_BACKEND=sqlite. For the default "memory"
+    backend this returns None and each process simulates its own fleet.
+    """
+    backend = os.getenv("ORCA_FLEET_BACKEND", "memory").lower()
+    if backend == "memory":
+        return None
+    if backend != "sqlite":
+        raise ValueError(f"Unknown ORCA_FLEET_BACKEND {backend}. Choose from memory, sqlite")
+    return FleetStore(
+        path=os.getenv("ORCA_FLEET_DB_PATH", DEFAULT_PATH),
+        owner_timeout_s=float(os.getenv("ORCA_FLEET_OWNER_TIMEOUT_S", "10")),
+        poll_s=float(os.getenv("ORCA_FLEET_POLL_S", "0.25")),
+    )
@@ -0,0 +1,198 @@
+"""
+ORCA PREDATOR - Fleet Summary
+Fleet aggregates (counts per status, category and location, alerts, health
+and RUL averages, RUL percentiles) maintained incrementally from equipment
+state transitions, so the summary never rescans the fleet.
+"""
+
+import math
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from mock_company import STATUS_NAMES
+
+RUL_PERCENTILES = (50, 90, 99)
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch-style) that supports removals.
+
+    Values map to buckets of relative width `relative_accuracy`, so any
+    reported quantile is within that relative error of a true sample value.
+    Adding or removing a value is one counter update, and quantiles read a
+    fixed number of buckets whatever the number of values.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_value: float = 1e6):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        # Bucket 0 holds values below 1 (reported as 0)
+        self.counts = np.zeros(int(math.ceil(math.log(max_value) / self._log_gamma)) + 2, dtype=np.int64)
+        self.count = 0
+
+    def buckets(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        index = np.ceil(np.log(np.maximum(values, 1.0)) / self._log_gamma).astype(np.int64) + 1
+        index[values < 1] = 0
+        return np.minimum(index, self.counts.shape[0] - 1)
+
+    def add_buckets(self, buckets: np.ndarray, weight: int = 1) -> None:
+        """Add (weight 1) or remove (weight -1) values already mapped with `buckets`"""
+        self.counts += weight * np.bincount(buckets, minlength=self.counts.shape[0])
+        self.count += weight * int(buckets.shape[0])
+
+    def move(self, old_bucket: int, new_bucket: int) -> None:
+        """One value changed bucket"""
+        self.counts[old_bucket] -= 1
+        self.counts[new_bucket] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank, side="right"))
+        if bucket == 0:
+            return 0.0
+        # Midpoint (in relative terms) of the bucket (gamma^(i-1), gamma^i]
+        return 2 * self.gamma ** (bucket - 1) / (self.gamma + 1)
+
+
+class FleetSummary:
+    """
+    Aggregates over per-machine state kept as arrays aligned with the
+    equipment list.
+
+    `rebuild` indexes a new list once. After that, `update` applies a single
+    machine's transition in O(1) and `update_arrays` applies a simulation
+    tick by adjusting only the machines whose state changed.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._categories: List[str] = []
+        self._locations: List[str] = []
+        self._reset(0)
+
+    def _reset(self, n: int) -> None:
+        self.status = np.zeros(n, dtype=np.int8)
+        self.category = np.zeros(n, dtype=np.int32)
+        self.location = np.zeros(n, dtype=np.int32)
+        self.rul = np.zeros(n, dtype=np.int64)
+        self.health = np.zeros(n, dtype=np.float64)
+        self.alerts = np.zeros(n, dtype=np.int32)
+        self.rul_buckets = np.zeros(n, dtype=np.int64)
+        self.sketch = QuantileSketch(self.relative_accuracy)
+        self.by_category = np.zeros((len(self._categories), len(STATUS_NAMES)), dtype=np.int64)
+        self.by_location = np.zeros((len(self._locations), len(STATUS_NAMES)), dtype=np.int64)
+        self.total_alerts = 0
+        self.health_sum = 0.0
+        self.rul_sum = 0
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    def rebuild(self, equipment_list: List[Dict[str, Any]]) -> None:
+        """Initialize every aggregate from an equipment list (one full pass)"""
+        self._categories = sorted({equipment["category"] for equipment in equipment_list})
+        self._locations = sorted({equipment["location"] for equipment in equipment_list})
+        self._reset(len(equipment_list))
+        category_code = {name: i for i, name in enumerate(self._categories)}
+        location_code = {name: i for i, name in enumerate(self._locations)}
+        for i, equipment in enumerate(equipment_list):
+            self.category[i] = category_code[equipment["category"]]
+            self.location[i] = location_code[equipment["location"]]
+            self.status[i] = STATUS_NAMES.index(equipment["status"])
+            self.rul[i] = equipment["rul"]
+            self.health[i] = equipment["health"]
+            self.alerts[i] = len(equipment["alerts"])
+
+        np.add.at(self.by_category, (self.category, self.status), 1)
+        np.add.at(self.by_location, (self.location, self.status), 1)
+        self.rul_buckets = self.sketch.buckets(self.rul)
+        self.sketch.add_buckets(self.rul_buckets)
+        self.total_alerts = int(self.alerts.sum())
+        self.health_sum = float(self.health.sum())
+        self.rul_sum = int(self.rul.sum())
+
+    def update(self, position: int, equipment: Dict[str, Any]) -> None:
+        """Apply one machine's new state (O(1))"""
+        old_status, new_status = int(self.status[position]), STATUS_NAMES.index(equipment["status"])
+        if old_status != new_status:
+            self.by_category[self.category[position], old_status] -= 1
+            self.by_category[self.category[position], new_status] += 1
+            self.by_location[self.location[position], old_status] -= 1
+            self.by_location[self.location[position], new_status] += 1
+            self.status[position] = new_status
+
+        new_bucket = int(self.sketch.buckets(np.array([equipment["rul"]]))[0])
+        if new_bucket != self.rul_buckets[position]:
+            self.sketch.move(int(self.rul_buckets[position]), new_bucket)
+            self.rul_buckets[position] = new_bucket
+        self.rul_sum += equipment["rul"] - int(self.rul[position])
+        self.rul[position] = equipment["rul"]
+
+        self.health_sum += equipment["health"] - float(self.health[position])
+        self.health[position] = equipment["health"]
+        self.total_alerts += len(equipment["alerts"]) - int(self.alerts[position])
+        self.alerts[position] = len(equipment["alerts"])
+        self._snapshot = None
+
+    def update_arrays(self, status: np.ndarray, rul: np.ndarray, health: np.ndarray, alerts: np.ndarray) -> None:
+        """Apply a fleet-wide tick given new per-machine arrays aligned with the equipment list"""
+        changed = np.flatnonzero(status != self.status)
+        if changed.shape[0]:
+            old, new = self.status[changed], status[changed]
+            np.add.at(self.by_category, (self.category[changed], old), -1)
+            np.add.at(self.by_category, (self.category[changed], new), 1)
+            np.add.at(self.by_location, (self.location[changed], old), -1)
+            np.add.at(self.by_location, (self.location[changed], new), 1)
+            self.status = status.astype(np.int8, copy=True)
+
+        new_buckets = self.sketch.buckets(rul)
+        moved = np.flatnonzero(new_buckets != self.rul_buckets)
+        if moved.shape[0]:
+            self.sketch.add_buckets(self.rul_buckets[moved], -1)
+            self.sketch.add_buckets(new_buckets[moved], 1)
+            self.rul_buckets = new_buckets
+
+        rul = np.asarray(rul, dtype=np.int64)
+        health = np.asarray(health, dtype=np.float64)
+        alerts = np.asarray(alerts, dtype=np.int32)
+        self.rul_sum += int((rul - self.rul).sum())
+        self.health_sum += float((health - self.health).sum())
+        self.total_alerts += int((alerts - self.alerts).sum())
+        self.rul, self.health, self.alerts = rul.copy(), health.copy(), alerts.copy()
+        self._snapshot = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current aggregates; cached until the next update"""
+        if self._snapshot is not None:
+            return self._snapshot
+        total = int(self.status.shape[0])
+        status_counts = self.by_category.sum(axis=0) if self._categories else np.zeros(len(STATUS_NAMES))
+        self._snapshot = {
+            "total_equipment": total,
+            **{f"{name}_equipment": int(count) for name, count in zip(STATUS_NAMES, status_counts)},
+            "total_alerts": self.total_alerts,
+            "average_health": round(self.health_sum / total, 1) if total else None,
+            "average_rul": int(self.rul_sum / total) if total else None,
+            "rul_percentiles": {
+                f"p{p}": (int(round(value)) if value is not None else None)
+                for p, value in ((p, self.sketch.quantile(p / 100)) for p in RUL_PERCENTILES)
+            },
+            "by_category": self._breakdown(self._categories, self.by_category),
+            "by_location": self._breakdown(self._locations, self.by_location),
+        }
+        return self._snapshot
+
+    @staticmethod
+    def _breakdown(names: List[str], counts: np.ndarray) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"total": int(row.sum()), **{status: int(n) for status, n in zip(STATUS_NAMES, row)}}
+            for name, row in zip(names, counts)
+        }
+
+
+# Global instance for easy access
+fleet_summary = FleetSummary()
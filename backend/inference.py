@@ -0,0 +1,163 @@
+"""
+ORCA PREDATOR - Inference Helpers
+Turns sensor snapshots into model-ready matrices, scores them in a single
+vectorized call per model, and runs that work on a dedicated thread pool so
+the asyncio event loop stays free for cheap requests.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Tuple, Callable
+
+import numpy as np
+
+from model_registry import model_registry, build_feature_vector, LoadedModel
+
+# Minimum number of numeric readings a snapshot needs to be scored
+MIN_SENSOR_READINGS = 5
+
+# Inference pool: XGBoost and TensorFlow release the GIL while predicting, so
+# threads give real parallelism. Each worker gets an equal share of the cores
+# so the pool never oversubscribes the CPU.
+INFERENCE_WORKERS = max(1, int(os.getenv("ORCA_INFERENCE_WORKERS", "2")))
+INFERENCE_THREADS = max(1, int(os.getenv(
+    "ORCA_INFERENCE_THREADS", str(max(1, (os.cpu_count() or 1) // INFERENCE_WORKERS))
+)))
+
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="orca-inference")
+model_registry.configure_threads(INFERENCE_THREADS)
+
+_pool_lock = threading.Lock()
+pool_stats = {"submitted": 0, "completed": 0, "in_flight": 0}
+
+
+def _tracked(fn: Callable, *args: Any) -> Any:
+    try:
+        return fn(*args)
+    finally:
+        with _pool_lock:
+            pool_stats["in_flight"] -= 1
+            pool_stats["completed"] += 1
+
+
+async def run_inference(fn: Callable, *args: Any) -> Any:
+    """Run a blocking model call on the inference pool and await its result"""
+    with _pool_lock:
+        pool_stats["submitted"] += 1
+        pool_stats["in_flight"] += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_executor, _tracked, fn, *args)
+
+
+def describe_pool() -> Dict[str, Any]:
+    with _pool_lock:
+        return {"workers": INFERENCE_WORKERS, "threads_per_worker": INFERENCE_THREADS,
+                "loading": sorted(f"{dataset}/{arch}" for dataset, arch in _loading), **pool_stats}
+
+
+# Slow loads (TensorFlow import, Keras deserialization, warm-up) run on their
+# own thread so they never occupy an inference worker
+model_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="orca-model-loader")
+_loading = set()
+
+
+def load_in_background(dataset: str, architecture: str) -> bool:
+    """Start loading a model without waiting; returns False if it is already loaded"""
+    key = (dataset, architecture)
+    with _pool_lock:
+        if model_registry.is_loaded(dataset, architecture):
+            return False
+        if key in _loading:
+            return True
+        _loading.add(key)
+
+    def load():
+        try:
+            model_registry.get(dataset, architecture)
+        except Exception as e:
+            print(f"⚠️ Background load of {dataset}/{architecture} failed: {e}")
+        finally:
+            with _pool_lock:
+                _loading.discard(key)
+
+    model_loader.submit(load)
+    return True
+
+
+def count_numeric_readings(sensor_data: Dict[str, Any]) -> int:
+    return sum(
+        1 for value in sensor_data.values()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    )
+
+
+def build_snapshot_matrix(model: LoadedModel, sensor_dicts: List[Dict[str, Any]]
+                          ) -> Tuple[np.ndarray, List[List[str]]]:
+    """Assemble an (N, F) float32 matrix in the model's feature order"""
+    matrix = np.zeros((len(sensor_dicts), len(model.features)), dtype=np.float32)
+    sensors_used = []
+    for row, sensor_data in enumerate(sensor_dicts):
+        values, used = build_feature_vector(sensor_data, model.features)
+        matrix[row] = values
+        sensors_used.append(used)
+    return matrix, sensors_used
+
+
+def predict_snapshots(dataset: str, sensor_dicts: List[Dict[str, Any]],
+                      architecture: str = "xgboost") -> List[Dict[str, Any]]:
+    """
+    Score a batch of sensor snapshots with one predict call.
+
+    Returns one entry per input, either {"rul", "sensors_used"} or {"error"},
+    so a bad item never fails the rest of the batch.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in sensor_dicts]
+    valid_rows = []
+    for index, sensor_data in enumerate(sensor_dicts):
+        if not isinstance(sensor_data, dict):
+            results[index] = {"error": "Sensor data must be an object"}
+        elif count_numeric_readings(sensor_data) < MIN_SENSOR_READINGS:
+            results[index] = {"error": "Insufficient sensor data"}
+        else:
+            valid_rows.append(index)
+
+    if not valid_rows:
+        return results
+
+    model = model_registry.get(dataset, architecture)
+    matrix, sensors_used = build_snapshot_matrix(model, [sensor_dicts[i] for i in valid_rows])
+    predictions = model.predict(model.scale(matrix))
+
+    for row, index in enumerate(valid_rows):
+        results[index] = {
+            "rul": max(0, int(predictions[row])),
+            "sensors_used": sensors_used[row],
+        }
+    return results
+
+
+def predict_windows(dataset: str, architecture: str, windows: np.ndarray) -> np.ndarray:
+    """Score a stack of raw (N, window, F) sequences with a CNN sequence model"""
+    model = model_registry.get(dataset, architecture)
+    if model.window is None:
+        raise ValueError(f"{dataset}/{architecture} is not a sequence model")
+    if windows.shape[1:] != (model.window, len(model.features)):
+        raise ValueError(
+            f"Expected windows of shape ({model.window}, {len(model.features)}), got {windows.shape[1:]}"
+        )
+    return np.maximum(model.predict(model.scale(windows.astype(np.float32, copy=False))), 0)
+
+
+def predict_window_stacks(dataset: str, architecture: str, stacks: List[np.ndarray]) -> List[np.ndarray]:
+    """Score several callers' (k, window, F) stacks in one model call; one prediction array per stack"""
+    predictions = predict_windows(dataset, architecture, np.concatenate(stacks))
+    return np.split(predictions, np.cumsum([stack.shape[0] for stack in stacks])[:-1])
+
+
+def warm_model(dataset: str, architecture: str = "xgboost") -> None:
+    """Load a model and run one prediction on zeros, so the first real request pays neither"""
+    model = model_registry.get(dataset, architecture)
+    shape = (1, len(model.features)) if model.window is None else (1, model.window, len(model.features))
+    model.predict(model.scale(np.zeros(shape, dtype=np.float32)))
@@ -0,0 +1,238 @@
+"""
+ORCA PREDATOR - Keras Serving Backends
+CPU inference paths for the CNN+LSTM and CNN+BiLSTM+Attention models that
+avoid Keras's per-call `model.predict` overhead, plus a latency/accuracy
+comparison between them.
+
+Backends:
+- keras:          model.predict (reference, slowest)
+- function:       compiled tf.function with a fixed (None, window, F) signature
+- tflite:         TFLite interpreter, float32 weights
+- tflite_float16: TFLite interpreter, float16 weights
+- tflite_int8:    TFLite interpreter, dynamic-range int8 weights
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+KERAS_BACKENDS = ("keras", "function", "tflite", "tflite_float16", "tflite_int8")
+DEFAULT_KERAS_BACKEND = "function"
+
+# Batch sizes traced and executed once at load so the first request is not slow
+WARM_UP_BATCH_SIZES = (1, 32)
+
+
+def serving_clone(model: Any) -> Any:
+    """
+    Float32 copy of a model with recurrent layers unrolled.
+
+    The attention models were trained under the mixed_float16 policy, which
+    is slow on CPU and not convertible to TFLite builtins. Unrolling is exact
+    here because every model consumes a fixed-length window.
+    """
+    def rewrite(config: Any) -> None:
+        if isinstance(config, dict):
+            inner = config.get("config")
+            if isinstance(inner, dict):
+                if config.get("class_name") in ("LSTM", "GRU", "SimpleRNN"):
+                    inner["unroll"] = True
+                if config.get("class_name") == "DTypePolicy":
+                    inner["name"] = "float32"
+            for value in config.values():
+                rewrite(value)
+        elif isinstance(config, list):
+            for value in config:
+                rewrite(value)
+
+    config = model.get_config()
+    rewrite(config)
+    clone = model.__class__.from_config(config)
+    clone.set_weights(model.get_weights())
+    return clone
+
+
+class KerasPredictRunner:
+    """Reference path: Keras model.predict"""
+
+    backend = "keras"
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    def __call__(self, windows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict(windows, verbose=0)).reshape(-1)
+
+
+class CompiledFunctionRunner:
+    """tf.function traced once for any batch size of (window, F) float32 inputs"""
+
+    backend = "function"
+
+    def __init__(self, model: Any):
+        import tensorflow as tf
+
+        self.model = serving_clone(model)
+        window, n_features = model.input_shape[1], model.input_shape[2]
+        serving_model = self.model
+        self._fn = tf.function(
+            lambda x: serving_model(x, training=False),
+            input_signature=[tf.TensorSpec([None, window, n_features], tf.float32)],
+        )
+        self._fn.get_concrete_function()
+
+    def __call__(self, windows: np.ndarray) -> np.ndarray:
+        return self._fn(np.asarray(windows, dtype=np.float32)).numpy().reshape(-1)
+
+
+class TFLiteRunner:
+    """
+    TFLite interpreter with optional float16 / int8 weight quantization.
+
+    Interpreters are not thread-safe, so each inference thread gets its own,
+    created lazily from the same converted flatbuffer.
+    """
+
+    def __init__(self, model: Any, quantization: str = "none", num_threads: Optional[int] = None):
+        import tensorflow as tf
+
+        converter = tf.lite.TFLiteConverter.from_keras_model(serving_clone(model))
+        if quantization == "float16":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantization == "int8":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        elif quantization != "none":
+            raise ValueError(f"Unknown TFLite quantization: {quantization}")
+
+        self.backend = "tflite" if quantization == "none" else f"tflite_{quantization}"
+        self.model_bytes = converter.convert()
+        self.num_threads = num_threads
+        self._interpreter_class = tf.lite.Interpreter
+        self._local = threading.local()
+
+    def _interpreter(self, batch_size: int) -> Any:
+        state = self._local.__dict__
+        if "interpreter" not in state:
+            interpreter = self._interpreter_class(model_content=self.model_bytes, num_threads=self.num_threads)
+            state["interpreter"] = interpreter
+            state["input"] = interpreter.get_input_details()[0]
+            state["output"] = interpreter.get_output_details()[0]
+            state["batch_size"] = None
+        if state["batch_size"] != batch_size:
+            shape = list(state["input"]["shape"])
+            shape[0] = batch_size
+            state["interpreter"].resize_tensor_input(state["input"]["index"], shape)
+            state["interpreter"].allocate_tensors()
+            state["batch_size"] = batch_size
+        return state["interpreter"]
+
+    def __call__(self, windows: np.ndarray) -> np.ndarray:
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        interpreter = self._interpreter(windows.shape[0])
+        interpreter.set_tensor(self._local.input["index"], windows)
+        interpreter.invoke()
+        return np.array(interpreter.get_tensor(self._local.output["index"])).reshape(-1)
+
+
+def create_runner(model: Any, backend: str, num_threads: Optional[int] = None, warm_up: bool = True) -> Any:
+    """Build the runner for a backend name, warmed up on the common batch sizes"""
+    if backend == "keras":
+        runner = KerasPredictRunner(model)
+    elif backend == "function":
+        runner = CompiledFunctionRunner(model)
+    elif backend.startswith("tflite"):
+        quantization = backend[len("tflite_"):] if backend != "tflite" else "none"
+        runner = TFLiteRunner(model, quantization, num_threads)
+    else:
+        raise ValueError(f"Unknown Keras backend {backend}. Choose from {', '.join(KERAS_BACKENDS)}")
+
+    if warm_up:
+        window, n_features = model.input_shape[1], model.input_shape[2]
+        for batch_size in WARM_UP_BATCH_SIZES:
+            runner(np.zeros((batch_size, window, n_features), dtype=np.float32))
+    return runner
+
+
+def backend_from_env(dataset: str, architecture: str) -> str:
+    """ORCA_KERAS_BACKEND_<DATASET>_<ARCHITECTURE> overrides ORCA_KERAS_BACKEND"""
+    override = os.getenv(f"ORCA_KERAS_BACKEND_{dataset}_{architecture}".upper())
+    return override or os.getenv("ORCA_KERAS_BACKEND", DEFAULT_KERAS_BACKEND)
+
+
+def compare_backends(model: Any, backends: List[str] = KERAS_BACKENDS, samples: int = 256,
+                     batch_sizes: List[int] = (1, 32), repeats: int = 50, seed: int = 0,
+                     num_threads: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Latency and accuracy of each backend against Keras model.predict.
+
+    Inputs are random windows in the scaler's [0, 1] output range. Error is
+    reported in RUL cycles relative to the reference backend's predictions.
+    """
+    window, n_features = model.input_shape[1], model.input_shape[2]
+    rng = np.random.default_rng(seed)
+    inputs = rng.random((samples, window, n_features), dtype=np.float32)
+    reference = KerasPredictRunner(model)(inputs)
+
+    report = []
+    for backend in backends:
+        entry: Dict[str, Any] = {"backend": backend}
+        try:
+            started = time.perf_counter()
+            runner = create_runner(model, backend, num_threads)
+            entry["build_s"] = round(time.perf_counter() - started, 2)
+        except Exception as e:
+            entry["error"] = str(e).splitlines()[0]
+            report.append(entry)
+            continue
+
+        predictions = runner(inputs)
+        errors = np.abs(predictions - reference)
+        entry["mae_vs_keras"] = round(float(errors.mean()), 4)
+        entry["max_error_vs_keras"] = round(float(errors.max()), 4)
+        if hasattr(runner, "model_bytes"):
+            entry["size_kb"] = round(len(runner.model_bytes) / 1024, 1)
+
+        for batch_size in batch_sizes:
+            batch = inputs[:batch_size]
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                runner(batch)
+                timings.append(time.perf_counter() - started)
+            entry[f"p50_ms_batch_{batch_size}"] = round(float(np.percentile(timings, 50)) * 1000, 3)
+            entry[f"p99_ms_batch_{batch_size}"] = round(float(np.percentile(timings, 99)) * 1000, 3)
+        report.append(entry)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from model_registry import model_registry
+
+    parser = argparse.ArgumentParser(description="Compare Keras serving backends for the ORCA sequence models")
+    parser.add_argument("--dataset", default="FD001")
+    parser.add_argument("--architecture", default="cnn_lstm", choices=["cnn_lstm", "cnn_bilstm_attn"])
+    parser.add_argument("--backends", default=",".join(KERAS_BACKENDS))
+    parser.add_argument("--samples", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    spec = model_registry.specs[(args.dataset, args.architecture)]
+    import tensorflow as tf
+    keras_model = tf.keras.models.load_model(spec.model_path, compile=False)
+
+    print(f"🧪 Comparing Keras backends for {args.dataset}/{args.architecture}")
+    print("=" * 70)
+    results = compare_backends(keras_model, args.backends.split(","), args.samples, repeats=args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for row in results:
+            print(" | ".join(f"{key}={value}" for key, value in row.items()))
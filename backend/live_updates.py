@@ -0,0 +1,397 @@
+"""
+ORCA PREDATOR - Live Updates
+Push changed equipment fields, new sensor samples and summary deltas to
+subscribed clients (SSE or WebSocket) after every simulation tick or ingest,
+instead of clients polling the full equipment, sensor and summary payloads.
+
+Each tick's deltas become one immutable LiveFrame, built off the event loop
+next to the tick itself. Publishing only queues a reference to the frame on
+every client, and messages are rendered on a worker thread, so the loop does
+O(clients) work per tick however large the fleet is. Entries are serialized
+once per frame and shared by every client that receives them.
+
+Each client has a subscription filter (equipment IDs and/or categories).
+Frames that arrive before the previous one was sent are merged when the
+message is rendered (latest value per field wins), so a slow consumer
+receives fewer, coalesced messages. If more than `max_pending` machines are
+still queued from earlier ticks when a new one arrives, the client is told
+to resync from the REST endpoints instead.
+
+Every machine gets a new sensor reading on every tick, so frames carry the
+readings of a rotating window of at most `sensor_sample` machines; clients
+that name equipment IDs get those machines' readings on every tick.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Set, Callable, Mapping, Tuple
+
+# Equipment fields compared between ticks
+TRACKED_FIELDS = ("health", "rul", "status", "alerts", "cycle_count", "next_maintenance", "last_maintenance")
+
+HEARTBEAT_S = float(os.getenv("ORCA_LIVE_HEARTBEAT_S", "15"))
+MAX_PENDING = int(os.getenv("ORCA_LIVE_MAX_PENDING", "10000"))
+MAX_CLIENTS = int(os.getenv("ORCA_LIVE_MAX_CLIENTS", "1000"))
+# Machines whose sensor readings go out per tick (a rotating window over the fleet)
+SENSOR_SAMPLE = int(os.getenv("ORCA_LIVE_SENSOR_SAMPLE", "5000"))
+
+KINDS = ("equipment", "sensors")
+# Entries serialized per json.dumps call when a whole frame is rendered
+BODY_CHUNK = 2000
+
+
+def diff_equipment(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Changed tracked fields per equipment_id between two equipment lists"""
+    previous = {equipment["equipment_id"]: equipment for equipment in old}
+    changes = {}
+    for equipment in new:
+        before = previous.get(equipment["equipment_id"])
+        if before is None:
+            changes[equipment["equipment_id"]] = dict(equipment)
+            continue
+        delta = {field: equipment[field] for field in TRACKED_FIELDS
+                 if field in equipment and equipment[field] != before.get(field)}
+        if delta:
+            changes[equipment["equipment_id"]] = delta
+    return changes
+
+
+def diff_summary(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level summary keys whose value changed"""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def sensor_window(readings: Mapping[str, Dict[str, Any]], start: int, stop: int) -> Dict[str, Dict[str, Any]]:
+    """Readings of the machines at positions start..stop-1 (FleetReadings builds them in one pass)"""
+    window = getattr(readings, "window", None)
+    if window is not None:
+        return window(start, stop)
+    return {equipment_id: readings[equipment_id] for equipment_id in itertools.islice(readings, start, stop)}
+
+
+class Subscription:
+    """Which equipment a client wants; no IDs and no categories means everything"""
+
+    def __init__(self, equipment_ids: Optional[Set[str]] = None, categories: Optional[Set[str]] = None,
+                 sensors: bool = True, summary: bool = True):
+        self.equipment_ids = equipment_ids or None
+        self.categories = categories or None
+        self.sensors = sensors
+        self.summary = summary
+
+    def matches(self, equipment_id: str, category: Optional[str]) -> bool:
+        if self.equipment_ids is None and self.categories is None:
+            return True
+        return ((self.equipment_ids is not None and equipment_id in self.equipment_ids)
+                or (self.categories is not None and category in self.categories))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "equipment_ids": sorted(self.equipment_ids) if self.equipment_ids else None,
+            "categories": sorted(self.categories) if self.categories else None,
+            "sensors": self.sensors,
+            "summary": self.summary,
+        }
+
+
+class LiveFrame:
+    """
+    One tick's deltas. Built off the event loop and never modified once
+    published: clients queue references to it, and each entry is
+    serialized at most once however many clients receive it (worker threads
+    rendering concurrently may both serialize an entry; either copy is kept).
+    """
+
+    def __init__(self, equipment: Dict[str, Dict[str, Any]], sensors: Dict[str, Dict[str, Any]],
+                 summary: Dict[str, Any], readings: Optional[Mapping[str, Dict[str, Any]]] = None,
+                 category_of: Optional[Callable[[str], Optional[str]]] = None):
+        self.tick = 0
+        self.changes = {"equipment": equipment, "sensors": sensors}
+        self.summary = summary
+        # Every machine's latest reading, for clients that name equipment IDs
+        self.readings = readings if readings is not None else sensors
+        self.category_of = category_of or (lambda equipment_id: None)
+        self._groups: Optional[Dict[str, Dict[Optional[str], List[str]]]] = None
+        self._groups_lock = threading.Lock()
+        self._fragments: Dict[Tuple[str, str], str] = {}
+        self._bodies: Dict[str, str] = {}
+
+    def groups(self) -> Dict[str, Dict[Optional[str], List[str]]]:
+        """kind -> category -> IDs with an entry, for category subscriptions (built on first use)"""
+        if self._groups is None:
+            with self._groups_lock:
+                if self._groups is None:
+                    categories: Dict[str, Optional[str]] = {}
+                    groups = {}
+                    for kind, changes in self.changes.items():
+                        grouped: Dict[Optional[str], List[str]] = {}
+                        for equipment_id in changes:
+                            category = categories.get(equipment_id)
+                            if category is None:
+                                category = categories[equipment_id] = self.category_of(equipment_id)
+                            grouped.setdefault(category, []).append(equipment_id)
+                        groups[kind] = grouped
+                    self._groups = groups
+        return self._groups
+
+    def selection(self, kind: str, subscription: Subscription) -> List[str]:
+        """IDs of `kind` entries the subscription receives, in frame order for unfiltered ones"""
+        if kind == "sensors" and not subscription.sensors:
+            return []
+        changes = self.changes[kind]
+        if subscription.equipment_ids is None and subscription.categories is None:
+            return list(changes)
+        source = self.readings if kind == "sensors" else changes
+        selected = [equipment_id for equipment_id in subscription.equipment_ids or () if equipment_id in source]
+        if subscription.categories is not None:
+            named = subscription.equipment_ids or ()
+            groups = self.groups()[kind]
+            for category in subscription.categories:
+                selected.extend(equipment_id for equipment_id in groups.get(category, ())
+                                if equipment_id not in named)
+        return selected
+
+    def count(self, subscription: Subscription) -> int:
+        """Machines the subscription receives from this frame (an upper bound for filtered ones)"""
+        if subscription.equipment_ids is None and subscription.categories is None:
+            return max(len(self.changes["equipment"]), len(self.changes["sensors"]) if subscription.sensors else 0)
+        count = len(subscription.equipment_ids or ())
+        if subscription.categories is not None:
+            groups = self.groups()
+            count += max(sum(len(groups[kind].get(category, ())) for category in subscription.categories)
+                         for kind in KINDS)
+        return count
+
+    def fields(self, kind: str, equipment_id: str) -> Dict[str, Any]:
+        changes = self.changes[kind]
+        if kind == "sensors" and equipment_id not in changes:
+            return self.readings[equipment_id]
+        return changes[equipment_id]
+
+    def fragment(self, kind: str, equipment_id: str) -> str:
+        key = (kind, equipment_id)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = self._fragments.setdefault(key, json.dumps(self.fields(kind, equipment_id)))
+        return fragment
+
+    def body(self, kind: str) -> str:
+        """The whole `kind` object, as sent to clients without filters"""
+        body = self._bodies.get(kind)
+        if body is None:
+            # In chunks: one json.dumps call holds the GIL, and with it the event loop, until it returns
+            items = iter(self.changes[kind].items())
+            parts = []
+            while True:
+                chunk = dict(itertools.islice(items, BODY_CHUNK))
+                if not chunk:
+                    break
+                parts.append(json.dumps(chunk)[1:-1])
+            body = self._bodies.setdefault(kind, "{" + ",".join(parts) + "}")
+        return body
+
+
+class LiveClient:
+    """Frames queued for one connection, flushed by its sender"""
+
+    def __init__(self, client_id: int, subscription: Subscription, max_pending: int):
+        self.client_id = client_id
+        self.subscription = subscription
+        self.max_pending = max_pending
+        self.frames: List[LiveFrame] = []
+        # Machines queued in `frames` for this subscription (see LiveFrame.count)
+        self.pending = 0
+        self.resync = False
+        self.tick = 0
+        self.ready = asyncio.Event()
+        self.stats = {"messages": 0, "coalesced": 0, "resyncs": 0}
+
+    def add(self, frame: LiveFrame) -> None:
+        if self.resync:
+            return
+        self.tick = frame.tick
+        if self.pending > self.max_pending:
+            # Too far behind on earlier ticks: drop everything and let the client refetch
+            self.frames, self.pending = [], 0
+            self.resync = True
+            self.stats["resyncs"] += 1
+        else:
+            count = frame.count(self.subscription)
+            if count or (frame.summary and self.subscription.summary):
+                self.frames.append(frame)
+                self.pending += count
+        if self.frames or self.resync:
+            self.ready.set()
+
+    def take(self) -> Tuple[int, List[LiveFrame], Subscription, bool]:
+        """Swap out everything pending"""
+        pending = (self.tick, self.frames, self.subscription, self.resync)
+        self.frames, self.pending, self.resync = [], 0, False
+        self.ready.clear()
+        return pending
+
+
+def render_frames(tick: int, frames: List[LiveFrame], subscription: Subscription, resync: bool
+                  ) -> Tuple[str, str, int]:
+    """
+    (event name, JSON payload, coalesced entries) for frames taken from a
+    client. Only reads the frames, so it runs on a worker thread.
+    """
+    if resync:
+        return "resync", json.dumps({"tick": tick, "reason": "client fell too far behind"}), 0
+    parts = [f'"tick":{tick}', f'"timestamp":{json.dumps(time.time())}']
+    coalesced = 0
+    unfiltered = subscription.equipment_ids is None and subscription.categories is None
+    for kind in KINDS:
+        if len(frames) == 1 and unfiltered:
+            frame = frames[0]
+            if frame.changes[kind] and (kind != "sensors" or subscription.sensors):
+                parts.append(f'"{kind}":{frame.body(kind)}')
+            continue
+        # equipment_id -> the only frame with an entry, or the merged fields of several
+        latest: Dict[str, Any] = {}
+        for frame in frames:
+            for equipment_id in frame.selection(kind, subscription):
+                existing = latest.get(equipment_id)
+                if existing is None:
+                    latest[equipment_id] = frame
+                    continue
+                if isinstance(existing, LiveFrame):
+                    existing = dict(existing.fields(kind, equipment_id))
+                existing.update(frame.fields(kind, equipment_id))
+                latest[equipment_id] = existing
+                coalesced += 1
+        if latest:
+            body = ",".join(
+                f"{json.dumps(equipment_id)}:"
+                f"{entry.fragment(kind, equipment_id) if isinstance(entry, LiveFrame) else json.dumps(entry)}"
+                for equipment_id, entry in latest.items()
+            )
+            parts.append(f'"{kind}":{{{body}}}')
+    if subscription.summary:
+        summary: Dict[str, Any] = {}
+        for frame in frames:
+            summary.update(frame.summary)
+        if summary:
+            parts.append(f'"summary":{json.dumps(summary)}')
+    return "update", "{" + ",".join(parts) + "}", coalesced
+
+
+class LiveUpdateHub:
+    """
+    Fans tick frames out to subscribed clients.
+
+    `frame()` builds a tick's LiveFrame and may run on any thread (one tick
+    at a time); `publish()` queues it on every client and runs on the event
+    loop, as does everything that touches the clients.
+    """
+
+    def __init__(self, category_of: Optional[Callable[[str], Optional[str]]] = None, max_pending: int = MAX_PENDING,
+                 max_clients: int = MAX_CLIENTS, sensor_sample: int = SENSOR_SAMPLE):
+        self.category_of = category_of
+        self.max_pending = max_pending
+        self.max_clients = max_clients
+        self.sensor_sample = max(1, sensor_sample)
+        self.clients: Dict[int, LiveClient] = {}
+        self._ids = itertools.count(1)
+        self.tick = 0
+        self._sensor_start = 0
+        self.stats = {"ticks": 0, "messages": 0, "bytes": 0, "connects": 0, "disconnects": 0,
+                      "last_render_ms": None}
+
+    def connect(self, subscription: Subscription) -> LiveClient:
+        if len(self.clients) >= self.max_clients:
+            raise RuntimeError(f"Live update client limit ({self.max_clients}) reached")
+        client = LiveClient(next(self._ids), subscription, self.max_pending)
+        self.clients[client.client_id] = client
+        self.stats["connects"] += 1
+        return client
+
+    def disconnect(self, client: LiveClient) -> None:
+        if self.clients.pop(client.client_id, None) is not None:
+            self.stats["disconnects"] += 1
+
+    def frame(self, equipment: Optional[Dict[str, Dict[str, Any]]] = None,
+              sensors: Optional[Mapping[str, Dict[str, Any]]] = None,
+              summary: Optional[Dict[str, Any]] = None,
+              category_of: Optional[Callable[[str], Optional[str]]] = None) -> LiveFrame:
+        """
+        A tick's frame from its equipment changes, the fleet's latest
+        readings and the summary delta. Takes the next window of
+        `sensor_sample` machines from `sensors`.
+        """
+        sensors = sensors or {}
+        n = len(sensors)
+        if n <= self.sensor_sample:
+            sampled = dict(sensors)
+        else:
+            start = self._sensor_start % n
+            stop = start + self.sensor_sample
+            sampled = sensor_window(sensors, start, min(stop, n))
+            if stop > n:
+                sampled.update(sensor_window(sensors, 0, stop - n))
+            self._sensor_start = stop % n
+        frame = LiveFrame(equipment or {}, sampled, summary or {}, sensors, category_of or self.category_of)
+        if any(client.subscription.categories for client in list(self.clients.values())):
+            # Group now, off the loop, rather than when publish counts it
+            frame.groups()
+        return frame
+
+    def publish(self, frame: LiveFrame) -> int:
+        """Queue a frame for every client; returns its tick number"""
+        self.tick += 1
+        self.stats["ticks"] += 1
+        frame.tick = self.tick
+        for client in list(self.clients.values()):
+            client.add(frame)
+        return self.tick
+
+    async def next_message(self, client: LiveClient, heartbeat_s: float = HEARTBEAT_S) -> Optional[Tuple[str, str]]:
+        """Wait for pending frames and render them on a worker thread; None after `heartbeat_s` without any"""
+        try:
+            await asyncio.wait_for(client.ready.wait(), timeout=heartbeat_s)
+        except asyncio.TimeoutError:
+            return None
+        started = time.perf_counter()
+        event, payload, coalesced = await asyncio.get_running_loop().run_in_executor(
+            None, render_frames, *client.take()
+        )
+        client.stats["messages"] += 1
+        client.stats["coalesced"] += coalesced
+        self.stats["messages"] += 1
+        self.stats["bytes"] += len(payload)
+        self.stats["last_render_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return event, payload
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "clients": [
+                {"id": client.client_id, **client.subscription.to_dict(),
+                 "pending": client.pending, "queued_ticks": len(client.frames), **client.stats}
+                for client in self.clients.values()
+            ],
+            "tick": self.tick,
+            "max_pending": self.max_pending,
+            "sensor_sample": self.sensor_sample,
+            **self.stats,
+        }
+
+
+def format_sse(event: str, payload: str) -> str:
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def parse_subscription(equipment_ids: Optional[str] = None, categories: Optional[str] = None,
+                       sensors: bool = True, summary: bool = True) -> Subscription:
+    """Subscription from comma-separated query parameters"""
+    def split(value: Optional[str]) -> Optional[Set[str]]:
+        return {item.strip() for item in value.split(",") if item.strip()} if value else None
+    return Subscription(split(equipment_ids), split(categories), sensors, summary)
+
+
+# Global instance for easy access
+live_updates = LiveUpdateHub()
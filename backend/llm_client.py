@@ -0,0 +1,411 @@
+"""
+ORCA PREDATOR - LLM Client
+Async access to Gemini for the maintenance planner and chatbot that never
+stalls the event loop.
+
+Calls, and token streams for the chatbot, share a global concurrency
+limit. When every slot is busy, the call times out, or the upstream keeps
+failing, callers get LLMUnavailable right away and serve their canned
+fallback instead of waiting. Identical prompts already in flight are
+merged into one upstream call (single-flight).
+
+The Gemini REST backend also speaks to `llm_stub.py`, a local server that
+simulates slow and failing responses for load tests.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Any, Optional, AsyncIterator
+
+MAX_CONCURRENCY = int(os.getenv("ORCA_LLM_MAX_CONCURRENCY", "8"))
+TIMEOUT_S = float(os.getenv("ORCA_LLM_TIMEOUT_S", "20"))
+# How long a call may wait for a free slot (0: fall back as soon as the limit is hit)
+QUEUE_WAIT_S = float(os.getenv("ORCA_LLM_QUEUE_WAIT_S", "0"))
+# Consecutive upstream failures that open the breaker, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("ORCA_LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_S = float(os.getenv("ORCA_LLM_BREAKER_COOLDOWN_S", "30"))
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com"
+DEFAULT_MODEL = "gemini-1.5-pro"
+# SDK model names tried in order by discover_gemini_model
+GEMINI_MODEL_NAMES = ("gemini-1.5-pro", "gemini-1.0-pro", "gemini-pro")
+
+
+class LLMUnavailable(Exception):
+    """No LLM answer for this call; `reason` is busy, timeout, breaker_open or error"""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(f"LLM unavailable ({reason}){': ' + detail if detail else ''}")
+        self.reason = reason
+
+
+class LatencyTracker:
+    """Percentiles over the most recent `window` samples, in milliseconds"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.samples: List[float] = []
+
+    def add(self, ms: float) -> None:
+        self.samples.append(ms)
+        del self.samples[:-self.window]
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        samples = sorted(self.samples)
+
+        def percentile(q: float) -> Optional[float]:
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 1) if samples else None
+
+        return {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99)}
+
+
+def candidate_text(payload: Dict[str, Any]) -> str:
+    """Text of the first candidate of a generateContent response (or stream chunk)"""
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        return ""
+    return "".join(part.get("text", "") for part in candidates[0].get("content", {}).get("parts", []))
+
+
+class GeminiSDKBackend:
+    """A google.generativeai GenerativeModel, called through its async API"""
+
+    def __init__(self, model):
+        self.model = model
+        self.name = getattr(model, "model_name", "gemini")
+
+    async def generate(self, prompt: str, timeout_s: float) -> str:
+        if hasattr(self.model, "generate_content_async"):
+            response = await self.model.generate_content_async(prompt, request_options={"timeout": timeout_s})
+        else:
+            # Older SDKs: the blocking call runs on a worker thread
+            response = await asyncio.to_thread(self.model.generate_content, prompt)
+        return response.text
+
+    async def stream(self, prompt: str, timeout_s: float) -> AsyncIterator[str]:
+        if not hasattr(self.model, "generate_content_async"):
+            yield await self.generate(prompt, timeout_s)
+            return
+        response = await self.model.generate_content_async(prompt, stream=True, request_options={"timeout": timeout_s})
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    async def close(self) -> None:
+        pass
+
+
+class GeminiHTTPBackend:
+    """
+    The Gemini REST `generateContent` endpoint over one pooled httpx client.
+    `base_url` may point at llm_stub.py instead of the real API.
+    """
+
+    def __init__(self, base_url: str = GEMINI_API_URL, model: str = DEFAULT_MODEL, api_key: Optional[str] = None,
+                 max_connections: int = MAX_CONCURRENCY):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.name = model
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self._client = None
+        self._client_loop = None
+
+    def _http(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Connection pools belong to one event loop
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                headers={"x-goog-api-key": self.api_key} if self.api_key else None,
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def generate(self, prompt: str, timeout_s: float) -> str:
+        response = await self._http().post(
+            f"{self.base_url}/v1beta/models/{self.model}:generateContent",
+            json={"contents": [{"parts": [{"text": prompt}]}]},
+            timeout=timeout_s,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        if not payload.get("candidates"):
+            raise ValueError("Gemini returned no candidates")
+        return candidate_text(payload)
+
+    async def stream(self, prompt: str, timeout_s: float) -> AsyncIterator[str]:
+        """`streamGenerateContent` as server-sent events; leaving early closes the upstream connection"""
+        async with self._http().stream(
+            "POST", f"{self.base_url}/v1beta/models/{self.model}:streamGenerateContent",
+            params={"alt": "sse"}, json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=timeout_s,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    text = candidate_text(json.loads(line[5:]))
+                    if text:
+                        yield text
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LLMClient:
+    """
+    Concurrency-limited, single-flight front for an LLM backend.
+
+    `generate(prompt)` returns the model's text or raises LLMUnavailable.
+    A merged caller that disconnects does not cancel the shared upstream
+    call for the others. `stream(prompt)` is never merged: each stream is
+    its own upstream call, cancelled when its consumer stops reading.
+    """
+
+    def __init__(self, backend, max_concurrency: int = MAX_CONCURRENCY, timeout_s: float = TIMEOUT_S,
+                 queue_wait_s: float = QUEUE_WAIT_S, breaker_failures: int = BREAKER_FAILURES,
+                 breaker_cooldown_s: float = BREAKER_COOLDOWN_S):
+        self.backend = backend
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_s = timeout_s
+        self.queue_wait_s = queue_wait_s
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown_s = breaker_cooldown_s
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._failures = 0
+        self._open_until = 0.0
+        self.active = 0
+        self.latency = LatencyTracker()
+        self.stream_ttft = LatencyTracker()
+        self.stream_latency = LatencyTracker()
+        self.stats = {"requests": 0, "calls": 0, "coalesced": 0, "busy": 0, "timeouts": 0, "errors": 0,
+                      "breaker_rejections": 0, "peak_active": 0, "streams": 0, "streams_cancelled": 0}
+
+    @staticmethod
+    def _key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    async def generate(self, prompt: str) -> str:
+        self.stats["requests"] += 1
+        key = self._key(prompt)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._call(prompt))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Retrieved here so that a call every waiter abandoned is not reported as unhandled
+            task.exception()
+
+    async def _acquire(self) -> None:
+        if time.monotonic() < self._open_until:
+            self.stats["breaker_rejections"] += 1
+            raise LLMUnavailable("breaker_open", f"{self._failures} consecutive failures")
+        if self.queue_wait_s <= 0:
+            if self._slots.locked():
+                self.stats["busy"] += 1
+                raise LLMUnavailable("busy", f"{self.max_concurrency} calls in flight")
+            await self._slots.acquire()
+            return
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_wait_s)
+        except asyncio.TimeoutError:
+            self.stats["busy"] += 1
+            raise LLMUnavailable("busy", f"no slot within {self.queue_wait_s}s") from None
+
+    async def _call(self, prompt: str) -> str:
+        await self._acquire()
+        self.active += 1
+        self.stats["peak_active"] = max(self.stats["peak_active"], self.active)
+        self.stats["calls"] += 1
+        started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(self.backend.generate(prompt, self.timeout_s), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            self._failed()
+            raise LLMUnavailable("timeout", f"no answer within {self.timeout_s}s") from None
+        except Exception as e:
+            self.stats["errors"] += 1
+            self._failed()
+            raise LLMUnavailable("error", str(e).splitlines()[0] if str(e) else type(e).__name__) from e
+        finally:
+            self.active -= 1
+            self._slots.release()
+        self._failures = 0
+        self.latency.add((time.perf_counter() - started) * 1000)
+        return text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Chunks of the answer as they are generated. Raises LLMUnavailable
+        (possibly after some chunks) on busy, breaker, timeout or error;
+        `timeout_s` bounds the whole generation.
+        """
+        await self._acquire()
+        self.active += 1
+        self.stats["peak_active"] = max(self.stats["peak_active"], self.active)
+        self.stats["streams"] += 1
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout_s
+        chunks = self.backend.stream(prompt, self.timeout_s)
+        first = True
+        try:
+            while True:
+                try:
+                    text = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    break
+                if first:
+                    self.stream_ttft.add((time.perf_counter() - started) * 1000)
+                    first = False
+                yield text
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            self._failed()
+            raise LLMUnavailable("timeout", f"no complete answer within {self.timeout_s}s") from None
+        except (asyncio.CancelledError, GeneratorExit):
+            # The consumer went away: closing `chunks` below cancels the upstream generation
+            self.stats["streams_cancelled"] += 1
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            self._failed()
+            raise LLMUnavailable("error", str(e).splitlines()[0] if str(e) else type(e).__name__) from e
+        finally:
+            self.active -= 1
+            self._slots.release()
+            # Shielded: a cancelled consumer is cancelled again at every await,
+            # and the upstream connection must still be closed
+            await asyncio.shield(chunks.aclose())
+        self._failures = 0
+        self.stream_latency.add((time.perf_counter() - started) * 1000)
+
+    def _failed(self) -> None:
+        self._failures += 1
+        if self.breaker_failures > 0 and self._failures >= self.breaker_failures:
+            self._open_until = time.monotonic() + self.breaker_cooldown_s
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "model": self.backend.name,
+            "max_concurrency": self.max_concurrency,
+            "timeout_s": self.timeout_s,
+            "queue_wait_s": self.queue_wait_s,
+            "active": self.active,
+            "in_flight_prompts": len(self._in_flight),
+            "breaker_open": time.monotonic() < self._open_until,
+            "latency_ms": self.latency.percentiles(),
+            "stream_ttft_ms": self.stream_ttft.percentiles(),
+            "stream_latency_ms": self.stream_latency.percentiles(),
+            **self.stats,
+        }
+
+
+def discover_gemini_model():
+    """
+    Import and configure the Gemini SDK and return the first model that
+    loads, or None. Slow (SDK import, a network call to list models), so the
+    server runs it in the background after it starts listening.
+    """
+    try:
+        import google.generativeai as genai
+
+        # Configure Gemini
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+        genai.configure(api_key=api_key)
+
+        # Try to get available models to verify API access
+        try:
+            available_models = genai.list_models()
+            print(f"✅ Available Gemini models: {[model.name for model in available_models]}")
+        except Exception as model_error:
+            print(f"⚠️ Could not list models: {model_error}")
+
+        # Try different model names with fallbacks
+        for model_name in GEMINI_MODEL_NAMES:
+            try:
+                gemini_model = genai.GenerativeModel(model_name)
+                print(f"✅ Successfully loaded Gemini model: {model_name}")
+                print("✅ Gemini Pro API configured successfully")
+                return gemini_model
+            except Exception as model_error:
+                print(f"⚠️ Failed to load {model_name}: {model_error}")
+        print("❌ Could not load any Gemini model")
+
+    except Exception as e:
+        print(f"⚠️ Gemini API not available: {e}")
+    return None
+
+
+def create_llm_client(gemini_model=None) -> Optional[LLMClient]:
+    """
+    Client for ORCA_LLM_BASE_URL (REST, e.g. llm_stub.py) when set, otherwise
+    for the configured SDK model; None when neither is available.
+    """
+    base_url = os.getenv("ORCA_LLM_BASE_URL")
+    if base_url:
+        backend = GeminiHTTPBackend(base_url, os.getenv("ORCA_LLM_MODEL", DEFAULT_MODEL), os.getenv("GEMINI_API_KEY"))
+    elif gemini_model is not None:
+        backend = GeminiSDKBackend(gemini_model)
+    else:
+        return None
+    return LLMClient(backend)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load-test the LLM client against a Gemini-compatible endpoint")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8090", help="e.g. a running llm_stub.py")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct prompts among the requests")
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--timeout-s", type=float, default=TIMEOUT_S)
+    parser.add_argument("--queue-wait-s", type=float, default=QUEUE_WAIT_S)
+    args = parser.parse_args()
+
+    async def load_test() -> None:
+        client = LLMClient(GeminiHTTPBackend(args.base_url, args.model), args.max_concurrency, args.timeout_s,
+                           args.queue_wait_s, breaker_failures=0)
+        outcomes: Dict[str, int] = {}
+
+        async def one(i: int) -> None:
+            try:
+                await client.generate(f"Load test prompt {i % args.distinct}")
+                outcome = "ok"
+            except LLMUnavailable as e:
+                outcome = e.reason
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+        await client.close()
+        print(f"🧪 {args.requests} requests in {elapsed:.2f}s: {outcomes}")
+        print(f"📊 {client.describe()}")
+
+    asyncio.run(load_test())
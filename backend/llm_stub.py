@@ -0,0 +1,184 @@
+"""
+ORCA PREDATOR - LLM Stub Server
+A local stand-in for the Gemini REST API (`generateContent` and
+`streamGenerateContent`) that simulates slow, failing and hanging responses,
+so the LLM client and the AI endpoints can be load-tested without the real
+API or a key.
+
+    python llm_stub.py --port 8090 --latency-ms 2000 --failure-rate 0.2
+    ORCA_LLM_BASE_URL=http://127.0.0.1:8090 uvicorn main:app
+"""
+
+import asyncio
+import json
+import random
+from typing import Dict, Any, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Behaviour, changed from the command line or at runtime via POST /config
+config: Dict[str, Any] = {
+    "latency_ms": 1000.0,
+    "jitter_ms": 250.0,
+    # Streaming: the latency above is the time to the first chunk, then one chunk every token_ms
+    "token_ms": 50.0,
+    # Fraction of calls answered with HTTP 500 / 429 after the latency
+    "failure_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    # Fraction of calls that never answer within any sensible timeout
+    "hang_rate": 0.0,
+}
+stats = {"requests": 0, "failures": 0, "rate_limited": 0, "hangs": 0, "active": 0, "peak_active": 0,
+         "streams": 0, "streams_completed": 0, "streams_cancelled": 0}
+rng = random.Random(0)
+
+app = FastAPI(title="ORCA LLM Stub")
+
+MAINTENANCE_TASKS = [
+    {
+        "task_name": "Inspect drive bearings",
+        "priority": "high",
+        "estimated_time": 2,
+        "required_tools": ["Vibration meter", "Grease gun"],
+        "required_parts": ["Bearing kit"],
+        "step_by_step_instructions": ["Lock out the machine", "Measure vibration", "Regrease or replace bearings"],
+        "safety_notes": "Lock out and tag out before opening guards",
+        "cost_estimate": "$150",
+        "risk_assessment": "Bearing failure within weeks if vibration keeps rising",
+    },
+    {
+        "task_name": "Clean and sanitize contact surfaces",
+        "priority": "medium",
+        "estimated_time": 1,
+        "required_tools": ["Food-safe sanitizer"],
+        "required_parts": [],
+        "step_by_step_instructions": ["Remove residue", "Sanitize", "Log the cleaning"],
+        "safety_notes": "Wear gloves and eye protection",
+        "cost_estimate": "$20",
+        "risk_assessment": "Low",
+    },
+]
+
+
+def reply(prompt: str) -> str:
+    """Canned text shaped like what the real model returns for ORCA's prompts"""
+    if "Format as JSON" in prompt:
+        return f"```json\n{json.dumps(MAINTENANCE_TASKS, indent=2)}\n```"
+    return ("(stub) ORCA AI here. Based on the readings, keep an eye on vibration and temperature trends "
+            "and schedule an inspection at the next planned stop.")
+
+
+def prompt_of(body: Dict[str, Any]) -> str:
+    return "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+
+
+def candidate(text: str, model: str) -> Dict[str, Any]:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "modelVersion": model}
+
+
+async def simulate_call() -> Optional[JSONResponse]:
+    """Latency, hangs and failures shared by both endpoints; an error response or None"""
+    if rng.random() < config["hang_rate"]:
+        stats["hangs"] += 1
+        await asyncio.sleep(3600)
+    latency_s = max(0.0, config["latency_ms"] + rng.uniform(-1, 1) * config["jitter_ms"]) / 1000
+    await asyncio.sleep(latency_s)
+
+    draw = rng.random()
+    if draw < config["failure_rate"]:
+        stats["failures"] += 1
+        return JSONResponse({"error": {"code": 500, "message": "stub failure", "status": "INTERNAL"}},
+                            status_code=500)
+    if draw < config["failure_rate"] + config["rate_limit_rate"]:
+        stats["rate_limited"] += 1
+        return JSONResponse({"error": {"code": 429, "message": "stub rate limit",
+                                       "status": "RESOURCE_EXHAUSTED"}}, status_code=429)
+    return None
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def generate_content(model: str, body: Dict[str, Any]):
+    stats["requests"] += 1
+    stats["active"] += 1
+    stats["peak_active"] = max(stats["peak_active"], stats["active"])
+    try:
+        error = await simulate_call()
+        return error if error is not None else candidate(reply(prompt_of(body)), model)
+    finally:
+        stats["active"] -= 1
+
+
+@app.post("/v1beta/models/{model}:streamGenerateContent")
+async def stream_generate_content(model: str, body: Dict[str, Any]):
+    """Server-sent events (`alt=sse`), a few words per chunk"""
+    stats["requests"] += 1
+    stats["streams"] += 1
+    stats["active"] += 1
+    stats["peak_active"] = max(stats["peak_active"], stats["active"])
+    try:
+        error = await simulate_call()
+    except BaseException:
+        stats["active"] -= 1
+        raise
+    if error is not None:
+        stats["active"] -= 1
+        return error
+
+    words = reply(prompt_of(body)).split(" ")
+    pieces = [" ".join(words[i:i + 3]) + (" " if i + 3 < len(words) else "") for i in range(0, len(words), 3)]
+
+    async def events():
+        try:
+            for i, piece in enumerate(pieces):
+                if i:
+                    await asyncio.sleep(config["token_ms"] / 1000)
+                yield f"data: {json.dumps(candidate(piece, model))}\r\n\r\n"
+            stats["streams_completed"] += 1
+        except (asyncio.CancelledError, GeneratorExit):
+            # The caller hung up: the generation stops here
+            stats["streams_cancelled"] += 1
+            raise
+        finally:
+            stats["active"] -= 1
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return {"config": config, **stats}
+
+
+@app.post("/config")
+async def set_config(changes: Dict[str, float]):
+    unknown = set(changes) - set(config)
+    if unknown:
+        return JSONResponse({"detail": f"Unknown settings: {', '.join(sorted(unknown))}"}, status_code=400)
+    config.update({key: float(value) for key, value in changes.items()})
+    return config
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Simulated Gemini API for ORCA load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter_ms"])
+    parser.add_argument("--token-ms", type=float, default=config["token_ms"])
+    parser.add_argument("--failure-rate", type=float, default=config["failure_rate"])
+    parser.add_argument("--rate-limit-rate", type=float, default=config["rate_limit_rate"])
+    parser.add_argument("--hang-rate", type=float, default=config["hang_rate"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, token_ms=args.token_ms,
+                  failure_rate=args.failure_rate, rate_limit_rate=args.rate_limit_rate, hang_rate=args.hang_rate)
+    rng.seed(args.seed)
+    print(f"🤖 LLM stub on http://{args.host}:{args.port} ({config})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -1,64 +1,88 @@
-from fastapi import FastAPI, HTTPException
+# Startup phases are timed from the first import
+from startup import startup, StartupGate
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-import joblib
 import os
+import asyncio
+from contextlib import asynccontextmanager
 import json
+import re
+import time
 from datetime import datetime, timedelta
-import random
 
-# Import Gemini AI
+# FastAPI, pydantic and NumPy are most of the time before the port opens
+framework_imported = time.time()
+
 try:
-    import google.generativeai as genai
     from dotenv import load_dotenv
     load_dotenv()
-    
-    # Configure Gemini
-    api_key = os.getenv('GEMINI_API_KEY')
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found in environment variables")
-    
-    genai.configure(api_key=api_key)
-    
-    # Try to get available models to verify API access
-    try:
-        available_models = genai.list_models()
-        print(f"✅ Available Gemini models: {[model.name for model in available_models]}")
-    except Exception as model_error:
-        print(f"⚠️ Could not list models: {model_error}")
-    
-    # Try different model names with fallbacks
-    model_names_to_try = ['gemini-1.5-pro', 'gemini-1.0-pro', 'gemini-pro']
-    gemini_model = None
-    
-    for model_name in model_names_to_try:
-        try:
-            gemini_model = genai.GenerativeModel(model_name)
-            print(f"✅ Successfully loaded Gemini model: {model_name}")
-            break
-        except Exception as model_error:
-            print(f"⚠️ Failed to load {model_name}: {model_error}")
-            continue
-    
-    if gemini_model:
-        GEMINI_AVAILABLE = True
-        print("✅ Gemini Pro API configured successfully")
-    else:
-        GEMINI_AVAILABLE = False
-        print("❌ Could not load any Gemini model")
-    
-except Exception as e:
-    print(f"⚠️ Gemini API not available: {e}")
-    GEMINI_AVAILABLE = False
-    gemini_model = None
+except ImportError:
+    pass
+
+# All LLM calls go through one async, concurrency-limited client; an
+# ORCA_LLM_BASE_URL (e.g. llm_stub.py) is used right away, the Gemini SDK
+# model is discovered in the background after startup
+from llm_client import create_llm_client, discover_gemini_model, LLMUnavailable, LatencyTracker
+llm_client = create_llm_client()
+GEMINI_AVAILABLE = llm_client is not None
+
+# Gemini maintenance plans persisted across restarts (ORCA_PLAN_CACHE_PATH)
+from plan_cache import create_plan_cache
+plan_cache = create_plan_cache()
 
 # Import our new mock company data generator
-from mock_company import marias_margheritas_mock
+from mock_company import marias_margheritas_mock, PROFILE_NAMES, sensor_profile
+from fleet_generator import FleetGenerator, iter_fleet_file
+from fleet_state import fleet_state
+from durable_store import durable_store
+from live_updates import live_updates, format_sse, parse_subscription
+from prefork import describe_memory
 
-app = FastAPI(title="ORCA PREDATOR API", version="1.0.0")
+async def discover_llm():
+    """Look up the Gemini SDK model (SDK import plus a network call) unless a REST endpoint is configured"""
+    global llm_client, GEMINI_AVAILABLE
+    if llm_client is not None:
+        return
+    gemini_model = await startup.run("gemini", discover_gemini_model, required=False)
+    if gemini_model is not None:
+        llm_client = create_llm_client(gemini_model)
+        GEMINI_AVAILABLE = True
+
+async def warm_up():
+    """Everything slow, after the port is open: fleet, then model warm-up and Gemini discovery"""
+    await startup.run("fleet", initialize_mock_data)
+    if startup.done("fleet"):
+        # Advance the simulation in the background at ORCA_SIM_TICK_S
+        fleet_state.start()
+    await asyncio.gather(warm_up_models(), discover_llm())
+    startup.finish()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # uvicorn opens the port as soon as this yields
+    warm_up_task = asyncio.create_task(warm_up())
+    startup.mark_listening()
+    yield
+    warm_up_task.cancel()
+    try:
+        await warm_up_task
+    except asyncio.CancelledError:
+        pass
+    await fleet_state.stop()
+    if durable_store is not None:
+        # Commit whatever the group-commit writer still holds
+        await asyncio.to_thread(durable_store.close)
+    if llm_client is not None:
+        await llm_client.close()
+
+app = FastAPI(title="ORCA PREDATOR API", version="1.0.0", lifespan=lifespan)
+
+# 503 for API requests until the fleet exists (added first so CORS headers still apply)
+app.add_middleware(StartupGate, tracker=startup, phase="fleet")
 
 # Add CORS middleware
 app.add_middleware(
@@ -70,60 +94,135 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load pre-trained models (NASA dataset models adapted for manufacturing)
-try:
-    # Load the available XGBoost models
-    xgb_model_fd001 = joblib.load('models/models/FD001_XGBoostRegressor.pkl')
-    xgb_model_fd002 = joblib.load('models/models/FD002_XGBoostRegressor.pkl')
-    xgb_model_fd003 = joblib.load('models/models/FD003_XGBoostRegressor.pkl')
-    xgb_model_fd004 = joblib.load('models/models/FD004_XGBoostRegressor.pkl')
-    
-    # Use FD001 as the primary model for now
-    xgb_model = xgb_model_fd001
-    
-    print("✅ XGBoost models loaded successfully")
-    print(f"   - FD001: {type(xgb_model_fd001).__name__}")
-    print(f"   - FD002: {type(xgb_model_fd002).__name__}")
-    print(f"   - FD003: {type(xgb_model_fd003).__name__}")
-    print(f"   - FD004: {type(xgb_model_fd004).__name__}")
-    
-except Exception as e:
-    print(f"⚠️ Warning: Could not load some models: {e}")
-    xgb_model = None
-    xgb_model_fd001 = None
-    xgb_model_fd002 = None
-    xgb_model_fd003 = None
-    xgb_model_fd004 = None
-
-# For now, we'll use mock scaler since the original one might not exist
-scaler = None
-
-# Mock data storage (will be replaced with real database)
-mock_equipment = []
-mock_sensor_data = {}
-mock_summary = {}
+# Pre-trained models (NASA dataset models adapted for manufacturing) are
+# discovered up front but only loaded on first use
+from model_registry import model_registry
+from inference import (
+    predict_snapshots, predict_windows, predict_window_stacks, count_numeric_readings, MIN_SENSOR_READINGS,
+    run_inference, describe_pool, load_in_background, warm_model, model_loader
+)
+from sequence_buffers import sequence_buffers
+from timeseries_store import sensor_history
+from micro_batching import create_micro_batcher, micro_batching_enabled
+from prediction_cache import create_prediction_cache
+from ensemble import EnsembleEngine, ENSEMBLE_TIERS, DEFAULT_TIER, DEFAULT_DEADLINE_MS, parse_weights
+from file_ingest import FileAnalysis, UploadStream, UploadResponse, FORMATS as FILE_FORMATS
+
+DEFAULT_DATASET = os.getenv("ORCA_DEFAULT_DATASET", "FD001")
+print(f"✅ Model registry discovered {len(model_registry.specs)} models "
+      f"across {', '.join(model_registry.datasets())}")
+
+# Opt-in micro-batching: concurrent single-item predictions for the same
+# model are grouped into one matrix (ORCA_MICROBATCH=1). Sequence windows for
+# the Keras models are stacked on axis 0 into one (N, window, F) call.
+snapshot_batcher = window_batcher = None
+if micro_batching_enabled():
+    snapshot_batcher = create_micro_batcher(
+        lambda key, sensor_dicts: run_inference(predict_snapshots, key[0], sensor_dicts, key[1])
+    )
+    window_batcher = create_micro_batcher(
+        lambda key, stacks: run_inference(predict_window_stacks, key[0], key[1], stacks)
+    )
+    print(f"✅ Micro-batching enabled ({snapshot_batcher.window_s * 1000:.1f} ms window, "
+          f"max {snapshot_batcher.max_batch_size} items)")
+
+async def predict_snapshot(dataset: str, sensor_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Score one sensor snapshot with XGBoost, through the micro-batcher when enabled"""
+    if snapshot_batcher:
+        return await snapshot_batcher.submit((dataset, "xgboost"), sensor_data)
+    return (await run_inference(predict_snapshots, dataset, [sensor_data], "xgboost"))[0]
+
+async def predict_window(dataset: str, architecture: str, windows: np.ndarray) -> np.ndarray:
+    """Score (N, window, F) sequences, through the micro-batcher when enabled"""
+    if window_batcher:
+        # Only windows of the same shape can be stacked
+        return await window_batcher.submit((dataset, architecture, windows.shape[1:]), windows)
+    return await run_inference(predict_windows, dataset, architecture, windows)
+
+# Per-model prediction cache, flushed whenever the registry reloads an artifact
+prediction_cache = create_prediction_cache()
+if prediction_cache:
+    model_registry.add_listener(prediction_cache.invalidate)
+
+# Runs XGBoost, CNN-LSTM and CNN-BiLSTM-Attention concurrently under a deadline
+ensemble_engine = EnsembleEngine(model_registry, predict_snapshot, predict_window, load_in_background,
+                                 prediction_cache)
+
+# Upper bound on items scored by a single batch request
+MAX_BATCH_SIZE = int(os.getenv("ORCA_MAX_BATCH_SIZE", "4096"))
+
+class BatchPredictionRequest(BaseModel):
+    """Either equipment IDs (scored from their latest sensor data) or raw sensor dicts"""
+    dataset: str = DEFAULT_DATASET
+    equipment_ids: Optional[List[str]] = None
+    items: Optional[List[Dict[str, Any]]] = None
+
+# Seed for the fleet simulation (unset = different run every start)
+SIMULATION_SEED = int(os.environ["ORCA_SIM_SEED"]) if os.getenv("ORCA_SIM_SEED") else None
+
+# Serve a generated multi-site fleet (or a dumped one) instead of Maria's 25 machines
+FLEET_SITES = int(os.getenv("ORCA_FLEET_SITES", "0"))
+FLEET_MACHINES_PER_CATEGORY = int(os.getenv("ORCA_FLEET_MACHINES_PER_CATEGORY", "0")) or None
+FLEET_FILE = os.getenv("ORCA_FLEET_FILE")
+
+def load_equipment() -> List[Dict[str, Any]]:
+    if FLEET_FILE:
+        return [record for chunk in iter_fleet_file(FLEET_FILE) for record in chunk]
+    if FLEET_SITES:
+        fleet = FleetGenerator(FLEET_SITES, FLEET_MACHINES_PER_CATEGORY, seed=SIMULATION_SEED or 0)
+        return [record for chunk in fleet.iter_chunks() for record in chunk]
+    return marias_margheritas_mock.generate_equipment_data()
+
+def parse_time_param(value: Optional[str], name: str) -> Optional[float]:
+    """Accept Unix seconds or an ISO 8601 timestamp"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid '{name}': use Unix seconds or ISO 8601")
 
 def initialize_mock_data():
     """Initialize mock data using Maria's Margheritas generator"""
-    global mock_equipment, mock_sensor_data, mock_summary
-    
-    # Generate equipment data
-    mock_equipment = marias_margheritas_mock.generate_equipment_data()
-    
-    # Generate sensor data for each equipment
-    for equipment in mock_equipment:
-        equipment_id = equipment['equipment_id']
-        mock_sensor_data[equipment_id] = marias_margheritas_mock.generate_sensor_data(
-            equipment_id, equipment['name']
-        )
-    
-    # Generate summary data
-    mock_summary = marias_margheritas_mock.generate_summary_data()
-    
-    print(f"🍕 Initialized Maria's Margheritas manufacturing unit with {len(mock_equipment)} machines")
+    # Tick 0 of the fleet state: equipment, initial readings, summary and indexes
+    # (or the shared fleet another worker owns, with ORCA_FLEET_BACKEND=sqlite)
+    fleet_key = json.dumps([FLEET_FILE, FLEET_SITES, FLEET_MACHINES_PER_CATEGORY, SIMULATION_SEED])
+    snapshot = fleet_state.initialize(load_equipment, SIMULATION_SEED, fleet_key)
+    print(f"🍕 Initialized Maria's Margheritas manufacturing unit with {len(snapshot.equipment)} machines")
+
+# Models loaded and run once before /readyz reports ready (dataset/architecture,
+# comma-separated; empty to skip). Defaults to every model of the default dataset.
+WARM_MODELS = [
+    item.strip() for item in os.getenv(
+        "ORCA_WARM_MODELS",
+        ",".join(f"{DEFAULT_DATASET}/{arch}" for arch in model_registry.architectures(DEFAULT_DATASET))
+    ).split(",") if item.strip()
+]
+
+async def warm_up_models():
+    for item in WARM_MODELS:
+        dataset, _, architecture = item.partition("/")
+        await startup.run(f"model {item}", warm_model, dataset, architecture or "xgboost", executor=model_loader)
 
-# Initialize mock data on startup
-initialize_mock_data()
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: fleet initialized and models warmed (503 until then); includes the startup phase timings"""
+    body = startup.describe()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/api/system/memory")
+async def system_memory():
+    """RSS, PSS and USS of this server, or of the master and every worker under prefork.py"""
+    return describe_memory()
 
 @app.get("/")
 async def root():
@@ -131,139 +230,436 @@ async def root():
         "message": "ORCA PREDATOR API - Maria's Margheritas Manufacturing Unit",
         "version": "1.0.0",
         "status": "active",
-        "equipment_count": len(mock_equipment)
+        "equipment_count": len(fleet_state.current.equipment)
     }
 
 @app.get("/api/mock/equipment")
-async def get_equipment():
-    """Get all manufacturing equipment data"""
-    return mock_equipment
+async def get_equipment(response: Response, status: Optional[str] = None, category: Optional[str] = None,
+                        location: Optional[str] = None, site: Optional[str] = None,
+                        rul_min: Optional[int] = None, rul_max: Optional[int] = None,
+                        limit: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None):
+    """
+    Get manufacturing equipment data, optionally filtered and paginated.
+    The body is always a list; X-Total-Count has the number of matches and
+    X-Next-Cursor the cursor for the next page (absent on the last page).
+    """
+    try:
+        page, next_cursor, total = fleet_state.current.index.query(
+            {"status": status, "category": category, "location": location, "site": site},
+            rul_min=rul_min, rul_max=rul_max, cursor=cursor, limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["X-Total-Count"] = str(total)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 @app.get("/api/mock/equipment/{equipment_id}")
 async def get_equipment_by_id(equipment_id: str):
     """Get specific equipment by ID"""
-    equipment = next((eq for eq in mock_equipment if eq['equipment_id'] == equipment_id), None)
+    equipment = fleet_state.current.index.get(equipment_id)
     if not equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
     return equipment
 
+@app.get("/api/mock/history/stats")
+async def get_history_stats():
+    """Sensor time-series store size, retention and bytes per stored value"""
+    return sensor_history.describe()
+
+@app.get("/api/mock/persistence/stats")
+async def get_persistence_stats():
+    """Durable store size, group-commit throughput and what was restored at startup"""
+    if durable_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **durable_store.describe()}
+
 @app.get("/api/mock/sensor-data/{equipment_id}")
-async def get_sensor_data(equipment_id: str):
-    """Get sensor data for specific equipment"""
-    if equipment_id not in mock_sensor_data:
+async def get_sensor_data(equipment_id: str, from_: Optional[str] = Query(None, alias="from"),
+                          to: Optional[str] = None, resolution: Optional[str] = None,
+                          sensors: Optional[str] = None):
+    """
+    Get sensor data for specific equipment. Without a range this is the latest
+    reading; with from/to/resolution it is the stored history (raw, 1m, 1h or auto).
+    """
+    if from_ is not None or to is not None or resolution is not None:
+        try:
+            return sensor_history.query(
+                equipment_id,
+                start=parse_time_param(from_, "from"),
+                end=parse_time_param(to, "to"),
+                resolution=resolution or "auto",
+                sensors=[name.strip() for name in sensors.split(",") if name.strip()] if sensors else None,
+            )
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=e.args[0])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    state = fleet_state.current
+    if equipment_id not in state.sensor_data:
         # Generate sensor data on-demand if equipment exists but sensor data is missing
-        equipment = next((eq for eq in mock_equipment if eq['equipment_id'] == equipment_id), None)
+        equipment = state.index.get(equipment_id)
         if equipment:
             sensor_data = marias_margheritas_mock.generate_sensor_data(
                 equipment_id, equipment['name']
             )
-            mock_sensor_data[equipment_id] = sensor_data
+            fleet_state.record_reading(equipment_id, sensor_data)
             return sensor_data
         else:
-            available_ids = [eq['equipment_id'] for eq in mock_equipment]
+            available_ids = state.index.ids(limit=10)
             raise HTTPException(
                 status_code=404, 
-                detail=f"Equipment {equipment_id} not found. Available equipment IDs: {available_ids[:10]}"
+                detail=f"Equipment {equipment_id} not found. Available equipment IDs: {available_ids}"
             )
-    return mock_sensor_data[equipment_id]
+    return state.sensor_data[equipment_id]
 
 @app.get("/api/mock/summary")
 async def get_summary():
-    """Get manufacturing unit summary"""
-    return mock_summary
+    """Get manufacturing unit summary (equipment counts, alerts and RUL from the live fleet state)"""
+    return dict(fleet_state.current.summary)
 
 @app.post("/api/mock/simulate")
 async def simulate_update():
-    """Simulate real-time equipment updates and degradation"""
-    global mock_equipment, mock_sensor_data, mock_summary
+    """Simulate real-time equipment updates and degradation (one tick, as the background ticker does)"""
+    try:
+        snapshot = await fleet_state.advance()
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
-    # Simulate equipment degradation
-    mock_equipment = marias_margheritas_mock.simulate_equipment_degradation(mock_equipment)
+    return {
+        "message": "Simulation completed",
+        "timestamp": datetime.now().isoformat(),
+        "tick": snapshot.tick,
+        "equipment_updated": len(snapshot.equipment)
+    }
+
+@app.get("/api/mock/anomalies")
+async def get_anomalies(equipment_id: Optional[str] = None, sensor: Optional[str] = None,
+                        kind: Optional[str] = None, limit: int = Query(100, ge=1)):
+    """Sensor anomalies (spike, shift, drift) active at the current tick, with the running statistics behind them"""
+    state = fleet_state.current
+    anomalies = [
+        anomaly for anomaly in state.anomalies
+        if (equipment_id is None or anomaly["equipment_id"] == equipment_id)
+        and (sensor is None or anomaly["sensor"] == sensor)
+        and (kind is None or kind in anomaly["kinds"])
+    ]
+    detector = fleet_state.simulator.detector if fleet_state.simulator else None
+    return {
+        "tick": state.tick,
+        "total": len(anomalies),
+        "anomalies": anomalies[:limit],
+        "detector": detector.describe() if detector else {"enabled": False}
+    }
+
+@app.get("/api/mock/simulation/stats")
+async def get_simulation_stats():
+    """Current simulation tick, ticker status and tick timings"""
+    return fleet_state.describe()
+
+def live_snapshot(subscription) -> Dict[str, Any]:
+    """Current state of everything a live subscription covers"""
+    state = fleet_state.current
+    if subscription.equipment_ids is None and subscription.categories is None:
+        equipment = state.equipment
+    else:
+        equipment = [eq for eq in (state.index.get(eid) for eid in subscription.equipment_ids or ()) if eq]
+        for category in subscription.categories or ():
+            equipment.extend(state.index.query({"category": category})[0])
+        equipment = list({eq['equipment_id']: eq for eq in equipment}.values())
+    snapshot = {"tick": live_updates.tick, "equipment": {eq['equipment_id']: eq for eq in equipment}}
+    if subscription.sensors:
+        snapshot["sensors"] = {eid: state.sensor_data[eid] for eid in snapshot["equipment"] if eid in state.sensor_data}
+    if subscription.summary:
+        snapshot["summary"] = dict(state.summary)
+    return snapshot
+
+@app.get("/api/live/stream")
+async def live_stream(equipment_ids: Optional[str] = None, categories: Optional[str] = None,
+                      sensors: bool = True, summary: bool = True, snapshot: bool = True):
+    """
+    Server-Sent Events: a "snapshot" event, then an "update" event with only the
+    changed equipment fields, new sensor samples and summary keys after each tick
+    (coalesced for slow clients). A "resync" event means refetch the REST endpoints.
+    Filter with comma-separated equipment_ids and/or categories.
+    """
+    subscription = parse_subscription(equipment_ids, categories, sensors, summary)
+    try:
+        client = live_updates.connect(subscription)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
-    # Update sensor data with some variation
-    for equipment in mock_equipment:
-        equipment_id = equipment['equipment_id']
-        base_sensor_data = marias_margheritas_mock.generate_sensor_data(
-            equipment_id, equipment['name']
-        )
-        
-        # Add some realistic variation to simulate real-time changes
-        for sensor, value in base_sensor_data.items():
-            if isinstance(value, (int, float)):
-                variation = random.uniform(0.95, 1.05)  # ±5% variation
-                base_sensor_data[sensor] = round(value * variation, 2)
-        
-        mock_sensor_data[equipment_id] = base_sensor_data
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if snapshot:
+                yield format_sse("snapshot", json.dumps(live_snapshot(subscription)))
+            while True:
+                message = await live_updates.next_message(client)
+                yield format_sse(*message) if message else ": keep-alive\n\n"
+        finally:
+            live_updates.disconnect(client)
     
-    # Update summary
-    mock_summary = marias_margheritas_mock.generate_summary_data()
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/api/live/ws")
+async def live_websocket(websocket: WebSocket, equipment_ids: Optional[str] = None,
+                         categories: Optional[str] = None, sensors: bool = True, summary: bool = True,
+                         snapshot: bool = True):
+    """
+    WebSocket variant of /api/live/stream. Messages are {"event": ..., "data": ...};
+    send {"equipment_ids": [...], "categories": [...]} to change the subscription.
+    """
+    await websocket.accept()
+    try:
+        client = live_updates.connect(parse_subscription(equipment_ids, categories, sensors, summary))
+    except RuntimeError as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
     
+    async def receive_filters():
+        while True:
+            request = await websocket.receive_json()
+            client.subscription = parse_subscription(
+                ",".join(request.get("equipment_ids") or []), ",".join(request.get("categories") or []),
+                request.get("sensors", client.subscription.sensors), request.get("summary", client.subscription.summary),
+            )
+    
+    receiver = asyncio.ensure_future(receive_filters())
+    try:
+        if snapshot:
+            await websocket.send_text(json.dumps({"event": "snapshot", "data": live_snapshot(client.subscription)}))
+        while True:
+            sender = asyncio.ensure_future(live_updates.next_message(client))
+            await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                sender.cancel()
+                break
+            message = sender.result()
+            if message is None:
+                await websocket.send_text('{"event":"ping"}')
+            else:
+                event, payload = message
+                await websocket.send_text(f'{{"event":"{event}","data":{payload}}}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        live_updates.disconnect(client)
+
+@app.get("/api/live/stats")
+async def live_stats():
+    """Connected live-update clients, their filters and send statistics"""
+    return live_updates.describe()
+
+@app.get("/api/models")
+async def list_models():
+    """List registered RUL models and which ones are currently loaded"""
+    return model_registry.describe()
+
+@app.post("/api/models/{dataset}/{architecture}/backend")
+async def set_model_backend(dataset: str, architecture: str, backend: str):
+    """Choose a model's serving backend (XGBoost: sklearn, inplace, compiled; Keras: keras, function, tflite*)"""
+    try:
+        model_registry.set_backend(dataset, architecture, backend)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"dataset": dataset, "architecture": architecture, "backend": backend}
+
+@app.post("/api/models/{dataset}/{architecture}/reload")
+async def reload_model(dataset: str, architecture: str):
+    """Reload a model artifact from disk; cached predictions for it are dropped"""
+    try:
+        loaded = await run_inference(model_registry.reload, dataset, architecture)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"dataset": dataset, "architecture": architecture, "version": loaded.version, "backend": loaded.backend}
+
+@app.get("/api/predict/stats")
+async def prediction_stats():
+    """Serving statistics for the prediction path"""
     return {
-        "message": "Simulation completed",
-        "timestamp": datetime.now().isoformat(),
-        "equipment_updated": len(mock_equipment)
+        "inference_pool": describe_pool(),
+        "micro_batching": {"xgboost": snapshot_batcher.describe(), "sequence": window_batcher.describe()}
+                          if snapshot_batcher else {"enabled": False},
+        "ensemble": ensemble_engine.stats,
+        "prediction_cache": prediction_cache.describe() if prediction_cache else {"enabled": False},
+        "sequence_buffers": sequence_buffers.describe()
     }
 
 @app.post("/api/predict/rul")
-async def predict_rul(sensor_data: Dict[str, Any]):
+async def predict_rul(sensor_data: Dict[str, Any], dataset: str = DEFAULT_DATASET, tier: str = DEFAULT_TIER,
+                      deadline_ms: float = DEFAULT_DEADLINE_MS, weights: Optional[str] = None,
+                      equipment_id: Optional[str] = None):
     """Predict Remaining Useful Life using ML models"""
     try:
-        # Prepare sensor data for prediction
-        sensor_values = []
-        sensor_names = []
-        
-        for sensor, value in sensor_data.items():
-            if isinstance(value, (int, float)):
-                sensor_values.append(float(value))
-                sensor_names.append(sensor)
-        
-        if len(sensor_values) < 5:
+        if not model_registry.has(dataset, "xgboost"):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Unknown dataset {dataset}. Available datasets: {model_registry.datasets()}"
+            )
+        if tier not in ENSEMBLE_TIERS:
+            raise HTTPException(status_code=400, detail=f"Unknown tier {tier}. Choose from {list(ENSEMBLE_TIERS)}")
+        try:
+            weight_overrides = parse_weights(weights)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if count_numeric_readings(sensor_data) < MIN_SENSOR_READINGS:
             raise HTTPException(status_code=400, detail="Insufficient sensor data")
         
-        # Pad or truncate to match model input size
-        target_size = 21  # NASA dataset size
-        if len(sensor_values) < target_size:
-            # Pad with zeros or repeat values
-            sensor_values.extend([0.0] * (target_size - len(sensor_values)))
-        elif len(sensor_values) > target_size:
-            # Truncate to target size
-            sensor_values = sensor_values[:target_size]
-        
-        # Normalize data
-        sensor_array = np.array(sensor_values).reshape(1, -1)
-        if scaler:
-            sensor_array = scaler.transform(sensor_array)
-        
-        # Make predictions with different models
-        predictions = {}
-        
-        if xgb_model:
-            try:
-                xgb_pred = xgb_model.predict(sensor_array)[0]
-                predictions["xgboost"] = max(0, int(xgb_pred))
-            except:
-                predictions["xgboost"] = "Error"
-        
-        # The original code had CNN-LSTM and CNN-BiLSTM-Attention models commented out.
-        # Since they are not loaded, we'll skip them for now.
+        # Sequence models use the equipment's buffered history when available,
+        # otherwise a steady-state window built from this reading
+        windows = {}
+        if equipment_id:
+            for architecture in ENSEMBLE_TIERS[tier]:
+                if architecture == "xgboost" or not model_registry.has(dataset, architecture):
+                    continue
+                try:
+                    windows[architecture], _ = sequence_buffers.window_copy(equipment_id, dataset, architecture)
+                except KeyError:
+                    pass
         
-        # Calculate ensemble prediction (average of successful predictions)
-        successful_predictions = [v for v in predictions.values() if isinstance(v, int)]
-        if successful_predictions:
-            ensemble_prediction = int(np.mean(successful_predictions))
-        else:
-            ensemble_prediction = "No successful predictions"
+        # Make predictions with different models, in parallel, within the deadline
+        result = await ensemble_engine.predict(
+            dataset, sensor_data, tier=tier, deadline_ms=deadline_ms,
+            weights=weight_overrides, windows=windows
+        )
+        if equipment_id and durable_store is not None and isinstance(result["ensemble_prediction"], int):
+            durable_store.record_predictions(
+                [(equipment_id, time.time(), dataset, f"ensemble_{tier}", result["ensemble_prediction"])]
+            )
         
         return {
-            "predictions": predictions,
-            "ensemble_prediction": ensemble_prediction,
-            "sensors_used": sensor_names,
+            **result,
+            "dataset": dataset,
             "timestamp": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+@app.post("/api/predict/rul/batch")
+async def predict_rul_batch(request: BatchPredictionRequest):
+    """Predict RUL for many machines with one vectorized call per model"""
+    if not model_registry.has(request.dataset, "xgboost"):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown dataset {request.dataset}. Available datasets: {model_registry.datasets()}"
+        )
+    
+    # Resolve the batch: explicit sensor dicts, equipment IDs, or the whole fleet
+    if request.items is not None:
+        labels = [None] * len(request.items)
+        sensor_dicts = list(request.items)
+    else:
+        state = fleet_state.current
+        equipment_ids = request.equipment_ids
+        if equipment_ids is None:
+            equipment_ids = state.index.ids()
+        labels = list(equipment_ids)
+        sensor_dicts = [state.sensor_data.get(equipment_id) for equipment_id in equipment_ids]
+    
+    if len(sensor_dicts) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch of {len(sensor_dicts)} items exceeds the limit of {MAX_BATCH_SIZE}"
+        )
+    
+    # Unknown equipment is reported per item; everything else is scored together
+    scorable = [i for i, data in enumerate(sensor_dicts) if data is not None]
+    try:
+        scored = await run_inference(
+            predict_snapshots, request.dataset, [sensor_dicts[i] for i in scorable], "xgboost"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
+    
+    results = []
+    for index, label in enumerate(labels):
+        entry = {"index": index}
+        if label is not None:
+            entry["equipment_id"] = label
+        if sensor_dicts[index] is None:
+            entry["error"] = f"Equipment {label} not found"
+        results.append(entry)
+    for index, result in zip(scorable, scored):
+        if "error" in result:
+            results[index]["error"] = result["error"]
+        else:
+            results[index]["predictions"] = {"xgboost": result["rul"]}
+            results[index]["ensemble_prediction"] = result["rul"]
+            results[index]["sensors_used"] = result["sensors_used"]
+    if durable_store is not None:
+        now = time.time()
+        durable_store.record_predictions([
+            (entry["equipment_id"], now, request.dataset, "xgboost", entry["ensemble_prediction"])
+            for entry in results if "equipment_id" in entry and "ensemble_prediction" in entry
+        ])
+    
+    failed = sum(1 for entry in results if "error" in entry)
+    return {
+        "dataset": request.dataset,
+        "results": results,
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/api/predict/rul/sequence/{equipment_id}")
+async def predict_rul_sequence(equipment_id: str, dataset: str = DEFAULT_DATASET,
+                               architecture: str = "cnn_lstm"):
+    """Predict RUL from an equipment's buffered window of recent cycles"""
+    spec = model_registry.specs.get((dataset, architecture))
+    if spec is None or not spec.is_sequence:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No sequence model {architecture} for {dataset}. "
+                   f"Sequence models: cnn_lstm, cnn_bilstm_attn; datasets: {model_registry.datasets()}"
+        )
+    try:
+        window, cycles = sequence_buffers.window_copy(equipment_id, dataset, architecture)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    try:
+        prediction = await predict_window(dataset, architecture, window[np.newaxis])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    if durable_store is not None:
+        durable_store.record_predictions([(equipment_id, time.time(), dataset, architecture, int(prediction[0]))])
+    
+    return {
+        "equipment_id": equipment_id,
+        "dataset": dataset,
+        "model": architecture,
+        "rul": int(prediction[0]),
+        "cycles_buffered": cycles,
+        "window": spec.window,
+        "window_complete": cycles >= spec.window,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/api/predict/rul/history/{equipment_id}")
+async def get_rul_history(equipment_id: str, from_: Optional[str] = Query(None, alias="from"),
+                          to: Optional[str] = None, limit: int = Query(1000, ge=1, le=100000)):
+    """Persisted RUL predictions of an equipment, newest first"""
+    if durable_store is None:
+        raise HTTPException(status_code=404, detail="Persistence is disabled (ORCA_PERSIST=0)")
+    predictions = await asyncio.to_thread(
+        durable_store.predictions, equipment_id,
+        parse_time_param(from_, "from"), parse_time_param(to, "to"), limit
+    )
+    return {"equipment_id": equipment_id, "total": len(predictions), "predictions": predictions}
+
 def generate_mock_maintenance_tasks(equipment_id: str, sensor_data: Dict[str, Any], rul: int) -> List[Dict[str, Any]]:
     """Generates mock maintenance tasks based on equipment ID, sensor data, and RUL."""
     maintenance_tasks = []
@@ -342,17 +738,11 @@ def generate_mock_maintenance_tasks(equipment_id: str, sensor_data: Dict[str, An
     
     return maintenance_tasks
 
-@app.post("/api/ai/maintenance-tasks/{equipment_id}")
-async def generate_maintenance_tasks(equipment_id: str, equipment_data: Dict[str, Any]):
-    """Generate AI-powered maintenance tasks using Gemini Pro API"""
+async def gemini_maintenance_tasks(equipment_id: str, sensor_data: Dict[str, Any], rul: Any) -> Tuple[List[Dict[str, Any]], bool]:
+    """(tasks, generated by Gemini); mock tasks when Gemini is unavailable or its answer does not parse"""
     try:
-        sensor_data = equipment_data.get("sensor_data", {})
-        rul = equipment_data.get("rul", 0)
-        
-        if GEMINI_AVAILABLE:
-            try:
-                # Use Gemini Pro API for intelligent maintenance task generation
-                prompt = f"""
+        # Use Gemini Pro API for intelligent maintenance task generation
+        prompt = f"""
                 You are ORCA AI, an expert manufacturing maintenance planner for Maria's Margheritas pizza manufacturing unit.
                 
                 Equipment ID: {equipment_id}
@@ -375,35 +765,54 @@ async def generate_maintenance_tasks(equipment_id: str, equipment_data: Dict[str
                 
                 Focus on pizza manufacturing equipment maintenance best practices.
                 """
+        
+        gemini_response = await llm_client.generate(prompt)
+        
+        # Try to parse Gemini response as JSON, fallback to mock if parsing fails
+        try:
+            # Extract JSON from Gemini response (it might include markdown)
+            json_match = re.search(r'```json\s*(.*?)\s*```', gemini_response, re.DOTALL)
+            if json_match:
+                json_str = json_match.group(1)
+            else:
+                json_str = gemini_response
+            
+            maintenance_tasks = json.loads(json_str)
+            if isinstance(maintenance_tasks, list):
+                print("✅ Gemini generated maintenance tasks successfully")
+                return maintenance_tasks, True
+            raise ValueError("Gemini response is not a list")
                 
-                gemini_response = gemini_model.generate_content(prompt).text
-                
-                # Try to parse Gemini response as JSON, fallback to mock if parsing fails
-                try:
-                    # Extract JSON from Gemini response (it might include markdown)
-                    import re
-                    json_match = re.search(r'```json\s*(.*?)\s*```', gemini_response, re.DOTALL)
-                    if json_match:
-                        json_str = json_match.group(1)
-                    else:
-                        json_str = gemini_response
-                    
-                    maintenance_tasks = json.loads(json_str)
-                    if isinstance(maintenance_tasks, list):
-                        print("✅ Gemini generated maintenance tasks successfully")
-                    else:
-                        raise ValueError("Gemini response is not a list")
-                        
-                except Exception as parse_error:
-                    print(f"Failed to parse Gemini response: {parse_error}")
-                    print(f"Gemini response: {gemini_response}")
-                    # Fallback to mock tasks
-                    maintenance_tasks = generate_mock_maintenance_tasks(equipment_id, sensor_data, rul)
-                    
-            except Exception as e:
-                print(f"Gemini API error for maintenance tasks: {e}")
-                # Fallback to mock tasks
-                maintenance_tasks = generate_mock_maintenance_tasks(equipment_id, sensor_data, rul)
+        except Exception as parse_error:
+            print(f"Failed to parse Gemini response: {parse_error}")
+            print(f"Gemini response: {gemini_response}")
+            
+    except LLMUnavailable as e:
+        print(f"⚠️ {e}; serving mock maintenance tasks")
+    except Exception as e:
+        print(f"Gemini API error for maintenance tasks: {e}")
+    # Fallback to mock tasks
+    return generate_mock_maintenance_tasks(equipment_id, sensor_data, rul), False
+
+@app.post("/api/ai/maintenance-tasks/{equipment_id}")
+async def generate_maintenance_tasks(equipment_id: str, equipment_data: Dict[str, Any]):
+    """Generate AI-powered maintenance tasks using Gemini Pro API"""
+    try:
+        sensor_data = equipment_data.get("sensor_data") or {}
+        equipment = fleet_state.current.index.get(equipment_id)
+        # The dashboard only sends sensor data; RUL and type come from the fleet when known
+        rul = equipment_data.get("rul", equipment["rul"] if equipment else 0)
+        cache_status = "bypass"
+        
+        if GEMINI_AVAILABLE and plan_cache is not None:
+            equipment_type = equipment["category"] if equipment else equipment_data.get("category", "unknown")
+            profile = PROFILE_NAMES[sensor_profile(equipment["name"] if equipment else equipment_id)]
+            key = plan_cache.make_key(equipment_id, equipment_type, rul, sensor_data, profile)
+            maintenance_tasks, cache_status = await plan_cache.get_or_generate(
+                key, lambda: gemini_maintenance_tasks(equipment_id, sensor_data, rul)
+            )
+        elif GEMINI_AVAILABLE:
+            maintenance_tasks, _ = await gemini_maintenance_tasks(equipment_id, sensor_data, rul)
         else:
             # Use mock tasks if Gemini is not available
             maintenance_tasks = generate_mock_maintenance_tasks(equipment_id, sensor_data, rul)
@@ -418,33 +827,55 @@ async def generate_maintenance_tasks(equipment_id: str, equipment_data: Dict[str
                 "medium": len([t for t in maintenance_tasks if t["priority"] == "medium"]),
                 "low": len([t for t in maintenance_tasks if t["priority"] == "low"])
             },
+            "cache_status": cache_status,
             "generated_at": datetime.now().isoformat()
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Maintenance task generation error: {str(e)}")
 
-@app.post("/api/ai/chatbot")
-async def ai_chatbot(message: Dict[str, Any]):
-    """AI chatbot endpoint for ORCA AI interactions"""
-    try:
-        user_message = message.get("message", "")
-        equipment_context = message.get("equipment_context")
-        
-        if not GEMINI_AVAILABLE:
-            return {
-                "response": "Gemini Pro API is not configured. Please check your environment variables.",
-                "timestamp": datetime.now().isoformat(),
-                "ai_model": "N/A",
-                "context": "Maria's Margheritas Manufacturing Unit",
-                "equipment_context": equipment_context
-            }
+@app.get("/api/ai/maintenance-tasks/cache/stats")
+async def maintenance_plan_cache_stats():
+    """Hit rate, stale serves and background refreshes of the maintenance plan cache"""
+    if plan_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **await plan_cache.describe()}
 
-        if equipment_context:
-            # Context-aware responses when equipment is selected
-            try:
-                # Use Gemini Pro API for intelligent responses
-                prompt = f"""
+@app.delete("/api/ai/maintenance-tasks/cache")
+async def clear_maintenance_plan_cache(equipment_id: Optional[str] = None):
+    """Drop cached plans for one machine (or all), e.g. after maintenance was performed"""
+    if plan_cache is None:
+        raise HTTPException(status_code=404, detail="Maintenance plan cache is disabled")
+    return {"equipment_id": equipment_id, "removed": await plan_cache.invalidate(equipment_id)}
+
+def mock_chat_response(user_message: str, equipment_context: Optional[str]) -> str:
+    """Canned chatbot answer used when Gemini is busy, slow or failing"""
+    text = user_message.lower()
+    if equipment_context:
+        if "maintenance" in text:
+            return f"I can help you with maintenance for equipment {equipment_context}. Would you like me to generate a maintenance task list or check the current health status?"
+        if "health" in text or "status" in text:
+            return f"Equipment {equipment_context} is currently being monitored. I can show you detailed sensor data, health metrics, and RUL predictions. What specific information do you need?"
+        if "sensor" in text:
+            return f"I'm monitoring real-time sensor data for {equipment_context}. I can analyze temperature, vibration, pressure, and other metrics to identify potential issues."
+        return f"I'm here to help with equipment {equipment_context}. I can assist with maintenance planning, health monitoring, sensor analysis, and predictive insights. What would you like to know?"
+    if "maintenance" in text:
+        return "I can help you with maintenance scheduling, equipment health monitoring, and predictive maintenance insights. Please select an equipment first to get specific recommendations."
+    if "equipment" in text:
+        return "I'm monitoring 25 manufacturing machines across sauce production, dough making, assembly, baking, and packaging. Please select an equipment to get detailed information."
+    if "health" in text or "status" in text:
+        return "Current equipment health overview: Most machines are operating within normal parameters. I've identified a few that need attention. Please select an equipment to see detailed health metrics."
+    if "production" in text:
+        return "Production is running at 92% efficiency today. We've completed 48 batches with a quality score of 95.2%. How can I help optimize production further?"
+    if "alert" in text:
+        return "I'm monitoring 5 active alerts. The most critical is the Tunnel Oven #2 temperature variance. Please select an equipment to see detailed alerts and recommendations."
+    return "I'm ORCA AI, your manufacturing intelligence assistant. I can help with equipment monitoring, maintenance planning, production optimization, and quality control. Please select an equipment first to get specific insights."
+
+def chat_prompt(user_message: str, equipment_context: Optional[str]) -> str:
+    """Gemini prompt for a chatbot message"""
+    if equipment_context:
+        # Context-aware responses when equipment is selected
+        prompt = f"""
                 You are ORCA AI, an intelligent manufacturing maintenance assistant for Maria's Margheritas pizza manufacturing unit.
                 
                 Context: User is asking about equipment {equipment_context}
@@ -459,25 +890,9 @@ async def ai_chatbot(message: Dict[str, Any]):
                 
                 Keep response under 200 words and be specific to manufacturing equipment.
                 """
-                
-                response = gemini_model.generate_content(prompt).text
-                
-            except Exception as e:
-                print(f"Gemini API error: {e}")
-                # Fallback to mock responses
-                if "maintenance" in user_message.lower():
-                    response = f"I can help you with maintenance for equipment {equipment_context}. Would you like me to generate a maintenance task list or check the current health status?"
-                elif "health" in user_message.lower() or "status" in user_message.lower():
-                    response = f"Equipment {equipment_context} is currently being monitored. I can show you detailed sensor data, health metrics, and RUL predictions. What specific information do you need?"
-                elif "sensor" in user_message.lower():
-                    response = f"I'm monitoring real-time sensor data for {equipment_context}. I can analyze temperature, vibration, pressure, and other metrics to identify potential issues."
-                else:
-                    response = f"I'm here to help with equipment {equipment_context}. I can assist with maintenance planning, health monitoring, sensor analysis, and predictive insights. What would you like to know?"
-        else:
-            # General responses when no equipment is selected
-            try:
-                # Use Gemini Pro API for intelligent responses
-                prompt = f"""
+    else:
+        # General responses when no equipment is selected
+        prompt = f"""
                 You are ORCA AI, an intelligent manufacturing maintenance assistant for Maria's Margheritas pizza manufacturing unit.
                 
                 User Question: {user_message}
@@ -491,24 +906,30 @@ async def ai_chatbot(message: Dict[str, Any]):
                 
                 Keep response under 200 words and be specific to pizza manufacturing.
                 """
-                
-                response = gemini_model.generate_content(prompt).text
-                
-            except Exception as e:
-                print(f"Gemini API error: {e}")
-                # Fallback to mock responses
-                if "maintenance" in user_message.lower():
-                    response = "I can help you with maintenance scheduling, equipment health monitoring, and predictive maintenance insights. Please select an equipment first to get specific recommendations."
-                elif "equipment" in user_message.lower():
-                    response = "I'm monitoring 25 manufacturing machines across sauce production, dough making, assembly, baking, and packaging. Please select an equipment to get detailed information."
-                elif "health" in user_message.lower() or "status" in user_message.lower():
-                    response = "Current equipment health overview: Most machines are operating within normal parameters. I've identified a few that need attention. Please select an equipment to see detailed health metrics."
-                elif "production" in user_message.lower():
-                    response = "Production is running at 92% efficiency today. We've completed 48 batches with a quality score of 95.2%. How can I help optimize production further?"
-                elif "alert" in user_message.lower():
-                    response = "I'm monitoring 5 active alerts. The most critical is the Tunnel Oven #2 temperature variance. Please select an equipment to see detailed alerts and recommendations."
-                else:
-                    response = "I'm ORCA AI, your manufacturing intelligence assistant. I can help with equipment monitoring, maintenance planning, production optimization, and quality control. Please select an equipment first to get specific insights."
+    return prompt
+
+@app.post("/api/ai/chatbot")
+async def ai_chatbot(message: Dict[str, Any]):
+    """AI chatbot endpoint for ORCA AI interactions"""
+    try:
+        user_message = message.get("message", "")
+        equipment_context = message.get("equipment_context")
+        
+        if not GEMINI_AVAILABLE:
+            return {
+                "response": "Gemini Pro API is not configured. Please check your environment variables.",
+                "timestamp": datetime.now().isoformat(),
+                "ai_model": "N/A",
+                "context": "Maria's Margheritas Manufacturing Unit",
+                "equipment_context": equipment_context
+            }
+
+        try:
+            # Use Gemini Pro API for intelligent responses
+            response = await llm_client.generate(chat_prompt(user_message, equipment_context))
+        except LLMUnavailable as e:
+            print(f"⚠️ {e}; serving a canned chatbot response")
+            response = mock_chat_response(user_message, equipment_context)
         
         return {
             "response": response,
@@ -521,36 +942,148 @@ async def ai_chatbot(message: Dict[str, Any]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chatbot error: {str(e)}")
 
+# Chatbot stream formats, and words per chunk when a canned answer is streamed
+CHAT_STREAM_FORMATS = ("ndjson", "sse")
+FALLBACK_CHUNK_WORDS = 3
+# End-to-end time to first token and total latency of streamed answers, per source
+chat_stream_latency = {source: {"ttft_ms": LatencyTracker(), "total_ms": LatencyTracker()}
+                       for source in ("gemini", "fallback")}
+
+def chat_stream_record(stream_format: str, event: str, data: Dict[str, Any]) -> str:
+    if stream_format == "sse":
+        return format_sse(event, json.dumps(data))
+    return json.dumps({"type": event, **data}) + "\n"
+
+@app.post("/api/ai/chatbot/stream")
+async def ai_chatbot_stream(message: Dict[str, Any], request: Request,
+                            stream_format: Optional[str] = Query(None, alias="format")):
+    """
+    Chatbot answer relayed chunk by chunk as Gemini generates it: a "start"
+    record, "token" records, then "done" with time to first token and total
+    latency. Canned answers stream through the same records when Gemini is
+    unavailable. NDJSON by default; SSE with format=sse or
+    Accept: text/event-stream. Disconnecting cancels the generation.
+    """
+    if stream_format is None:
+        stream_format = "sse" if "text/event-stream" in request.headers.get("accept", "") else "ndjson"
+    if stream_format not in CHAT_STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {stream_format}. Use: {', '.join(CHAT_STREAM_FORMATS)}")
+    user_message = message.get("message", "")
+    equipment_context = message.get("equipment_context")
+
+    async def records():
+        started = time.perf_counter()
+        first_token_ms = None
+        source, reason, truncated = "gemini", None, False
+        yield chat_stream_record(stream_format, "start", {
+            "timestamp": datetime.now().isoformat(),
+            "ai_model": "ORCA AI (Gemini Pro)" if GEMINI_AVAILABLE else "N/A",
+            "context": "Maria's Margheritas Manufacturing Unit",
+            "equipment_context": equipment_context
+        })
+
+        if GEMINI_AVAILABLE:
+            try:
+                async for text in llm_client.stream(chat_prompt(user_message, equipment_context)):
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                    yield chat_stream_record(stream_format, "token", {"text": text})
+            except LLMUnavailable as e:
+                if first_token_ms is None:
+                    print(f"⚠️ {e}; streaming a canned chatbot response")
+                    source, reason = "fallback", e.reason
+                else:
+                    # Part of the answer is already out: end it rather than append a canned one
+                    print(f"⚠️ {e}; chatbot stream cut short")
+                    truncated = True
+                    yield chat_stream_record(stream_format, "error", {"error": str(e), "reason": e.reason})
+            if source == "fallback":
+                response = mock_chat_response(user_message, equipment_context)
+        else:
+            source, reason = "fallback", "not_configured"
+            response = "Gemini Pro API is not configured. Please check your environment variables."
+
+        if source == "fallback":
+            words = response.split(" ")
+            for i in range(0, len(words), FALLBACK_CHUNK_WORDS):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                text = " ".join(words[i:i + FALLBACK_CHUNK_WORDS]) + (" " if i + FALLBACK_CHUNK_WORDS < len(words) else "")
+                yield chat_stream_record(stream_format, "token", {"text": text})
+
+        total_ms = (time.perf_counter() - started) * 1000
+        if first_token_ms is not None and not truncated:
+            chat_stream_latency[source]["ttft_ms"].add(first_token_ms)
+            chat_stream_latency[source]["total_ms"].add(total_ms)
+        yield chat_stream_record(stream_format, "done", {
+            "source": source,
+            "fallback_reason": reason,
+            "truncated": truncated,
+            "ttft_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+            "total_ms": round(total_ms, 1)
+        })
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(records(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/ai/llm/stats")
+async def llm_stats():
+    """Concurrency, coalescing, fallback and latency counters of the LLM client, and chatbot stream latency"""
+    chatbot_stream = {
+        source: {name: tracker.percentiles() for name, tracker in trackers.items()}
+        for source, trackers in chat_stream_latency.items()
+    }
+    if llm_client is None:
+        return {"enabled": False, "chatbot_stream": chatbot_stream}
+    return {"enabled": True, **llm_client.describe(), "chatbot_stream": chatbot_stream}
+
 @app.post("/api/ai/analyze-file")
-async def analyze_file(file_data: Dict[str, Any]):
-    """Analyze uploaded sensor data files for predictive maintenance insights"""
+async def analyze_file(request: Request, dataset: Optional[str] = None,
+                       file_format: Optional[str] = Query(None, alias="format"),
+                       tier: str = DEFAULT_TIER, weights: Optional[str] = None):
+    """
+    Analyze an uploaded sensor file (multipart field "file", or the raw request body):
+    CSV, JSONL or raw C-MAPSS train/test txt. Units are scored with the RUL models
+    while the upload is still being parsed, and results stream back as NDJSON:
+    a "start" record, one "unit" record per unit, then a "summary".
+    """
+    if dataset is not None and not model_registry.has(dataset, "xgboost"):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown dataset {dataset}. Available datasets: {model_registry.datasets()}"
+        )
+    if file_format is not None and file_format not in FILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {file_format}. Choose from {list(FILE_FORMATS)}")
+    if tier not in ENSEMBLE_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown tier {tier}. Choose from {list(ENSEMBLE_TIERS)}")
     try:
-        # This would process uploaded JSON/CSV files
-        # For now, return mock analysis
-        
-        file_type = file_data.get("file_type", "json")
-        sensor_data = file_data.get("sensor_data", {})
-        
-        # Mock analysis results
-        analysis_results = {
-            "file_analyzed": True,
-            "file_type": file_type,
-            "sensors_detected": len(sensor_data),
-            "anomalies_found": random.randint(0, 3),
-            "health_score": round(random.uniform(75, 95), 1),
-            "recommendations": [
-                "Schedule preventive maintenance within 2 weeks",
-                "Monitor temperature sensors more closely",
-                "Check motor vibration patterns"
-            ],
-            "predicted_rul": random.randint(500, 2000),
-            "analysis_timestamp": datetime.now().isoformat()
-        }
-        
-        return analysis_results
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"File analysis error: {str(e)}")
+        weight_overrides = parse_weights(weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        raise HTTPException(
+            status_code=415,
+            detail="Upload the file as multipart/form-data (field 'file') or as a raw CSV, JSONL or C-MAPSS body"
+        )
+    try:
+        upload = UploadStream(request.stream(), content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    analysis = FileAnalysis(ENSEMBLE_TIERS[tier], dataset, file_format, weight_overrides, DEFAULT_DATASET)
+    return UploadResponse(analysis.run(upload), media_type="application/x-ndjson",
+                          headers={"X-Accel-Buffering": "no"})
+
+# Everything above ran before uvicorn could listen
+startup.record("imports", startup.import_started, detail={
+    "interpreter_ms": (round((startup.import_started - startup.process_started) * 1000, 1)
+                       if startup.process_started else None),
+    "framework_ms": round((framework_imported - startup.import_started) * 1000, 1),
+    "orca_ms": round((time.time() - framework_imported) * 1000, 1),
+})
 
 if __name__ == "__main__":
     import uvicorn
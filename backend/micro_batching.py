@@ -0,0 +1,111 @@
+"""
+ORCA PREDATOR - Micro-Batching Scheduler
+Collects concurrent single-item prediction requests for the same model over a
+short window and scores them as one matrix, resolving each caller's future
+with its own row of the result.
+"""
+
+import asyncio
+import inspect
+import os
+from typing import Dict, List, Any, Callable, Hashable, Set, Tuple
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submissions per key (e.g. (dataset, architecture)).
+
+    A batch is flushed when `window_ms` has elapsed since its first item or as
+    soon as it reaches `max_batch_size`. `batch_fn(key, payloads)` must return
+    one result per payload, in order; it may be a plain or async function.
+    """
+
+    def __init__(self, batch_fn: Callable[[Hashable, List[Any]], Any],
+                 window_ms: float = 5.0, max_batch_size: int = 64):
+        self.batch_fn = batch_fn
+        self.window_s = window_ms / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        # The loop only keeps weak references to tasks: hold running batches until they finish
+        self._running: Set[asyncio.Task] = set()
+        self.stats = {"batches": 0, "items": 0, "largest_batch": 0, "size_flushes": 0, "window_flushes": 0}
+
+    async def submit(self, key: Hashable, payload: Any) -> Any:
+        """Queue one payload and wait for its result from the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((payload, future))
+
+        if len(pending) >= self.max_batch_size:
+            self.stats["size_flushes"] += 1
+            self._flush(key)
+        elif len(pending) == 1:
+            self._timers[key] = loop.call_later(self.window_s, self._flush_on_window, key)
+
+        return await future
+
+    def _flush_on_window(self, key: Hashable) -> None:
+        self.stats["window_flushes"] += 1
+        self._flush(key)
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.ensure_future(self._run(key, batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        # Callers that were cancelled while waiting are dropped from the matrix
+        batch = [(payload, future) for payload, future in batch if not future.done()]
+        if not batch:
+            return
+
+        self.stats["batches"] += 1
+        self.stats["items"] += len(batch)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+
+        try:
+            results = self.batch_fn(key, [payload for payload, _ in batch])
+            if inspect.isawaitable(results):
+                results = await results
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def describe(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            "window_ms": self.window_s * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "pending": sum(len(items) for items in self._pending.values()),
+            "running_batches": len(self._running),
+            "average_batch": round(self.stats["items"] / batches, 2) if batches else 0,
+            **self.stats,
+        }
+
+
+def micro_batching_enabled() -> bool:
+    return os.getenv("ORCA_MICROBATCH", "0").lower() in ("1", "true", "yes")
+
+
+def create_micro_batcher(batch_fn: Callable[[Hashable, List[Any]], Any]) -> MicroBatcher:
+    """Build a batcher configured from ORCA_MICROBATCH_WINDOW_MS / ORCA_MICROBATCH_MAX_SIZE"""
+    return MicroBatcher(
+        batch_fn,
+        window_ms=float(os.getenv("ORCA_MICROBATCH_WINDOW_MS", "5")),
+        max_batch_size=int(os.getenv("ORCA_MICROBATCH_MAX_SIZE", "64")),
+    )
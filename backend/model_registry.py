@@ -0,0 +1,512 @@
+"""
+ORCA PREDATOR - Model Registry
+Discovers the FD001-FD004 RUL models from their feature metadata and loads
+each model (plus its MinMaxScaler) lazily, evicting least-recently-used models
+when the configured memory budget is exceeded.
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Callable, Sequence, FrozenSet
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Artifact layout for each architecture, relative to the backend directory
+ARCHITECTURES = {
+    "xgboost": {
+        "meta_dir": os.path.join("meta", "meta"),
+        "model_path": os.path.join("models", "models", "{dataset}_XGBoostRegressor.pkl"),
+        "scaler_path": os.path.join("scalers", "scalers", "{dataset}_MinMaxScaler.pkl"),
+        "framework": "xgboost",
+    },
+    "cnn_lstm": {
+        "meta_dir": os.path.join("meta", "meta_deep"),
+        "model_path": os.path.join("models", "models_deep", "{dataset}_CNN_LSTM.h5"),
+        "scaler_path": os.path.join("scalers", "scalers_deep", "{dataset}_MinMaxScaler.pkl"),
+        "framework": "keras",
+    },
+    "cnn_bilstm_attn": {
+        "meta_dir": os.path.join("meta", "meta_attn"),
+        "model_path": os.path.join("models", "models_attn", "{dataset}_CNN_BiLSTM_Attn.keras"),
+        "scaler_path": os.path.join("scalers", "scalers_attn", "{dataset}_MinMaxScaler.pkl"),
+        "framework": "keras",
+    },
+}
+
+DEFAULT_MEMORY_BUDGET_MB = 512
+
+# Resident memory of a loaded model, estimated from its artifacts on disk as
+# size * multiplier + overhead MB. The compressed .keras/.h5/.pkl files are far
+# smaller than the unpacked weights, graph and runner buffers; these figures
+# come from measuring the RSS increase of loading each FD00x model once its
+# framework was already imported. The framework itself (~150 MB for XGBoost,
+# ~600 MB for TensorFlow) is shared by all models and never freed by eviction,
+# so it is not counted against the budget.
+RESIDENT_ESTIMATE = {
+    "xgboost": (2.0, 1.0),
+    "keras": (2.0, 5.0),
+}
+
+# Sequence length the CNN models were trained with (seq_len in the training notebook)
+DEFAULT_SEQUENCE_WINDOW = 30
+
+
+class ModelSpec:
+    """Static description of one (dataset, architecture) model artifact"""
+
+    def __init__(self, dataset: str, architecture: str, features: List[str],
+                 model_name: str, model_path: str, scaler_path: Optional[str],
+                 window: Optional[int] = None):
+        self.dataset = dataset
+        self.architecture = architecture
+        self.features = features
+        self.model_name = model_name
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.framework = ARCHITECTURES[architecture]["framework"]
+        # Cycles per input sequence; None for snapshot models like XGBoost
+        self.window = window
+
+    @property
+    def is_sequence(self) -> bool:
+        return self.window is not None
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.dataset, self.architecture)
+
+    @property
+    def version(self) -> str:
+        """Artifact version derived from the model file's modification time"""
+        try:
+            return f"{int(os.path.getmtime(self.model_path))}"
+        except OSError:
+            return "missing"
+
+    def disk_bytes(self) -> int:
+        """Size of the model and scaler artifacts on disk"""
+        size = 0
+        for path in (self.model_path, self.scaler_path):
+            if path and os.path.exists(path):
+                size += os.path.getsize(path)
+        return size
+
+    def estimated_bytes(self) -> int:
+        """Approximate resident size of the loaded model in bytes (see RESIDENT_ESTIMATE)"""
+        multiplier, overhead_mb = RESIDENT_ESTIMATE[self.framework]
+        return int(self.disk_bytes() * multiplier + overhead_mb * 1024 * 1024)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dataset": self.dataset,
+            "architecture": self.architecture,
+            "model": self.model_name,
+            "features": self.features,
+            "framework": self.framework,
+            "window": self.window,
+            "disk_mb": round(self.disk_bytes() / (1024 * 1024), 2),
+            "estimated_mb": round(self.estimated_bytes() / (1024 * 1024), 2),
+        }
+
+
+class LoadedModel:
+    """A model and its scaler, ready for inference"""
+
+    def __init__(self, spec: ModelSpec, model: Any, scaler: Any, runner: Any):
+        self.spec = spec
+        self.model = model
+        self.scaler = scaler
+        # Inference goes through a runner from keras_serving / xgboost_serving
+        self.runner = runner
+        self.backend = runner.backend
+        self.version = spec.version
+        self.size_bytes = spec.estimated_bytes()
+        # Sequence models take (batch, window, features); XGBoost takes (batch, features)
+        self.window = None
+        if spec.framework == "keras":
+            self.window = int(model.input_shape[1])
+            if self.window != spec.window:
+                print(f"⚠️ {spec.dataset}/{spec.architecture} expects {self.window} cycles, "
+                      f"metadata says {spec.window}; using the model's input shape")
+                spec.window = self.window
+
+    @property
+    def features(self) -> List[str]:
+        return self.spec.features
+
+    def scale(self, matrix: np.ndarray) -> np.ndarray:
+        """Apply the MinMaxScaler to the trailing feature axis without sklearn's per-call checks"""
+        if self.scaler is None:
+            return matrix
+        scaled = matrix * self.scaler.scale_ + self.scaler.min_
+        if getattr(self.scaler, "clip", False):
+            lo, hi = self.scaler.feature_range
+            np.clip(scaled, lo, hi, out=scaled)
+        return scaled
+
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """Predict RUL for an already scaled (N, F) or (N, window, F) matrix"""
+        return self.runner(matrix)
+
+
+def build_feature_vector(sensor_data: Dict[str, Any], features: List[str]) -> Tuple[List[float], List[str]]:
+    """
+    Map a sensor dict onto a model's feature order.
+
+    When the dict uses the model's C-MAPSS feature names they are placed by
+    name (missing features default to 0). Otherwise numeric readings are
+    taken in order and padded or truncated to the model's feature count.
+    Returns the vector and the names of the sensors that were used.
+    """
+    if any(name in sensor_data for name in features):
+        values = []
+        used = []
+        for name in features:
+            value = sensor_data.get(name)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values.append(float(value))
+                used.append(name)
+            else:
+                values.append(0.0)
+        return values, used
+
+    values = []
+    used = []
+    for sensor, value in sensor_data.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values.append(float(value))
+            used.append(sensor)
+
+    target_size = len(features)
+    if len(values) < target_size:
+        values.extend([0.0] * (target_size - len(values)))
+    elif len(values) > target_size:
+        values = values[:target_size]
+    return values, used
+
+
+def write_feature_vector(sensor_data: Dict[str, Any], features: Sequence[str], out: np.ndarray,
+                         feature_set: Optional[FrozenSet[str]] = None) -> None:
+    """
+    build_feature_vector written in place into the (F,) row `out`, without
+    building intermediate lists. `feature_set` (frozenset(features)) may be
+    passed to skip rebuilding it on every call.
+    """
+    out[:] = 0.0
+    if not (feature_set or frozenset(features)).isdisjoint(sensor_data):
+        for position, name in enumerate(features):
+            value = sensor_data.get(name)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                out[position] = value
+        return
+
+    position, size = 0, out.shape[0]
+    for value in sensor_data.values():
+        if position == size:
+            break
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[position] = value
+            position += 1
+
+
+def reading_groups(readings: np.ndarray) -> List[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Rows of a (rows, sensors) reading matrix grouped by which sensors they
+    have (NaN = no reading): (present columns, row numbers) per group, with
+    None for the rows when every row has the same sensors.
+    """
+    if readings.shape[0] == 0:
+        return []
+    present = ~np.isnan(readings)
+    if present.shape[1] < 63:
+        keys = present @ (1 << np.arange(present.shape[1], dtype=np.int64))
+    else:
+        packed = np.packbits(present, axis=1)
+        keys = packed.view(f"V{packed.shape[1]}").ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    if first.shape[0] == 1:
+        return [(np.flatnonzero(present[0]), None)]
+    return [(np.flatnonzero(present[row]), np.flatnonzero(inverse == group)) for group, row in enumerate(first)]
+
+
+def write_feature_matrix(readings: np.ndarray, sensor_names: Sequence[str], features: Sequence[str],
+                         out: Optional[np.ndarray] = None,
+                         groups: Optional[List[Tuple[np.ndarray, Optional[np.ndarray]]]] = None) -> np.ndarray:
+    """
+    build_feature_vector for a whole (rows, sensors) reading matrix at once,
+    NaN meaning "no reading" (a key missing from the dict). Returns the
+    (rows, F) matrix.
+
+    Which readings land in which feature depends only on the set of sensors
+    a row has, so the mapping is worked out once per reading_groups() group
+    (a fleet has a handful, one per machine profile) and applied to all its
+    rows. Pass `groups` to reuse them across feature layouts.
+    """
+    if out is None:
+        out = np.zeros((readings.shape[0], len(features)), dtype=np.float32)
+    else:
+        out[:] = 0.0
+    feature_position = {name: position for position, name in enumerate(features)}
+    for columns, rows in (reading_groups(readings) if groups is None else groups):
+        named = [(feature_position[sensor_names[c]], c) for c in columns if sensor_names[c] in feature_position]
+        if named:
+            targets, columns = (np.array(values) for values in zip(*named))
+        else:
+            # Positional: the k-th reading goes to feature k
+            columns = columns[:len(features)]
+            targets = np.arange(columns.shape[0])
+        if rows is None:
+            out[:, targets] = readings[:, columns]
+        else:
+            out[rows[:, None], targets] = readings[rows][:, columns]
+    return out
+
+
+class ModelRegistry:
+    """Lazy, LRU-evicting registry of all FD001-FD004 models"""
+
+    def __init__(self, base_dir: str = BASE_DIR, memory_budget_mb: Optional[float] = None):
+        self.base_dir = base_dir
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("ORCA_MODEL_MEMORY_MB", DEFAULT_MEMORY_BUDGET_MB))
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.specs: Dict[Tuple[str, str], ModelSpec] = {}
+        self._loaded: "OrderedDict[Tuple[str, str], LoadedModel]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.stats = {"loads": 0, "hits": 0, "evictions": 0}
+        # Threads each model may use per predict call (None = framework default)
+        self.threads_per_model: Optional[int] = None
+        self._tensorflow_configured = False
+        # Per-model serving backend chosen at runtime (see keras_serving / xgboost_serving)
+        self._backend_overrides: Dict[Tuple[str, str], str] = {}
+        # Called as listener(dataset, architecture) when a model's version or backend changes
+        self._listeners: List[Callable[[str, str], None]] = []
+        self._signatures: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self.discover()
+
+    def add_listener(self, listener: Callable[[str, str], None]) -> None:
+        self._listeners.append(listener)
+
+    def configure_threads(self, threads_per_model: int) -> None:
+        """Pin XGBoost/TensorFlow intra-op threads, e.g. to cpu_count / inference pool size"""
+        self.threads_per_model = max(1, int(threads_per_model))
+        with self._lock:
+            for loaded in self._loaded.values():
+                self._apply_threads(loaded)
+
+    def _apply_threads(self, loaded: LoadedModel) -> None:
+        if self.threads_per_model is None or loaded.spec.framework != "xgboost":
+            return
+        loaded.model.set_params(n_jobs=self.threads_per_model)
+        booster = getattr(loaded.runner, "booster", None)
+        if booster is not None:
+            booster.set_param({"nthread": self.threads_per_model})
+
+    def _configure_tensorflow(self, tf: Any) -> None:
+        # Thread pools can only be sized before TensorFlow executes its first op
+        if self._tensorflow_configured or self.threads_per_model is None:
+            return
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(self.threads_per_model)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except RuntimeError as e:
+            print(f"⚠️ Could not configure TensorFlow threads: {e}")
+        self._tensorflow_configured = True
+
+    def discover(self) -> None:
+        """Find every (dataset, architecture) pair from meta/*/FD00x_features.json"""
+        specs = {}
+        for architecture, layout in ARCHITECTURES.items():
+            meta_dir = os.path.join(self.base_dir, layout["meta_dir"])
+            if not os.path.isdir(meta_dir):
+                continue
+            for filename in sorted(os.listdir(meta_dir)):
+                if not filename.endswith("_features.json"):
+                    continue
+                dataset = filename.split("_")[0]
+                with open(os.path.join(meta_dir, filename)) as f:
+                    meta = json.load(f)
+
+                model_path = os.path.join(self.base_dir, layout["model_path"].format(dataset=dataset))
+                if not os.path.exists(model_path):
+                    print(f"⚠️ Model artifact missing for {dataset}/{architecture}: {model_path}")
+                    continue
+                scaler_path = os.path.join(self.base_dir, layout["scaler_path"].format(dataset=dataset))
+                if not os.path.exists(scaler_path):
+                    scaler_path = None
+
+                window = None
+                if layout["framework"] == "keras":
+                    window = int(meta.get("seq_len", DEFAULT_SEQUENCE_WINDOW))
+                spec = ModelSpec(dataset, architecture, meta["features"], meta.get("model", architecture),
+                                 model_path, scaler_path, window)
+                specs[spec.key] = spec
+        self.specs = specs
+
+    def datasets(self) -> List[str]:
+        return sorted({dataset for dataset, _ in self.specs})
+
+    def architectures(self, dataset: Optional[str] = None) -> List[str]:
+        return [arch for arch in ARCHITECTURES if dataset is None or (dataset, arch) in self.specs]
+
+    def has(self, dataset: str, architecture: str) -> bool:
+        return (dataset, architecture) in self.specs
+
+    def is_loaded(self, dataset: str, architecture: str) -> bool:
+        return (dataset, architecture) in self._loaded
+
+    def get(self, dataset: str, architecture: str = "xgboost") -> LoadedModel:
+        """Return a loaded model, loading it (and evicting others) on first use"""
+        key = (dataset, architecture)
+        if key not in self.specs:
+            raise KeyError(f"No {architecture} model registered for {dataset}")
+
+        with self._lock:
+            loaded = self._loaded.get(key)
+            if loaded is not None:
+                self._loaded.move_to_end(key)
+                self.stats["hits"] += 1
+                return loaded
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available meanwhile
+        with key_lock:
+            with self._lock:
+                loaded = self._loaded.get(key)
+                if loaded is not None:
+                    self._loaded.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return loaded
+
+            loaded = self._load(self.specs[key])
+
+            with self._lock:
+                self._loaded[key] = loaded
+                self.stats["loads"] += 1
+                self._evict(keep=key)
+                signature = (loaded.version, loaded.backend)
+                changed = self._signatures.get(key, signature) != signature
+                self._signatures[key] = signature
+
+            # Reloading an evicted, unchanged artifact does not notify anyone
+            if changed:
+                self._notify(dataset, architecture)
+            return loaded
+
+    def _notify(self, dataset: str, architecture: str) -> None:
+        for listener in self._listeners:
+            try:
+                listener(dataset, architecture)
+            except Exception as e:
+                print(f"⚠️ Model registry listener failed: {e}")
+
+    def peek(self, dataset: str, architecture: str) -> Optional[LoadedModel]:
+        """The loaded model if it is resident, without loading or touching LRU order"""
+        with self._lock:
+            return self._loaded.get((dataset, architecture))
+
+    def reload(self, dataset: str, architecture: str) -> LoadedModel:
+        """Re-read an artifact from disk, e.g. after a retrained model was deployed"""
+        if (dataset, architecture) not in self.specs:
+            raise KeyError(f"No {architecture} model registered for {dataset}")
+        self.discover()
+        self.unload(dataset, architecture)
+        # get() notifies listeners when the version or backend changed
+        return self.get(dataset, architecture)
+
+    def backend_for(self, dataset: str, architecture: str) -> Optional[str]:
+        spec = self.specs.get((dataset, architecture))
+        if spec is None:
+            return None
+        if spec.key in self._backend_overrides:
+            return self._backend_overrides[spec.key]
+        if spec.framework == "keras":
+            from keras_serving import backend_from_env
+            return backend_from_env(dataset, architecture)
+        from xgboost_serving import backend_from_env
+        return backend_from_env(dataset)
+
+    def set_backend(self, dataset: str, architecture: str, backend: str) -> None:
+        """Switch a model's serving backend; it is rebuilt on next use"""
+        spec = self.specs.get((dataset, architecture))
+        if spec is None:
+            raise KeyError(f"No model registered for {dataset}/{architecture}")
+        if spec.framework == "keras":
+            from keras_serving import KERAS_BACKENDS as backends
+        else:
+            from xgboost_serving import XGBOOST_BACKENDS as backends
+        if backend not in backends:
+            raise ValueError(f"Unknown {spec.framework} backend {backend}. Choose from {', '.join(backends)}")
+        with self._lock:
+            self._backend_overrides[spec.key] = backend
+        self.unload(dataset, architecture)
+
+    def unload(self, dataset: str, architecture: str) -> bool:
+        with self._lock:
+            return self._loaded.pop((dataset, architecture), None) is not None
+
+    def loaded_bytes(self) -> int:
+        with self._lock:
+            return sum(m.size_bytes for m in self._loaded.values())
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        """Drop least-recently-used models until the budget is met (never the one just loaded)"""
+        while self.loaded_bytes() > self.memory_budget_bytes and len(self._loaded) > 1:
+            oldest = next(iter(self._loaded))
+            if oldest == keep:
+                break
+            self._loaded.pop(oldest)
+            self.stats["evictions"] += 1
+            print(f"♻️ Evicted model {oldest[0]}/{oldest[1]} from registry")
+
+    def _load(self, spec: ModelSpec) -> LoadedModel:
+        # joblib (and through it the pickled libraries) only on the first load
+        import joblib
+        backend = self.backend_for(spec.dataset, spec.architecture)
+        if spec.framework == "keras":
+            # TensorFlow is only imported once a sequence model is actually needed
+            os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+            import tensorflow as tf
+            from keras_serving import create_runner
+            self._configure_tensorflow(tf)
+            model = tf.keras.models.load_model(spec.model_path, compile=False)
+            runner = create_runner(model, backend, self.threads_per_model)
+        else:
+            from xgboost_serving import create_runner
+            model = joblib.load(spec.model_path)
+            if self.threads_per_model:
+                model.set_params(n_jobs=self.threads_per_model)
+            runner = create_runner(model, backend, self.threads_per_model,
+                                   cache_key=f"{spec.dataset}_{spec.version}")
+
+        scaler = joblib.load(spec.scaler_path) if spec.scaler_path else None
+        loaded = LoadedModel(spec, model, scaler, runner)
+        print(f"✅ Loaded {spec.dataset}/{spec.architecture} ({type(model).__name__}, {loaded.backend} backend)")
+        return loaded
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded_keys = list(self._loaded.keys())
+            backends = {f"{key[0]}/{key[1]}": self._loaded[key].backend for key in loaded_keys}
+            # Which backend the XGBoost auto runners currently use per batch size
+            auto = {f"{key[0]}/{key[1]}": self._loaded[key].runner.active for key in loaded_keys
+                    if self._loaded[key].backend == "auto"}
+        return {
+            "memory_budget_mb": round(self.memory_budget_bytes / (1024 * 1024), 2),
+            "loaded_mb": round(self.loaded_bytes() / (1024 * 1024), 2),
+            "loaded": [f"{dataset}/{arch}" for dataset, arch in loaded_keys],
+            "backends": backends,
+            "auto_backends": auto,
+            "threads_per_model": self.threads_per_model,
+            "stats": dict(self.stats),
+            "models": [spec.to_dict() for spec in self.specs.values()],
+        }
+
+
+# Global instance for easy access
+model_registry = ModelRegistry()
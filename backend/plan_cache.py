@@ -0,0 +1,249 @@
+"""
+ORCA PREDATOR - Maintenance Plan Cache
+Persistent cache of AI-generated maintenance plans, so a machine whose RUL
+and sensor readings have barely moved gets its plan without another Gemini
+call, across restarts too.
+
+Plans are keyed on equipment ID, equipment type, a bucketed RUL and each
+sensor's band within its normal operating range. Entries are fresh for
+`ttl_s`; for `stale_s` after that they are still served while one
+background call refreshes them (stale-while-revalidate).
+"""
+
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+
+from mock_company import SENSOR_PROFILES, FLOW_RATE_RANGE
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plan_cache.sqlite")
+
+# generate() returns (tasks, cacheable); fallback plans are not cached
+PlanGenerator = Callable[[], Awaitable[Tuple[List[Dict[str, Any]], bool]]]
+
+
+def sensor_range(profile: str, sensor: str) -> Optional[Tuple[float, float]]:
+    """Normal (low, high) range of a sensor for a machine profile"""
+    if sensor == "flow_rate":
+        return FLOW_RATE_RANGE
+    return SENSOR_PROFILES.get(profile, SENSOR_PROFILES["default"]).get(sensor) or SENSOR_PROFILES["default"].get(sensor)
+
+
+class PlanCache:
+    """
+    Memory LRU in front of a SQLite table.
+
+    Reads hit the LRU first and fall back to a primary-key lookup; writes go
+    to both. Every SQLite statement runs on a worker thread, and the LRU has
+    its own lock, so the event loop never waits on the database. Expired
+    rows are purged on open and every `purge_every` writes.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl_s: float = 3600.0, stale_s: float = 86400.0,
+                 rul_bucket_h: float = 250.0, sensor_buckets: int = 4, max_entries: int = 10000,
+                 purge_every: int = 500):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.rul_bucket_h = max(1.0, rul_bucket_h)
+        self.sensor_buckets = max(1, sensor_buckets)
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._writes = 0
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "disk_hits": 0, "refreshes": 0,
+                      "refresh_failures": 0, "writes": 0, "purged": 0}
+
+        self._connect()
+        # A SQLite connection must not be used across fork (prefork.py workers get their own)
+        os.register_at_fork(after_in_child=self._connect)
+        self._db.execute("CREATE TABLE IF NOT EXISTS maintenance_plans ("
+                         "key TEXT PRIMARY KEY, equipment_id TEXT NOT NULL, created_at REAL NOT NULL, "
+                         "tasks TEXT NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS maintenance_plans_equipment ON maintenance_plans (equipment_id)")
+        self._purge()
+
+    def _connect(self) -> None:
+        # _lock guards the LRU only, _db_lock the connection
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+    def make_key(self, equipment_id: str, equipment_type: str, rul: Any, sensor_data: Dict[str, Any],
+                 profile: str = "default") -> str:
+        """
+        Readings are placed in `sensor_buckets` bands across the sensor's
+        normal range for `profile`, plus one band below and one above it.
+        """
+        try:
+            rul_part = str(int(float(rul) // self.rul_bucket_h))
+        except (TypeError, ValueError):
+            rul_part = "?"
+        bands = []
+        for sensor in sorted(sensor_data):
+            value = sensor_data[sensor]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                continue
+            limits = sensor_range(profile, sensor)
+            if limits is None:
+                band = f"{float(value):.2g}"
+            else:
+                low, high = limits
+                band = str(min(max(int((value - low) / (high - low) * self.sensor_buckets), -1), self.sensor_buckets))
+            bands.append(f"{sensor}={band}")
+        return f"{equipment_id}|{equipment_type}|rul{rul_part}|{','.join(bands)}"
+
+    def _cached(self, key: str) -> Optional[Tuple[float, List[Dict[str, Any]]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _load(self, key: str) -> Optional[Tuple[float, List[Dict[str, Any]]]]:
+        """Primary-key lookup in SQLite (runs on a worker thread)"""
+        with self._db_lock:
+            row = self._db.execute("SELECT created_at, tasks FROM maintenance_plans WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    async def _lookup(self, key: str) -> Optional[Tuple[float, List[Dict[str, Any]]]]:
+        entry = self._cached(key)
+        if entry is not None:
+            return entry
+        entry = await asyncio.to_thread(self._load, key)
+        if entry is not None:
+            self.stats["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: Tuple[float, List[Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _write(self, key: str, equipment_id: str, entry: Tuple[float, List[Dict[str, Any]]]) -> None:
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO maintenance_plans (key, equipment_id, created_at, tasks) "
+                             "VALUES (?, ?, ?, ?)", (key, equipment_id, entry[0], json.dumps(entry[1])))
+            self._writes += 1
+            purge = self.purge_every > 0 and self._writes % self.purge_every == 0
+        if purge:
+            self._purge()
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.ttl_s - self.stale_s
+        with self._db_lock:
+            removed = self._db.execute("DELETE FROM maintenance_plans WHERE created_at < ?", (cutoff,)).rowcount
+        self.stats["purged"] += max(removed, 0)
+
+    async def put(self, key: str, tasks: List[Dict[str, Any]]) -> None:
+        entry = (time.time(), tasks)
+        self._remember(key, entry)
+        await asyncio.to_thread(self._write, key, key.split("|", 1)[0], entry)
+        self.stats["writes"] += 1
+
+    async def get_or_generate(self, key: str, generate: PlanGenerator) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        (tasks, cache status): `hit`, `stale` (a refresh was started in the
+        background) or `miss` (generated now, and stored if cacheable).
+        """
+        entry = await self._lookup(key)
+        if entry is not None:
+            age_s = time.time() - entry[0]
+            if age_s < self.ttl_s:
+                self.stats["hits"] += 1
+                return entry[1], "hit"
+            if age_s < self.ttl_s + self.stale_s:
+                self.stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.ensure_future(self._refresh(key, generate))
+                return entry[1], "stale"
+
+        self.stats["misses"] += 1
+        tasks, cacheable = await generate()
+        if cacheable:
+            await self.put(key, tasks)
+        return tasks, "miss"
+
+    async def _refresh(self, key: str, generate: PlanGenerator) -> None:
+        try:
+            tasks, cacheable = await generate()
+            if cacheable:
+                await self.put(key, tasks)
+                self.stats["refreshes"] += 1
+            else:
+                # Gemini was unavailable: keep serving the stale plan
+                self.stats["refresh_failures"] += 1
+        except Exception as e:
+            self.stats["refresh_failures"] += 1
+            print(f"⚠️ Maintenance plan refresh failed for {key.split('|', 1)[0]}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _delete(self, equipment_id: Optional[str]) -> int:
+        with self._db_lock:
+            if equipment_id is None:
+                return self._db.execute("DELETE FROM maintenance_plans").rowcount
+            return self._db.execute("DELETE FROM maintenance_plans WHERE equipment_id = ?",
+                                    (equipment_id,)).rowcount
+
+    async def invalidate(self, equipment_id: Optional[str] = None) -> int:
+        """Drop one machine's plans (or all); returns how many rows were removed"""
+        with self._lock:
+            if equipment_id is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key.split("|", 1)[0] == equipment_id]:
+                    del self._entries[key]
+        return await asyncio.to_thread(self._delete, equipment_id)
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._db.close()
+
+    def _stored(self) -> int:
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM maintenance_plans").fetchone()[0]
+
+    async def describe(self) -> Dict[str, Any]:
+        stored = await asyncio.to_thread(self._stored)
+        with self._lock:
+            in_memory = len(self._entries)
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return {
+            "path": self.path,
+            "stored": stored,
+            "in_memory": in_memory,
+            "ttl_s": self.ttl_s,
+            "stale_s": self.stale_s,
+            "rul_bucket_h": self.rul_bucket_h,
+            "sensor_buckets": self.sensor_buckets,
+            "refreshing": len(self._refreshing),
+            "hit_rate": round((self.stats["hits"] + self.stats["stale_hits"]) / lookups, 4) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+def create_plan_cache() -> Optional[PlanCache]:
+    """Cache configured from ORCA_PLAN_CACHE_* (disabled with ORCA_PLAN_CACHE=0)"""
+    if os.getenv("ORCA_PLAN_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    return PlanCache(
+        path=os.getenv("ORCA_PLAN_CACHE_PATH", DEFAULT_PATH),
+        ttl_s=float(os.getenv("ORCA_PLAN_CACHE_TTL_S", "3600")),
+        stale_s=float(os.getenv("ORCA_PLAN_CACHE_STALE_S", "86400")),
+        rul_bucket_h=float(os.getenv("ORCA_PLAN_CACHE_RUL_BUCKET_H", "250")),
+        sensor_buckets=int(os.getenv("ORCA_PLAN_CACHE_SENSOR_BUCKETS", "4")),
+        max_entries=int(os.getenv("ORCA_PLAN_CACHE_SIZE", "10000")),
+    )
@@ -0,0 +1,105 @@
+"""
+ORCA PREDATOR - Prediction Cache
+LRU + TTL cache of per-model RUL predictions keyed on the model version and
+the input quantized in the scaler's [0, 1] feature space, so readings that
+have barely moved are answered without running the model.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from model_registry import LoadedModel
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache whose entries also expire after `ttl_s` seconds.
+
+    Inputs are scaled with the model's MinMaxScaler and rounded to multiples
+    of `step`, so a step of 0.001 treats readings within 0.1% of a feature's
+    training range as identical.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 30.0, step: float = 0.001):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.step = step
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def make_key(self, model: LoadedModel, inputs: np.ndarray) -> Tuple:
+        """Key on dataset, architecture, artifact version, backend and quantized input"""
+        scaled = model.scale(np.asarray(inputs, dtype=np.float32))
+        quantized = np.rint(scaled / self.step).astype(np.int32)
+        return (model.spec.dataset, model.spec.architecture, model.version, model.backend, quantized.tobytes())
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key: Tuple, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, dataset: Optional[str] = None, architecture: Optional[str] = None) -> int:
+        """Drop entries for one model (or everything); returns how many were removed"""
+        with self._lock:
+            if dataset is None and architecture is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [
+                    key for key in self._entries
+                    if (dataset is None or key[0] == dataset) and (architecture is None or key[1] == architecture)
+                ]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self.stats["invalidations"] += removed
+            return removed
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "step": self.step,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+def create_prediction_cache() -> Optional[PredictionCache]:
+    """Cache configured from ORCA_PREDICTION_CACHE_* (disabled with ORCA_PREDICTION_CACHE=0)"""
+    if os.getenv("ORCA_PREDICTION_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    return PredictionCache(
+        max_entries=int(os.getenv("ORCA_PREDICTION_CACHE_SIZE", "10000")),
+        ttl_s=float(os.getenv("ORCA_PREDICTION_CACHE_TTL_S", "30")),
+        step=float(os.getenv("ORCA_PREDICTION_CACHE_STEP", "0.001")),
+    )
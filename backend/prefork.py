@@ -0,0 +1,238 @@
+"""
+ORCA PREDATOR - Pre-fork Server
+Runs several uvicorn workers that share one copy of the models. The master
+process imports the app and loads the models before forking, so workers
+start with those pages shared copy-on-write instead of each loading their
+own. Separate `uvicorn --workers N` processes cannot share them.
+
+XGBoost boosters are loaded in the master. Loading them starts no threads,
+so forking afterwards is safe. TensorFlow is imported in the master too:
+the import starts no threads and accounts for most of a Keras worker's
+memory. The Keras models themselves are built in each worker, because
+building one starts TensorFlow's thread pools, and those do not survive a fork.
+
+    python prefork.py --workers 4 --port 8000 --memory-report-s 60
+
+GET /api/system/memory reports the RSS, PSS and USS (private memory) of
+the master and every worker.
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Any, Optional
+
+# Set in the master before forking, so workers know whose children to report
+MASTER_PID: Optional[int] = None
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def process_memory(pid: int) -> Optional[Dict[str, Any]]:
+    """RSS, PSS, USS and shared memory of a process in MB (None if it cannot be read)"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            kb = {}
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in SMAPS_FIELDS:
+                    kb[name] = int(value.split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return {
+        "pid": pid,
+        "rss_mb": round(kb.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(kb.get("Pss", 0) / 1024, 1),
+        # Unique set size: what exiting this process would free
+        "uss_mb": round((kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024, 1),
+        "shared_mb": round((kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)) / 1024, 1),
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Fields after the command name, which may contain spaces: state, ppid, ...
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == parent:
+                    pids.append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    return sorted(pids)
+
+
+def describe_memory() -> Dict[str, Any]:
+    """Memory of the master and its workers, or of this process alone outside pre-fork mode"""
+    if MASTER_PID is None:
+        master, workers = None, [process_memory(os.getpid())]
+    else:
+        master, workers = process_memory(MASTER_PID), [process_memory(pid) for pid in child_pids(MASTER_PID)]
+    workers = [worker for worker in workers if worker is not None]
+    processes = workers + ([master] if master else [])
+    return {
+        "mode": "single" if MASTER_PID is None else "prefork",
+        "serving_pid": os.getpid(),
+        "master": master,
+        "workers": workers,
+        "totals": {
+            key: round(sum(process[key] for process in processes), 1)
+            for key in ("rss_mb", "pss_mb", "uss_mb")
+        },
+    }
+
+
+def memory_report_line() -> str:
+    memory = describe_memory()
+    workers = ", ".join(f"{worker['pid']} rss {worker['rss_mb']} uss {worker['uss_mb']}" for worker in memory["workers"])
+    master = memory["master"] or {}
+    return (f"master rss {master.get('rss_mb')} uss {master.get('uss_mb')} MB; workers (MB): {workers}; "
+            f"total pss {memory['totals']['pss_mb']} MB")
+
+
+def preload_models(items: List[str]) -> None:
+    """Load what is safe to share before forking (see the module docstring)"""
+    from model_registry import model_registry
+
+    for item in items:
+        dataset, _, architecture = item.partition("/")
+        spec = model_registry.specs.get((dataset, architecture or "xgboost"))
+        if spec is None:
+            print(f"⚠️ Not preloading unknown model {item}")
+        elif spec.framework == "keras":
+            os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+            import tensorflow  # noqa: F401
+        else:
+            model_registry.get(spec.dataset, spec.architecture)
+
+
+class PreforkServer:
+    """
+    Master process: imports the app, preloads models, binds the socket and
+    forks `workers` uvicorn servers that accept on it. Workers that die are
+    replaced; SIGINT/SIGTERM stop them all.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, workers: int = 2,
+                 memory_report_s: float = 0.0, log_level: str = "info"):
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.memory_report_s = memory_report_s
+        self.log_level = log_level
+        self.children: Dict[int, int] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        global MASTER_PID
+        MASTER_PID = os.getpid()
+
+        from main import app, WARM_MODELS
+        preload_models(WARM_MODELS)
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+
+        # Keep the cyclic GC from touching (and so un-sharing) every object the master created
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        for index in range(self.workers):
+            self._spawn(index, app, sock)
+        print(f"🍕 Pre-fork master {MASTER_PID} serving http://{self.host}:{self.port} with {self.workers} workers")
+
+        next_report = time.monotonic() + self.memory_report_s
+        while not self._stopping:
+            self._reap(app, sock)
+            if self.memory_report_s > 0 and time.monotonic() >= next_report:
+                print(f"🧠 Memory: {memory_report_line()}")
+                next_report = time.monotonic() + self.memory_report_s
+            time.sleep(0.5)
+        self._shutdown()
+        sock.close()
+
+    def _spawn(self, index: int, app: Any, sock: socket.socket) -> None:
+        # Unflushed output would be printed again by the child
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+        # Worker: uvicorn installs its own signal handlers
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        import uvicorn
+        status = 0
+        try:
+            server = uvicorn.Server(uvicorn.Config(app, log_level=self.log_level))
+            print(f"👷 Worker {index} started (pid {os.getpid()})")
+            server.run(sockets=[sock])
+        except BaseException as e:
+            print(f"❌ Worker {index} failed: {e}")
+            status = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(status)
+
+    def _reap(self, app: Any, sock: socket.socket) -> None:
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            index = self.children.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+            print(f"⚠️ Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            time.sleep(1)
+            self._spawn(index, app, sock)
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _shutdown(self, timeout_s: float = 30.0) -> None:
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout_s
+        while self.children and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        print("👋 Pre-fork master stopped")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve ORCA with forked workers sharing preloaded models")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ORCA_WORKERS", "2")))
+    parser.add_argument("--memory-report-s", type=float, default=0.0,
+                        help="Print master and worker memory every N seconds (0 = never)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # Through the module main.py imports, so MASTER_PID is set where describe_memory() reads it
+    import prefork
+    prefork.PreforkServer(args.host, args.port, args.workers, args.memory_report_s, args.log_level).run()
@@ -0,0 +1,215 @@
+"""
+ORCA PREDATOR - Sequence Buffers
+Keeps the most recent cycles per equipment in preallocated NumPy ring buffers
+so the CNN+LSTM and CNN+BiLSTM+Attention models can be fed a full window
+without rebuilding sequences on every request.
+
+The buffers of every equipment for one layout live in a single block, so a
+simulation tick appends the whole fleet's readings with a few array
+operations instead of one Python call per machine.
+"""
+
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from model_registry import ModelRegistry, model_registry, reading_groups, write_feature_matrix, write_feature_vector
+
+# A layout is the (feature list, window length) a sequence model consumes.
+# Models that share a layout (e.g. CNN+LSTM and CNN+BiLSTM+Attention for the
+# same FD dataset) share one buffer per equipment.
+Layout = Tuple[Tuple[str, ...], int]
+
+
+class RingBlock:
+    """
+    Fixed-size windows of feature vectors for many equipment, one row each,
+    with O(1) appends.
+
+    Every sample is written twice, at `head` and `head + window`, into the
+    row's (2 * window, F) slab of a (rows, 2 * window, F) array. The last
+    `window` samples are therefore always a contiguous slice, so
+    `window_view()` returns an ordered view without copying or reordering.
+    Each row has its own head and count, so single readings and whole-fleet
+    appends share the storage.
+    """
+
+    def __init__(self, window: int, n_features: int, capacity: int = 16, dtype: Any = np.float32):
+        self.window = window
+        self.n_features = n_features
+        self._data = np.zeros((capacity, 2 * window, n_features), dtype=dtype)
+        self._heads = np.zeros(capacity, dtype=np.int64)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def capacity(self) -> int:
+        return self._data.shape[0]
+
+    def reserve(self, rows: int) -> None:
+        """Make room for `rows` rows (doubling, or straight to `rows` for a large batch)"""
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, 2 * self.capacity)
+        data = np.zeros((capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+        data[:self.capacity] = self._data
+        self._data = data
+        self._heads = np.concatenate([self._heads, np.zeros(capacity - self._heads.shape[0], dtype=np.int64)])
+        self.counts = np.concatenate([self.counts, np.zeros(capacity - self.counts.shape[0], dtype=np.int64)])
+
+    def append_reading(self, row: int, sensor_data: Dict[str, Any], features: Tuple[str, ...],
+                       feature_set: Optional[frozenset] = None) -> None:
+        """Map a sensor dict straight into the row's next slot (see write_feature_vector)"""
+        head = self._heads[row]
+        slot = self._data[row, head]
+        write_feature_vector(sensor_data, features, slot, feature_set)
+        self._data[row, head + self.window] = slot
+        self._heads[row] = (head + 1) % self.window
+        self.counts[row] += 1
+
+    def append_rows(self, rows: Union[np.ndarray, slice], values: np.ndarray) -> None:
+        """Append one (F,) vector to each of `rows` (distinct indices or a slice) from a (rows, F) matrix"""
+        heads = self._heads[rows]
+        if isinstance(rows, slice) and heads.shape[0] and (heads == heads[0]).all():
+            # Rows appended together share a head: plain strided writes
+            head = int(heads[0])
+            self._data[rows, head] = values
+            self._data[rows, head + self.window] = values
+        else:
+            if isinstance(rows, slice):
+                rows = np.arange(rows.start, rows.stop)
+            self._data[rows, heads] = values
+            self._data[rows, heads + self.window] = values
+        self._heads[rows] = (heads + 1) % self.window
+        self.counts[rows] += 1
+
+    def clear(self, row: int) -> None:
+        """Forget a row's samples; the next append starts a fresh window"""
+        self._heads[row] = 0
+        self.counts[row] = 0
+
+    def window_view(self, row: int) -> np.ndarray:
+        """Ordered (window, F) view of the row's latest samples, oldest first (read-only)"""
+        head = self._heads[row]
+        view = self._data[row, head:head + self.window]
+        view.flags.writeable = False
+        return view
+
+    def padded_window(self, row: int) -> np.ndarray:
+        """
+        Window for inference even before `window` samples have arrived.
+        Returns the zero-copy view once full; otherwise a copy whose missing
+        leading cycles repeat the earliest sample.
+        """
+        count = self.counts[row]
+        if count >= self.window:
+            return self.window_view(row)
+        if count == 0:
+            raise ValueError("No samples buffered yet")
+        recent = self._data[row, self.window:self.window + count]
+        padding = np.repeat(recent[:1], self.window - count, axis=0)
+        return np.concatenate([padding, recent])
+
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+
+class SequenceBufferStore:
+    """Per-equipment ring buffers for every sequence-model layout in the registry"""
+
+    def __init__(self, registry: ModelRegistry):
+        self.registry = registry
+        self._layouts: Dict[Layout, List[Tuple[str, str]]] = {}
+        for spec in registry.specs.values():
+            if spec.is_sequence:
+                layout = (tuple(spec.features), spec.window)
+                self._layouts.setdefault(layout, []).append(spec.key)
+        self._feature_sets = {layout: frozenset(layout[0]) for layout in self._layouts}
+        self._blocks = {layout: RingBlock(layout[1], len(layout[0])) for layout in self._layouts}
+        # equipment_id -> row in every block
+        self._rows: Dict[str, int] = {}
+        # Rows of the last fleet appended with append_matrix (by list identity):
+        # a slice when they are consecutive, as for a fleet registered at once
+        self._fleet_ids: Optional[Sequence[str]] = None
+        self._fleet_rows: Union[np.ndarray, slice] = slice(0, 0)
+        self._lock = threading.Lock()
+
+    def layout_for(self, dataset: str, architecture: str) -> Layout:
+        spec = self.registry.specs.get((dataset, architecture))
+        if spec is None or not spec.is_sequence:
+            raise KeyError(f"No sequence model registered for {dataset}/{architecture}")
+        return (tuple(spec.features), spec.window)
+
+    def _row(self, equipment_id: str) -> int:
+        row = self._rows.get(equipment_id)
+        if row is None:
+            row = self._rows[equipment_id] = len(self._rows)
+            for block in self._blocks.values():
+                block.reserve(row + 1)
+        return row
+
+    def append(self, equipment_id: str, sensor_data: Dict[str, Any]) -> None:
+        """Record one reading for an equipment in every layout's buffer"""
+        with self._lock:
+            row = self._row(equipment_id)
+            for layout, block in self._blocks.items():
+                block.append_reading(row, sensor_data, layout[0], self._feature_sets[layout])
+
+    def append_matrix(self, equipment_ids: Sequence[str], readings: np.ndarray, sensor_names: Sequence[str]) -> None:
+        """
+        Record one reading per equipment from a (len(equipment_ids), sensors)
+        matrix (NaN = no reading), in every layout's buffer at once.
+        """
+        with self._lock:
+            if equipment_ids is not self._fleet_ids:
+                new = [equipment_id for equipment_id in equipment_ids if equipment_id not in self._rows]
+                self._rows.update(zip(new, range(len(self._rows), len(self._rows) + len(new))))
+                for block in self._blocks.values():
+                    block.reserve(len(self._rows))
+                rows = np.fromiter((self._rows[equipment_id] for equipment_id in equipment_ids),
+                                   dtype=np.int64, count=len(equipment_ids))
+                consecutive = rows.shape[0] > 0 and (rows == np.arange(rows[0], rows[0] + rows.shape[0])).all()
+                self._fleet_rows = slice(int(rows[0]), int(rows[0]) + rows.shape[0]) if consecutive else rows
+                self._fleet_ids = equipment_ids
+            groups = reading_groups(readings)
+            for (features, _), block in self._blocks.items():
+                block.append_rows(self._fleet_rows, write_feature_matrix(readings, sensor_names, features,
+                                                                         groups=groups))
+
+    def window_copy(self, equipment_id: str, dataset: str, architecture: str) -> Tuple[np.ndarray, int]:
+        """
+        Snapshot of an equipment's window for inference on another thread.
+        Returns the (window, F) array and the number of real cycles in it.
+        """
+        with self._lock:
+            block = self._blocks[self.layout_for(dataset, architecture)]
+            row = self._rows.get(equipment_id)
+            if row is None or block.counts[row] == 0:
+                raise KeyError(f"No sensor history buffered for {equipment_id}")
+            return np.array(block.padded_window(row)), int(min(block.counts[row], block.window))
+
+    def remove(self, equipment_id: str) -> None:
+        """Forget an equipment's samples (its row is reused if it comes back)"""
+        with self._lock:
+            row = self._rows.get(equipment_id)
+            if row is not None:
+                for block in self._blocks.values():
+                    block.clear(row)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(block.nbytes() for block in self._blocks.values())
+            equipment = len(self._rows)
+        return {
+            "equipment": equipment,
+            "layouts": [
+                {"window": window, "features": len(features),
+                 "models": [f"{dataset}/{arch}" for dataset, arch in keys]}
+                for (features, window), keys in self._layouts.items()
+            ],
+            "memory_kb": round(total / 1024, 1),
+        }
+
+
+# Global instance for easy access
+sequence_buffers = SequenceBufferStore(model_registry)
@@ -0,0 +1,144 @@
+"""
+ORCA PREDATOR - Startup
+Phase timing and readiness for a server that opens its port first and warms
+up afterwards: the fleet, model warm-up and Gemini discovery run in the
+background once uvicorn is listening.
+
+`/healthz` only says the process is serving; `/readyz` turns 200 once every
+required phase has finished. Until the fleet exists, StartupGate answers
+API requests with 503 instead of an empty fleet.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Any, Optional, Callable
+
+# Wall-clock time this module was first imported: the start of main.py's imports
+IMPORT_STARTED = time.time()
+
+
+def process_started_at() -> Optional[float]:
+    """Unix time the process was created (None if it cannot be read)"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime_s = float(f.read().split()[0])
+        return time.time() - uptime_s + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTracker:
+    """
+    Named phases with their duration and outcome. A phase is required
+    (readiness waits for it) unless it is run with required=False; a failed
+    required phase keeps the server unready.
+    """
+
+    def __init__(self):
+        self.process_started = process_started_at()
+        self.import_started = IMPORT_STARTED
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.listening_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        # Workers forked by prefork.py time their own startup from the fork
+        os.register_at_fork(after_in_child=self._forked)
+
+    def _forked(self) -> None:
+        self.process_started = time.time()
+        self.listening_at = self.ready_at = None
+
+    def _since_start_ms(self, at: float) -> float:
+        return round((at - (self.process_started or self.import_started)) * 1000, 1)
+
+    def record(self, name: str, started: float, error: Optional[str] = None, required: bool = True,
+               detail: Any = None) -> None:
+        self.phases[name] = {
+            "status": "failed" if error else "done",
+            "ms": round((time.time() - started) * 1000, 1),
+            "required": required,
+            **({"error": error} if error else {}),
+            **({"detail": detail} if detail is not None else {}),
+        }
+
+    def begin(self, name: str, required: bool = True) -> float:
+        self.phases[name] = {"status": "running", "required": required}
+        return time.time()
+
+    async def run(self, name: str, fn: Callable, *args: Any, required: bool = True, executor: Any = None) -> Any:
+        """Run a blocking `fn` off the event loop as one timed phase; returns its result (None on failure)"""
+        started = self.begin(name, required)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except Exception as e:
+            self.record(name, started, error=str(e), required=required)
+            print(f"❌ Startup phase {name} failed after {self.phases[name]['ms']} ms: {e}")
+            return None
+        self.record(name, started, required=required)
+        return result
+
+    def done(self, name: str) -> bool:
+        return self.phases.get(name, {}).get("status") == "done"
+
+    def mark_listening(self) -> None:
+        self.listening_at = time.time()
+
+    def ready(self) -> bool:
+        return all(phase["status"] == "done" for phase in self.phases.values() if phase["required"])
+
+    def finish(self) -> None:
+        """Record the ready time (if every required phase passed) and log the breakdown"""
+        if self.ready():
+            self.ready_at = time.time()
+        print(f"🚀 Startup: {self.summary_line()}")
+
+    def summary_line(self) -> str:
+        parts = []
+        if self.listening_at is not None:
+            parts.append(f"listening after {self._since_start_ms(self.listening_at)} ms")
+        parts.append(f"ready after {self._since_start_ms(self.ready_at)} ms" if self.ready_at else "not ready")
+        phases = ", ".join(f"{name} {phase.get('ms', '…')} ms{'' if phase['status'] == 'done' else ' ' + phase['status']}"
+                           for name, phase in self.phases.items())
+        return f"{'; '.join(parts)} ({phases})"
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready(),
+            "process_started_at": self.process_started,
+            "listening_ms": self._since_start_ms(self.listening_at) if self.listening_at else None,
+            "ready_ms": self._since_start_ms(self.ready_at) if self.ready_at else None,
+            "phases": self.phases,
+        }
+
+
+class StartupGate:
+    """
+    ASGI middleware answering HTTP requests under `prefixes` with 503 (and
+    Retry-After) until the `phase` has finished; everything else passes.
+    """
+
+    def __init__(self, app, tracker: StartupTracker, phase: str = "fleet", prefixes: List[str] = ("/api/",)):
+        self.app = app
+        self.tracker = tracker
+        self.phase = phase
+        self.prefixes = tuple(prefixes)
+        self._open = False
+
+    async def __call__(self, scope, receive, send):
+        if (self._open or scope["type"] != "http" or not scope["path"].startswith(self.prefixes)):
+            return await self.app(scope, receive, send)
+        if self.tracker.done(self.phase):
+            self._open = True
+            return await self.app(scope, receive, send)
+        body = json.dumps({"detail": f"Starting up: waiting for {self.phase}"}).encode()
+        await send({"type": "http.response.start", "status": 503,
+                    "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+
+# Global instance for easy access
+startup = StartupTracker()
@@ -0,0 +1,648 @@
+"""
+ORCA PREDATOR - Sensor Time-Series Store
+Columnar in-memory history of every sensor reading, per equipment, with
+bounded retention and automatic 1-minute / 1-hour min/mean/max rollups.
+
+Samples live in fixed-size NumPy column chunks (one float64 array per sensor
+plus a shared timestamp array), so a stored value costs ~8 bytes instead of
+a Python float inside a dict. Expired data is dropped a whole chunk at a time.
+
+A simulation tick is stored as one frame: the whole fleet's readings packed
+into one array (only the sensors each machine has), with float32 rollups
+accumulated over whole frames (see FleetFrames). Recording a tick is then a handful of
+array operations however large the fleet is; a query assembles one
+machine's rows from the frames and merges them with its own series.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Rollup resolutions in seconds, finest first
+ROLLUP_RESOLUTIONS = {"1m": 60, "1h": 3600}
+ROLLUP_STATS = ("min", "mean", "max")
+# Samples per rollup bucket, kept alongside the stats so buckets from the
+# per-equipment series and the fleet frames can be merged (never returned)
+COUNT_STAT = "count"
+
+# resolution=auto serves raw samples for ranges up to this span, otherwise the
+# finest rollup returning at most AUTO_MAX_POINTS buckets
+AUTO_RAW_SPAN_S = 2 * 3600
+AUTO_MAX_POINTS = 1500
+
+INITIAL_CHUNK_ROWS = 16
+
+
+class _Chunk:
+    """Up to `capacity` rows of timestamps and named float64 columns"""
+
+    __slots__ = ("timestamps", "columns", "size")
+
+    def __init__(self, capacity: int):
+        self.timestamps = np.empty(capacity, dtype=np.float64)
+        self.columns: Dict[str, np.ndarray] = {}
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.timestamps.shape[0]
+
+    def grow(self, capacity: int) -> None:
+        self.timestamps = np.resize(self.timestamps, capacity)
+        for name, column in self.columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + sum(column.nbytes for column in self.columns.values())
+
+
+class ColumnChunks:
+    """
+    Append-only, time-ordered table split into chunks of `chunk_size` rows.
+
+    A column first seen mid-chunk is NaN for the earlier rows; chunks that
+    never saw a column read back as NaN. The newest chunk starts small and
+    doubles up to `chunk_size`, so sparse series do not preallocate a full
+    chunk.
+    """
+
+    def __init__(self, chunk_size: int = 512):
+        self.chunk_size = chunk_size
+        self.chunks: "deque[_Chunk]" = deque()
+        self.rows = 0
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        if not self.chunks:
+            return None
+        tail = self.chunks[-1]
+        return float(tail.timestamps[tail.size - 1])
+
+    def append(self, timestamp: float, values: Dict[str, float]) -> None:
+        tail = self.chunks[-1] if self.chunks else None
+        if tail is None or tail.size == self.chunk_size:
+            tail = _Chunk(min(INITIAL_CHUNK_ROWS, self.chunk_size))
+            self.chunks.append(tail)
+        elif tail.size == tail.capacity:
+            tail.grow(min(tail.capacity * 2, self.chunk_size))
+
+        row = tail.size
+        tail.timestamps[row] = timestamp
+        for name, value in values.items():
+            column = tail.columns.get(name)
+            if column is None:
+                column = np.full(tail.capacity, np.nan)
+                tail.columns[name] = column
+            column[row] = value
+        for name, column in tail.columns.items():
+            if name not in values:
+                column[row] = np.nan
+        tail.size += 1
+        self.rows += 1
+
+    def drop_before(self, cutoff: float) -> int:
+        """Drop whole chunks whose newest row is older than `cutoff`"""
+        dropped = 0
+        while len(self.chunks) > 1 and self.chunks[0].timestamps[self.chunks[0].size - 1] < cutoff:
+            dropped += self.chunks.popleft().size
+        self.rows -= dropped
+        return dropped
+
+    def query(self, start: float, end: float,
+              columns: Optional[List[str]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Rows with start <= timestamp <= end, as a timestamp array and one array per column"""
+        slices = []
+        names = set(columns) if columns is not None else set()
+        for chunk in self.chunks:
+            timestamps = chunk.timestamps[:chunk.size]
+            if chunk.size == 0 or timestamps[-1] < start or timestamps[0] > end:
+                continue
+            lo = int(np.searchsorted(timestamps, start, side="left"))
+            hi = int(np.searchsorted(timestamps, end, side="right"))
+            if hi > lo:
+                slices.append((chunk, lo, hi))
+                if columns is None:
+                    names.update(chunk.columns)
+
+        if not slices:
+            return np.empty(0), {name: np.empty(0) for name in names}
+        timestamps = np.concatenate([chunk.timestamps[lo:hi] for chunk, lo, hi in slices])
+        result = {}
+        for name in names:
+            parts = []
+            for chunk, lo, hi in slices:
+                column = chunk.columns.get(name)
+                parts.append(column[lo:hi] if column is not None else np.full(hi - lo, np.nan))
+            result[name] = np.concatenate(parts)
+        return timestamps, result
+
+    def nbytes(self) -> int:
+        return sum(chunk.nbytes() for chunk in self.chunks)
+
+
+class Rollup:
+    """
+    Fixed-interval min/mean/max per sensor, updated on every sample.
+
+    The current bucket is accumulated in place and written to the table when
+    a sample for a later bucket arrives; queries include it as a partial
+    bucket.
+    """
+
+    def __init__(self, resolution_s: int, retention_s: float, chunk_size: int):
+        self.resolution_s = resolution_s
+        self.retention_s = retention_s
+        self.table = ColumnChunks(chunk_size)
+        self._bucket: Optional[float] = None
+        # sensor -> [count, sum, min, max]
+        self._open: Dict[str, List[float]] = {}
+
+    def add(self, timestamp: float, values: Dict[str, float]) -> None:
+        bucket = timestamp - timestamp % self.resolution_s
+        if self._bucket is not None and bucket != self._bucket:
+            self._seal()
+        self._bucket = bucket
+        for name, value in values.items():
+            acc = self._open.get(name)
+            if acc is None:
+                self._open[name] = [1, value, value, value]
+            else:
+                acc[0] += 1
+                acc[1] += value
+                if value < acc[2]:
+                    acc[2] = value
+                if value > acc[3]:
+                    acc[3] = value
+
+    def _open_row(self) -> Dict[str, float]:
+        row = {}
+        for name, (count, total, low, high) in self._open.items():
+            row[f"{name}.min"] = low
+            row[f"{name}.mean"] = total / count
+            row[f"{name}.max"] = high
+            row[f"{name}.{COUNT_STAT}"] = count
+        return row
+
+    def _seal(self) -> None:
+        self.table.append(self._bucket, self._open_row())
+        self._open = {}
+        self.table.drop_before(self._bucket - self.retention_s)
+
+    def query(self, start: float, end: float,
+              sensors: Optional[List[str]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        columns = None
+        if sensors is not None:
+            columns = [f"{name}.{stat}" for name in sensors for stat in ROLLUP_STATS + (COUNT_STAT,)]
+        # Widen by one bucket so the bucket containing `start` is included
+        timestamps, result = self.table.query(start - start % self.resolution_s, end, columns)
+        if self._bucket is not None and self._open and start - start % self.resolution_s <= self._bucket <= end:
+            row = self._open_row()
+            if columns is None:
+                for name in row:
+                    result.setdefault(name, np.full(timestamps.shape[0], np.nan))
+            timestamps = np.append(timestamps, self._bucket)
+            result = {name: np.append(values, row.get(name, np.nan)) for name, values in result.items()}
+        return timestamps, result
+
+    def nbytes(self) -> int:
+        return self.table.nbytes()
+
+
+class EquipmentSeries:
+    """Raw samples plus every rollup for one piece of equipment"""
+
+    def __init__(self, raw_retention_s: float, rollup_retention_s: Dict[str, float], chunk_size: int):
+        self.raw_retention_s = raw_retention_s
+        self.raw = ColumnChunks(chunk_size)
+        self.rollups = {
+            name: Rollup(seconds, rollup_retention_s[name], chunk_size)
+            for name, seconds in ROLLUP_RESOLUTIONS.items()
+        }
+
+    def append(self, timestamp: float, values: Dict[str, float]) -> None:
+        last = self.raw.last_timestamp
+        if last is not None and timestamp < last:
+            raise ValueError(f"Out-of-order sample at {timestamp} (latest is {last})")
+        self.raw.append(timestamp, values)
+        self.raw.drop_before(timestamp - self.raw_retention_s)
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, values)
+
+    def nbytes(self) -> int:
+        return self.raw.nbytes() + sum(rollup.nbytes() for rollup in self.rollups.values())
+
+
+class FrameRollup:
+    """
+    Rollup over whole-fleet frames. Sum, min and max accumulate over the
+    frame's packed values (see FleetFrames) for the current bucket and are
+    sealed into float32 min/mean/max arrays when a frame for a later bucket
+    arrives. Every value in a frame is a reading, so a bucket's sample count
+    is just the number of frames that fell in it: one integer per bucket.
+    """
+
+    def __init__(self, resolution_s: int, retention_s: float):
+        self.resolution_s = resolution_s
+        self.retention_s = retention_s
+        self.buckets: "deque[float]" = deque()
+        self.counts: "deque[int]" = deque()
+        self.sealed: "deque[Tuple[np.ndarray, ...]]" = deque()
+        self._bucket: Optional[float] = None
+        self._count = 0
+        self._sum = self._low = self._high = None
+
+    def add(self, timestamp: float, values: np.ndarray) -> None:
+        bucket = timestamp - timestamp % self.resolution_s
+        if self._bucket is not None and bucket != self._bucket:
+            self._seal()
+        self._bucket = bucket
+        if self._sum is None:
+            self._sum = values.astype(np.float64)
+            self._low, self._high = values.copy(), values.copy()
+        else:
+            self._sum += values
+            np.minimum(self._low, values, out=self._low)
+            np.maximum(self._high, values, out=self._high)
+        self._count += 1
+
+    def _open_stats(self) -> Tuple[np.ndarray, ...]:
+        return (self._low.astype(np.float32), (self._sum / self._count).astype(np.float32),
+                self._high.astype(np.float32))
+
+    def _seal(self) -> None:
+        self.buckets.append(self._bucket)
+        self.counts.append(self._count)
+        self.sealed.append(self._open_stats())
+        self._count = 0
+        self._sum = self._low = self._high = None
+        while self.buckets and self.buckets[0] < self._bucket - self.retention_s:
+            self.buckets.popleft()
+            self.counts.popleft()
+            self.sealed.popleft()
+
+    def __bool__(self) -> bool:
+        return bool(self.buckets) or self._sum is not None
+
+    def query(self, values: slice, start: float, end: float) -> Tuple[np.ndarray, np.ndarray, Tuple[np.ndarray, ...]]:
+        """
+        Buckets in range for one machine's slice of the packed values:
+        timestamps, sample counts and (min, mean, max) as (k, sensors) arrays
+        """
+        start -= start % self.resolution_s
+        buckets = list(self.buckets)
+        lo, hi = bisect_left(buckets, start), bisect_right(buckets, end)
+        stats = [tuple(stat[values] for stat in self.sealed[i]) for i in range(lo, hi)]
+        timestamps, counts = buckets[lo:hi], list(self.counts)[lo:hi]
+        if self._sum is not None and start <= self._bucket <= end:
+            stats.append(tuple(stat[values] for stat in self._open_stats()))
+            timestamps.append(self._bucket)
+            counts.append(self._count)
+        if not stats:
+            return np.empty(0), np.empty(0), ()
+        return np.array(timestamps), np.array(counts, dtype=np.float64), tuple(np.array(column) for column in zip(*stats))
+
+    def nbytes(self) -> int:
+        sealed = sum(stat.nbytes for stats in self.sealed for stat in stats)
+        return sealed + (0 if self._sum is None else self._sum.nbytes + self._low.nbytes + self._high.nbytes)
+
+
+class FleetFrames:
+    """
+    The readings of one fleet (a fixed list of equipment IDs), one frame per
+    tick. Which sensors a machine has is fixed by its profile, so the first
+    frame's NaN pattern becomes the fleet's layout and every frame is stored
+    packed: only the layout's values, machine by machine, one float64 each.
+    A frame with a different pattern does not fit and starts a new fleet.
+    """
+
+    def __init__(self, equipment_ids: Sequence[str], sensor_names: Sequence[str], layout: np.ndarray,
+                 raw_retention_s: float, rollup_retention_s: Dict[str, float]):
+        self.equipment_ids = equipment_ids
+        self.sensor_names = list(sensor_names)
+        self.rows = {equipment_id: row for row, equipment_id in enumerate(equipment_ids)}
+        # (machines, sensors) mask of the readings each machine has; a
+        # machine's values are packed[offsets[row]:offsets[row + 1]]
+        self.layout = layout
+        self.offsets = np.concatenate([[0], np.cumsum(layout.sum(axis=1))])
+        self.raw_retention_s = raw_retention_s
+        self.timestamps: List[float] = []
+        self.packed: List[np.ndarray] = []
+        self.rollups = {
+            name: FrameRollup(seconds, rollup_retention_s[name]) for name, seconds in ROLLUP_RESOLUTIONS.items()
+        }
+
+    @property
+    def size(self) -> int:
+        """Values per frame"""
+        return int(self.offsets[-1])
+
+    def holds(self, equipment_ids: Sequence[str], sensor_names: Sequence[str], present: np.ndarray) -> bool:
+        return ((equipment_ids is self.equipment_ids or list(equipment_ids) == list(self.equipment_ids))
+                and list(sensor_names) == self.sensor_names and np.array_equal(present, self.layout))
+
+    def append(self, timestamp: float, matrix: np.ndarray) -> None:
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            raise ValueError(f"Out-of-order frame at {timestamp} (latest is {self.timestamps[-1]})")
+        packed = matrix[self.layout]
+        self.timestamps.append(timestamp)
+        self.packed.append(packed)
+        self.expire(timestamp)
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, packed)
+
+    def expire(self, now: float) -> None:
+        """Drop raw frames older than the raw retention"""
+        expired = bisect_left(self.timestamps, now - self.raw_retention_s)
+        if expired:
+            del self.timestamps[:expired], self.packed[:expired]
+
+    def __bool__(self) -> bool:
+        return bool(self.timestamps) or any(self.rollups.values())
+
+    def _slice(self, row: int) -> slice:
+        return slice(int(self.offsets[row]), int(self.offsets[row + 1]))
+
+    def _wanted(self, row: int, sensors: Optional[List[str]]) -> List[Tuple[str, Optional[int]]]:
+        """(sensor, position in the machine's values or None) for each column to return"""
+        has = [self.sensor_names[j] for j in np.flatnonzero(self.layout[row])]
+        if sensors is None:
+            return [(name, position) for position, name in enumerate(has)]
+        position_of = {name: position for position, name in enumerate(has)}
+        return [(name, position_of.get(name)) for name in self.sensor_names if name in sensors]
+
+    def raw(self, row: int, start: float, end: float,
+            sensors: Optional[List[str]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        lo, hi = bisect_left(self.timestamps, start), bisect_right(self.timestamps, end)
+        if hi <= lo:
+            return np.empty(0), {}
+        values = self._slice(row)
+        rows = np.array([packed[values] for packed in self.packed[lo:hi]])
+        return np.array(self.timestamps[lo:hi]), {
+            name: rows[:, position] if position is not None else np.full(hi - lo, np.nan)
+            for name, position in self._wanted(row, sensors)
+        }
+
+    def rollup(self, resolution: str, row: int, start: float, end: float,
+               sensors: Optional[List[str]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        timestamps, counts, stats = self.rollups[resolution].query(self._slice(row), start, end)
+        if not stats:
+            return timestamps, {}
+        result = {}
+        for name, position in self._wanted(row, sensors):
+            if position is None:
+                result[f"{name}.{COUNT_STAT}"] = np.zeros(timestamps.shape[0])
+                result.update((f"{name}.{stat}", np.full(timestamps.shape[0], np.nan)) for stat in ROLLUP_STATS)
+                continue
+            result[f"{name}.{COUNT_STAT}"] = counts
+            for stat, values in zip(ROLLUP_STATS, stats):
+                result[f"{name}.{stat}"] = values[:, position].astype(np.float64)
+        return timestamps, result
+
+    def raw_nbytes(self) -> int:
+        return sum(packed.nbytes for packed in self.packed)
+
+    def nbytes(self) -> int:
+        return (self.raw_nbytes() + self.layout.nbytes + self.offsets.nbytes
+                + sum(rollup.nbytes() for rollup in self.rollups.values()))
+
+
+def _merge_raw(parts: List[Tuple[np.ndarray, Dict[str, np.ndarray]]]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Raw rows from several sources as one time-ordered table (NaN where a source lacks a column)"""
+    names = sorted({name for _, columns in parts for name in columns})
+    timestamps = np.concatenate([part_timestamps for part_timestamps, _ in parts])
+    order = np.argsort(timestamps, kind="stable")
+    result = {}
+    for name in names:
+        column = np.concatenate([
+            columns[name] if name in columns else np.full(part_timestamps.shape[0], np.nan)
+            for part_timestamps, columns in parts
+        ])
+        result[name] = column[order]
+    return timestamps[order], result
+
+
+def _merge_rollups(parts: List[Tuple[np.ndarray, Dict[str, np.ndarray]]]
+                   ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Rollup rows from several sources, combining buckets they share by sample count"""
+    timestamps, columns = _merge_raw(parts)
+    buckets, inverse = np.unique(timestamps, return_inverse=True)
+    if buckets.shape[0] == timestamps.shape[0]:
+        return timestamps, columns
+    result = {}
+    for sensor in {name.rpartition(".")[0] for name in columns}:
+        count = np.nan_to_num(columns.get(f"{sensor}.{COUNT_STAT}", np.zeros(timestamps.shape[0])))
+        mean = np.nan_to_num(columns[f"{sensor}.mean"])
+        counts, totals = np.zeros(buckets.shape[0]), np.zeros(buckets.shape[0])
+        np.add.at(counts, inverse, count)
+        np.add.at(totals, inverse, mean * count)
+        low, high = np.full(buckets.shape[0], np.nan), np.full(buckets.shape[0], np.nan)
+        np.fmin.at(low, inverse, columns[f"{sensor}.min"])
+        np.fmax.at(high, inverse, columns[f"{sensor}.max"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[f"{sensor}.mean"] = totals / counts
+        result[f"{sensor}.min"], result[f"{sensor}.max"] = low, high
+        result[f"{sensor}.{COUNT_STAT}"] = counts
+    return buckets, result
+
+
+class SensorTimeSeriesStore:
+    """Thread-safe map of equipment ID to its sensor history"""
+
+    def __init__(self, raw_retention_h: float = 6, minute_retention_h: float = 48,
+                 hour_retention_d: float = 30, chunk_size: int = 512):
+        self.raw_retention_s = raw_retention_h * 3600
+        self.rollup_retention_s = {"1m": minute_retention_h * 3600, "1h": hour_retention_d * 86400}
+        self.chunk_size = chunk_size
+        self._series: Dict[str, EquipmentSeries] = {}
+        # Fleet frames, oldest fleet first; the last one receives new ticks
+        self._frames: List[FleetFrames] = []
+        self._lock = threading.Lock()
+        self.stats = {"appends": 0, "frames": 0, "rejected": 0, "queries": 0}
+
+    def append(self, equipment_id: str, sensor_data: Dict[str, Any], timestamp: Optional[float] = None) -> None:
+        """Record the numeric fields of one reading (non-numeric fields are skipped)"""
+        values = {
+            name: float(value) for name, value in sensor_data.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        if not values:
+            return
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        with self._lock:
+            series = self._series.get(equipment_id)
+            if series is None:
+                series = EquipmentSeries(self.raw_retention_s, self.rollup_retention_s, self.chunk_size)
+                self._series[equipment_id] = series
+            try:
+                series.append(timestamp, values)
+            except ValueError:
+                self.stats["rejected"] += 1
+                raise
+            self.stats["appends"] += 1
+
+    def append_frame(self, equipment_ids: Sequence[str], timestamp: float, matrix: np.ndarray,
+                     sensor_names: Sequence[str]) -> None:
+        """
+        Record one reading per equipment from a (len(equipment_ids), sensors)
+        matrix (NaN = no reading) as a single frame. A different ID list,
+        sensor set or set of sensors per machine starts a new fleet.
+        """
+        timestamp = float(timestamp)
+        present = ~np.isnan(matrix)
+        with self._lock:
+            frames = self._frames[-1] if self._frames else None
+            if frames is None or not frames.holds(equipment_ids, sensor_names, present):
+                frames = FleetFrames(equipment_ids, sensor_names, present, self.raw_retention_s,
+                                     self.rollup_retention_s)
+                self._frames.append(frames)
+            try:
+                frames.append(timestamp, matrix)
+            except ValueError:
+                self.stats["rejected"] += 1
+                raise
+            # Earlier fleets age out on the same clock
+            for previous in self._frames[:-1]:
+                previous.expire(timestamp)
+            self._frames = [previous for previous in self._frames[:-1] if previous] + [frames]
+            self.stats["appends"] += len(equipment_ids)
+            self.stats["frames"] += 1
+
+    def has(self, equipment_id: str) -> bool:
+        return equipment_id in self._series or any(equipment_id in frames.rows for frames in self._frames)
+
+    def choose_resolution(self, start: float, end: float) -> str:
+        """Raw for short recent ranges, else the finest rollup under AUTO_MAX_POINTS buckets"""
+        if end - start <= AUTO_RAW_SPAN_S and start >= time.time() - self.raw_retention_s:
+            return "raw"
+        for name, seconds in ROLLUP_RESOLUTIONS.items():
+            if (end - start) / seconds <= AUTO_MAX_POINTS:
+                return name
+        return list(ROLLUP_RESOLUTIONS)[-1]
+
+    def query(self, equipment_id: str, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: str = "auto", sensors: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        History for one equipment between `start` and `end` (Unix seconds).
+
+        Raw results map each sensor to a list of values; rollups map each
+        sensor to {"min", "mean", "max"} lists. Missing values are None.
+        """
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        if start > end:
+            raise ValueError("'from' must not be after 'to'")
+        if resolution == "auto":
+            resolution = self.choose_resolution(start, end)
+        if resolution != "raw" and resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution}. Choose from raw, auto, "
+                             f"{', '.join(ROLLUP_RESOLUTIONS)}")
+
+        with self._lock:
+            series = self._series.get(equipment_id)
+            fleets = [(frames, frames.rows[equipment_id]) for frames in self._frames if equipment_id in frames.rows]
+            if series is None and not fleets:
+                raise KeyError(f"No sensor history for {equipment_id}")
+            self.stats["queries"] += 1
+            parts = []
+            if series is not None:
+                if resolution == "raw":
+                    parts.append(series.raw.query(start, end, sensors))
+                else:
+                    parts.append(series.rollups[resolution].query(start, end, sensors))
+            for frames, row in fleets:
+                if resolution == "raw":
+                    parts.append(frames.raw(row, start, end, sensors))
+                else:
+                    parts.append(frames.rollup(resolution, row, start, end, sensors))
+
+        if len(parts) == 1:
+            timestamps, columns = parts[0]
+        elif resolution == "raw":
+            timestamps, columns = _merge_raw(parts)
+        else:
+            timestamps, columns = _merge_rollups(parts)
+
+        if resolution == "raw":
+            values = {name: _to_list(column) for name, column in sorted(columns.items())}
+        else:
+            values = {}
+            for name, column in sorted(columns.items()):
+                sensor, _, stat = name.rpartition(".")
+                if stat != COUNT_STAT:
+                    values.setdefault(sensor, {})[stat] = _to_list(column)
+
+        return {
+            "equipment_id": equipment_id,
+            "resolution": resolution,
+            "from": start,
+            "to": end,
+            "points": int(timestamps.shape[0]),
+            "timestamps": timestamps.tolist(),
+            "sensors": values,
+        }
+
+    def remove(self, equipment_id: str) -> None:
+        with self._lock:
+            self._series.pop(equipment_id, None)
+            for frames in self._frames:
+                frames.rows.pop(equipment_id, None)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            raw_rows = sum(series.raw.rows for series in self._series.values())
+            raw_values = sum(
+                int(np.count_nonzero(~np.isnan(column[:chunk.size])))
+                for series in self._series.values() for chunk in series.raw.chunks
+                for column in chunk.columns.values()
+            )
+            raw_rows += sum(len(frames.rows) * len(frames.timestamps) for frames in self._frames)
+            raw_values += sum(frames.size * len(frames.timestamps) for frames in self._frames)
+            raw_bytes = (sum(series.raw.nbytes() for series in self._series.values())
+                         + sum(frames.raw_nbytes() for frames in self._frames))
+            total_bytes = (sum(series.nbytes() for series in self._series.values())
+                           + sum(frames.nbytes() for frames in self._frames))
+            equipment = len(self._series.keys() | {
+                equipment_id for frames in self._frames for equipment_id in frames.rows
+            })
+            fleet_frames = [len(frames.timestamps) for frames in self._frames]
+        return {
+            "equipment": equipment,
+            "raw_samples": raw_rows,
+            "raw_values": raw_values,
+            "raw_bytes_per_value": round(raw_bytes / raw_values, 2) if raw_values else None,
+            "memory_mb": round(total_bytes / 1e6, 3),
+            "retention": {
+                "raw_h": self.raw_retention_s / 3600,
+                "1m_h": self.rollup_retention_s["1m"] / 3600,
+                "1h_d": self.rollup_retention_s["1h"] / 86400,
+            },
+            "chunk_size": self.chunk_size,
+            "fleet_frames": fleet_frames,
+            **self.stats,
+        }
+
+
+def _to_list(column: np.ndarray) -> List[Optional[float]]:
+    """JSON-safe list with NaN (no reading) mapped to None"""
+    return [None if value != value else value for value in column.tolist()]
+
+
+def create_sensor_history() -> SensorTimeSeriesStore:
+    """Store configured from ORCA_HISTORY_*"""
+    return SensorTimeSeriesStore(
+        raw_retention_h=float(os.getenv("ORCA_HISTORY_RAW_RETENTION_H", "6")),
+        minute_retention_h=float(os.getenv("ORCA_HISTORY_1M_RETENTION_H", "48")),
+        hour_retention_d=float(os.getenv("ORCA_HISTORY_1H_RETENTION_D", "30")),
+        chunk_size=int(os.getenv("ORCA_HISTORY_CHUNK_SIZE", "512")),
+    )
+
+
+# Global instance for easy access
+sensor_history = create_sensor_history()
@@ -44,6 +44,7 @@ import {
 } from 'lucide-react';
 
 import { formatTimeSafe } from '@/lib/utils';
+import { api } from '@/lib/api';
 
 interface ChatMessage {
   id: string;
@@ -111,6 +112,7 @@ const ORCAChatbot: React.FC<ORCAChatbotProps> = ({
   ]);
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
   const [fileAnalysis, setFileAnalysis] = useState<FileAnalysis | null>(null);
   const [equipmentContextState, setEquipmentContext] = useState<string>('');
@@ -158,22 +160,17 @@ const ORCAChatbot: React.FC<ORCAChatbotProps> = ({
       if (sensorDataState) context.sensor_data = sensorDataState;
       if (rulState) context.rul = rulState;
 
-      // Call AI chatbot API
-      const response = await fetch('http://localhost:8000/api/ai/chatbot', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          message: userMessage,
-          equipment_context: equipmentContextState,
-        }),
+      // Stream the AI answer into one message as it is generated
+      const aiMessageId = `${Date.now()}-ai`;
+      let answer = '';
+      await api.chatStream(userMessage, equipmentContextState || undefined, (text) => {
+        answer += text;
+        setIsStreaming(true);
+        setMessages(prev => (prev.some(m => m.id === aiMessageId)
+          ? prev.map(m => (m.id === aiMessageId ? { ...m, message: answer } : m))
+          : [...prev, { id: aiMessageId, type: 'ai' as const, message: answer, timestamp: new Date(), context }]));
       });
-
-      if (response.ok) {
-        const data = await response.json();
-        addMessage('ai', data.response, context);
-      } else {
+      if (!answer) {
         throw new Error('Failed to get AI response');
       }
     } catch (error) {
@@ -181,6 +178,7 @@ const ORCAChatbot: React.FC<ORCAChatbotProps> = ({
       addMessage('ai', 'Sorry, I encountered an error. Please try again or check your connection.');
     } finally {
       setIsLoading(false);
+      setIsStreaming(false);
     }
   };
 
@@ -188,38 +186,27 @@ const ORCAChatbot: React.FC<ORCAChatbotProps> = ({
     if (!selectedFile) return;
 
     setIsLoading(true);
-    const formData = new FormData();
-    formData.append('file', selectedFile);
 
     try {
-      const response = await fetch('http://localhost:8000/api/ai/analyze-file', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          file_type: selectedFile.name.endsWith('.json') ? 'json' : 'csv',
-          sensor_data: {}, // Mock data for now
-        }),
+      const data = await api.analyzeFile(selectedFile);
+      setFileAnalysis({
+        filename: selectedFile.name,
+        fileType: data.format,
+        analysis: data.recommendations.join('\n'),
+        timestamp: data.analysis_timestamp,
+        status: data.critical_units > 0 ? 'critical' : data.warning_units > 0 ? 'warning' : 'healthy',
+      });
+      
+      // Add AI message about file analysis
+      addMessage('ai', `I've analyzed your file "${selectedFile.name}" (${data.units} units, ${data.rows} rows). Average predicted RUL is ${data.predicted_rul} cycles. Here's what I found:\n\n${data.recommendations.join('\n')}`);
+      
+      toast({
+        title: 'File analyzed successfully',
+        description: 'AI analysis complete',
+        status: 'success',
+        duration: 3000,
+        isClosable: true,
       });
-
-      if (response.ok) {
-        const data = await response.json();
-        setFileAnalysis(data);
-        
-        // Add AI message about file analysis
-        addMessage('ai', `I've analyzed your file "${selectedFile.name}". Here's what I found:\n\n${data.recommendations.join('\n')}`);
-        
-        toast({
-          title: 'File analyzed successfully',
-          description: 'AI analysis complete',
-          status: 'success',
-          duration: 3000,
-          isClosable: true,
-        });
-      } else {
-        throw new Error('Failed to analyze file');
-      }
     } catch (error) {
       console.error('Error analyzing file:', error);
       toast({
@@ -434,7 +421,7 @@ const ORCAChatbot: React.FC<ORCAChatbotProps> = ({
             </Box>
           ))}
           
-          {isLoading && (
+          {isLoading && !isStreaming && (
             <Box alignSelf="flex-start" maxW="80%">
               <HStack spacing={3} align="start">
                 <Avatar
@@ -501,7 +488,7 @@ const ORCAChatbot: React.FC<ORCAChatbotProps> = ({
       <input
         ref={fileInputRef}
         type="file"
-        accept=".json,.csv"
+        accept=".csv,.jsonl,.ndjson,.txt"
         onChange={handleFileSelect}
         style={{ display: 'none' }}
       />
@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import {
   Box,
   VStack,
@@ -68,6 +68,10 @@ export default function PREDATOREnhanced() {
 
   const [summary, setSummary] = useState<Record<string, unknown> | undefined>(undefined);
   
+  // Live update stream, and the selection as its handlers see it
+  const liveRef = useRef<EventSource | null>(null);
+  const selectedRef = useRef<string>('');
+  
   const toast = useToast();
 
   // Fetch equipment data
@@ -121,11 +125,13 @@ export default function PREDATOREnhanced() {
   const simulateUpdate = async () => {
     try {
       await api.simulateUpdate();
-      // Refresh data after simulation
-      await fetchEquipment();
-      await fetchSummary();
-      if (selectedEquipment) {
-        await fetchSensorData(selectedEquipment);
+      // The live stream delivers the tick's changes; refetch only without it
+      if (liveRef.current?.readyState !== EventSource.OPEN) {
+        await fetchEquipment();
+        await fetchSummary();
+        if (selectedEquipment) {
+          await fetchSensorData(selectedEquipment);
+        }
       }
     } catch (error) {
       console.error('Error simulating update:', error);
@@ -162,6 +168,49 @@ export default function PREDATOREnhanced() {
     initializeData();
   }, [fetchEquipment, fetchSummary]);
 
+  useEffect(() => {
+    selectedRef.current = selectedEquipment;
+  }, [selectedEquipment]);
+
+  // Apply live deltas once the initial data is loaded, instead of refetching everything
+  useEffect(() => {
+    if (!isInitialized) return;
+    const source = api.subscribeLive({
+      onUpdate: (data) => {
+        const changes = (data.equipment ?? {}) as Record<string, Partial<Equipment>>;
+        if (Object.keys(changes).length) {
+          setEquipment(prev => {
+            const known = new Set(prev.map(e => e.equipment_id));
+            const updated = prev.map(e => (changes[e.equipment_id] ? { ...e, ...changes[e.equipment_id] } : e));
+            // New machines arrive as full records
+            const added = Object.values(changes).filter(e => e.equipment_id && !known.has(e.equipment_id));
+            return added.length ? [...updated, ...(added as Equipment[])] : updated;
+          });
+          const selected = changes[selectedRef.current];
+          if (selected?.rul !== undefined) {
+            setCurrentRUL(selected.rul);
+          }
+        }
+        const reading = data.sensors?.[selectedRef.current];
+        if (reading) {
+          setCurrentSensorData(reading);
+        }
+        if (data.summary) {
+          setSummary(prev => ({ ...prev, ...data.summary }));
+        }
+      },
+      onResync: () => {
+        fetchEquipment();
+        fetchSummary();
+      },
+    }, { snapshot: false });
+    liveRef.current = source;
+    return () => {
+      source.close();
+      liveRef.current = null;
+    };
+  }, [isInitialized, fetchEquipment, fetchSummary]);
+
   // Calculate pagination
   const totalPages = Math.ceil(equipment.length / itemsPerPage);
   const startIndex = (currentPage - 1) * itemsPerPage;
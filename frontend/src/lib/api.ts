@@ -9,9 +9,11 @@ export const API_CONFIG = {
     SENSOR_DATA: '/api/mock/sensor-data',
     SUMMARY: '/api/mock/summary',
     SIMULATE: '/api/mock/simulate',
+    LIVE_STREAM: '/api/live/stream',
     PREDICT_RUL: '/api/predict-rul',
     PREDICT_RUL_MULTI: '/api/predict-rul-multi',
     CHAT: '/api/ai/chatbot',
+    CHAT_STREAM: '/api/ai/chatbot/stream',
     MAINTENANCE_TASKS: '/api/ai/maintenance-tasks',
     ANALYZE_FILE: '/api/ai/analyze-file',
     HEALTH: '/api/health',
@@ -88,23 +90,106 @@ export const api = {
       body: JSON.stringify({ message, context }),
     }),
   
+  // Streams a chatbot answer as NDJSON records ('start', 'token', 'error', 'done');
+  // onToken receives each chunk of text as it is generated; resolves with the 'done' record.
+  chatStream: async (message: string, equipmentContext?: string, onToken?: (text: string) => void) => {
+    const response = await fetch(buildApiUrl(API_CONFIG.ENDPOINTS.CHAT_STREAM), {
+      method: 'POST',
+      headers: API_CONFIG.REQUEST_CONFIG.headers,
+      body: JSON.stringify({ message, equipment_context: equipmentContext }),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`API request failed: ${response.status} ${response.statusText}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    let done: any = null;
+    for (;;) {
+      const { done: finished, value } = await reader.read();
+      buffered += decoder.decode(value, { stream: !finished });
+      const lines = buffered.split('\n');
+      buffered = lines.pop() ?? '';
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const record = JSON.parse(line);
+        if (record.type === 'token') onToken?.(record.text);
+        if (record.type === 'done') done = record;
+      }
+      if (finished) break;
+    }
+    if (!done) {
+      throw new Error('Chatbot stream ended early');
+    }
+    return done;
+  },
+  
   getMaintenanceTasks: (equipmentId: string, sensorData?: any) => 
     apiRequest(`${API_CONFIG.ENDPOINTS.MAINTENANCE_TASKS}/${equipmentId}`, {
       method: 'POST',
       body: JSON.stringify({ sensor_data: sensorData }),
     }),
   
-  analyzeFile: (file: File) => {
+  // Uploads a CSV, JSONL or C-MAPSS txt file. Results stream back as NDJSON records
+  // ('start', 'unit', 'error', 'summary') while the upload is processed; resolves with the summary.
+  analyzeFile: async (file: File, onRecord?: (record: any) => void) => {
     const formData = new FormData();
     formData.append('file', file);
     
-    return apiRequest(API_CONFIG.ENDPOINTS.ANALYZE_FILE, {
+    const response = await fetch(buildApiUrl(API_CONFIG.ENDPOINTS.ANALYZE_FILE), {
       method: 'POST',
       body: formData,
     });
+    if (!response.ok || !response.body) {
+      throw new Error(`API request failed: ${response.status} ${response.statusText}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    let summary: any = null;
+    let lastError: string | null = null;
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffered += decoder.decode(value, { stream: !done });
+      const lines = buffered.split('\n');
+      buffered = lines.pop() ?? '';
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const record = JSON.parse(line);
+        if (record.type === 'summary') summary = record;
+        if (record.type === 'error') lastError = record.error;
+        onRecord?.(record);
+      }
+      if (done) break;
+    }
+    if (!summary) {
+      throw new Error(lastError || 'File analysis did not complete');
+    }
+    return summary;
   },
   
   // Health endpoints
   getHealth: () => apiRequest(API_CONFIG.ENDPOINTS.HEALTH),
   getStatus: () => apiRequest(API_CONFIG.ENDPOINTS.STATUS),
+  
+  // Live updates: a 'snapshot' event, then 'update' events with only changed fields.
+  // On 'resync', refetch equipment and summary. Call .close() on the result to stop.
+  subscribeLive: (
+    handlers: { onSnapshot?: (data: any) => void; onUpdate: (data: any) => void; onResync?: () => void },
+    filters: { equipmentIds?: string[]; categories?: string[]; sensors?: boolean; snapshot?: boolean } = {}
+  ) => {
+    const params = new URLSearchParams();
+    if (filters.equipmentIds?.length) params.set('equipment_ids', filters.equipmentIds.join(','));
+    if (filters.categories?.length) params.set('categories', filters.categories.join(','));
+    if (filters.sensors === false) params.set('sensors', 'false');
+    if (filters.snapshot === false) params.set('snapshot', 'false');
+    
+    const source = new EventSource(`${buildApiUrl(API_CONFIG.ENDPOINTS.LIVE_STREAM)}?${params}`);
+    source.addEventListener('snapshot', (event) => handlers.onSnapshot?.(JSON.parse((event as MessageEvent).data)));
+    source.addEventListener('update', (event) => handlers.onUpdate(JSON.parse((event as MessageEvent).data)));
+    source.addEventListener('resync', () => handlers.onResync?.());
+    return source;
+  },
 };